@@ -1,12 +1,16 @@
 # backend/app.py
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from utils.gemini_handler import GeminiHandler
 from utils.twilio_handler import TwilioHandler
 from database.chromadb_manager import ChromaDBManager
+from database.chat_retention import ChatRetentionJob
 from services.health_tips import HealthTipsService
 from config import Config
+import asyncio
+import json
 import os
+import threading
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -18,12 +22,47 @@ config = Config()
 # Initialize handlers
 gemini_handler = GeminiHandler(config)
 twilio_handler = TwilioHandler()
-db_manager = ChromaDBManager(config.CHROMA_DB_PATH)
+db_manager = ChromaDBManager(
+    config.CHROMA_DB_PATH,
+    count_ttl=config.COLLECTION_COUNT_TTL,
+    embedding_cache_size=config.EMBEDDING_CACHE_SIZE,
+    embedding_cache_disk_size=config.EMBEDDING_CACHE_DISK_SIZE,
+    use_memory_index=config.USE_MEMORY_INDEX,
+    memory_index_max_items=config.MEMORY_INDEX_MAX_ITEMS,
+    write_behind=config.WRITE_BEHIND_ENABLED,
+    write_batch_size=config.WRITE_BATCH_SIZE,
+    write_flush_interval=config.WRITE_FLUSH_INTERVAL,
+    write_queue_size=config.WRITE_QUEUE_SIZE,
+    hybrid_search=config.HYBRID_SEARCH_ENABLED,
+    hybrid_candidates=config.HYBRID_CANDIDATES,
+    lazy=config.LAZY_DB_INIT,
+    artifact_dir=config.EMBEDDING_ARTIFACT_DIR,
+    profile_cache_size=config.PROFILE_CACHE_SIZE,
+    profile_cache_ttl=config.PROFILE_CACHE_TTL,
+    personalization_mode=config.PERSONALIZATION_MODE,
+    personalization_weight=config.PERSONALIZATION_WEIGHT,
+    chat_history_shards=config.CHAT_HISTORY_SHARDS,
+    index_precision=config.INDEX_PRECISION,
+    index_rerank_factor=config.INDEX_RERANK_FACTOR
+)
 
 # Initialize services
 gemini_handler.set_managers(db_manager)
 health_tips_service = HealthTipsService(db_manager)
 
+# Load the embedding model and collections in the background so the server
+# accepts connections immediately; /health/ready reports when this is done
+threading.Thread(target=db_manager.warmup, name="db-warmup", daemon=True).start()
+
+# Roll up, delete and compact expired chat history periodically
+chat_retention_job = ChatRetentionJob(
+    db_manager,
+    config.CHAT_RETENTION_DAYS,
+    interval_seconds=config.CHAT_RETENTION_INTERVAL
+)
+if config.CHAT_RETENTION_ENABLED:
+    chat_retention_job.start()
+
 @app.errorhandler(404)
 def not_found_error(error):
     return jsonify({"error": "Resource not found"}), 404
@@ -34,10 +73,12 @@ def internal_error(error):
 
 @app.route('/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
+    """Health check endpoint (liveness)"""
     return jsonify({
         "status": "healthy",
         "message": "Health chatbot API is running",
+        "live": True,
+        "ready": db_manager.is_ready(),
         "features": {
             "chat": True,
             "whatsapp": config.WHATSAPP_ENABLED,
@@ -46,6 +87,15 @@ def health_check():
         }
     })
 
+@app.route('/health/ready', methods=['GET'])
+def readiness_check():
+    """Readiness endpoint: 503 until the database and embedding model are warmed up"""
+    ready = db_manager.is_ready()
+    return jsonify({
+        "ready": ready,
+        "database": db_manager.get_status()
+    }), 200 if ready else 503
+
 @app.route('/chat', methods=['POST'])
 async def chat():
     """Handle chat messages"""
@@ -64,8 +114,8 @@ async def chat():
             is_whatsapp=False
         )
         
-        # Store chat history
-        db_manager.store_chat(user_id, message, response)
+        # Queue chat history for background persistence
+        db_manager.store_chat(user_id, message, response, channel="streamlit")
         
         return jsonify({
             "response": response,
@@ -76,6 +126,70 @@ async def chat():
         print(f"Error in chat endpoint: {str(e)}")
         return jsonify({"error": "Failed to process chat message"}), 500
 
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """Stream the chat response as Server-Sent Events"""
+    data = request.json or {}
+    user_id = data.get('user_id', 'default_user')
+    message = data.get('message')
+    
+    if not message:
+        return jsonify({"error": "Message is required"}), 400
+
+    def events():
+        # Drive the async generator on a loop owned by this response
+        loop = asyncio.new_event_loop()
+        chunks = gemini_handler.stream_response(user_id=user_id, message=message, is_whatsapp=False)
+        parts = []
+        try:
+            while True:
+                try:
+                    chunk = loop.run_until_complete(chunks.__anext__())
+                except StopAsyncIteration:
+                    break
+                parts.append(chunk)
+                yield f"data: {json.dumps({'text': chunk})}\n\n"
+            
+            # Only a completed stream is stored; failures end with an error event instead
+            db_manager.store_chat(user_id, message, "".join(parts), channel="streamlit")
+            yield f"event: done\ndata: {json.dumps({'user_id': user_id})}\n\n"
+        except Exception as e:
+            print(f"Error in chat stream: {str(e)}")
+            yield f"event: error\ndata: {json.dumps({'error': 'Failed to process chat message'})}\n\n"
+        finally:
+            loop.run_until_complete(chunks.aclose())
+            loop.close()
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route('/history', methods=['GET'])
+def get_history():
+    """Get paginated chat history, newest first"""
+    try:
+        user_id = request.args.get('user_id')
+        if not user_id:
+            return jsonify({"error": "User ID is required"}), 400
+        
+        limit = max(1, min(int(request.args.get('limit', 20)), 100))
+        cursor = request.args.get('cursor')
+        
+        page = db_manager.get_chat_history_page(user_id, limit=limit, cursor=cursor)
+        
+        return jsonify({
+            "user_id": user_id,
+            "messages": page["messages"],
+            "next_cursor": page["next_cursor"]
+        })
+    except ValueError:
+        return jsonify({"error": "Invalid limit or cursor"}), 400
+    except Exception as e:
+        print(f"Error in history endpoint: {str(e)}")
+        return jsonify({"error": "Failed to get chat history"}), 500
+
 @app.route('/whatsapp/webhook', methods=['POST'])
 async def whatsapp_webhook():
     """Handle WhatsApp messages"""
@@ -96,6 +210,9 @@ async def whatsapp_webhook():
             is_whatsapp=True
         )
         
+        # Store chat history
+        db_manager.store_chat(sender, incoming_msg, response, channel="whatsapp")
+        
         # Create and return WhatsApp response
         return twilio_handler.create_response(response)
 
@@ -149,12 +266,17 @@ def submit_feedback():
         user_id = data.get('user_id', 'default_user')
         rating = data.get('rating')
         comment = data.get('comment', '')
+        channel = data.get('channel', 'streamlit')
         
         if rating is None:
             return jsonify({"error": "Rating is required"}), 400
+        try:
+            rating = int(rating)
+        except (TypeError, ValueError):
+            return jsonify({"error": "Rating must be an integer"}), 400
 
         # Store feedback
-        db_manager.store_feedback(user_id, rating, comment)
+        db_manager.store_feedback(user_id, rating, comment, channel=channel)
         
         return jsonify({
             "message": "Thank you for your feedback!",
@@ -164,6 +286,34 @@ def submit_feedback():
         print(f"Error in feedback endpoint: {str(e)}")
         return jsonify({"error": "Failed to process feedback"}), 500
 
+@app.route('/feedback/stats', methods=['GET'])
+def get_feedback_stats():
+    """Get feedback aggregates"""
+    try:
+        days = request.args.get('days', type=int)
+        return jsonify(db_manager.get_feedback_stats(days))
+    except Exception as e:
+        print(f"Error in feedback stats endpoint: {str(e)}")
+        return jsonify({"error": "Failed to get feedback stats"}), 500
+
+@app.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Get hit-rate metrics of the response caches"""
+    try:
+        return jsonify(gemini_handler.get_cache_stats())
+    except Exception as e:
+        print(f"Error in cache stats endpoint: {str(e)}")
+        return jsonify({"error": "Failed to get cache stats"}), 500
+
+@app.route('/metrics/latency', methods=['GET'])
+def get_latency_stats():
+    """Time to first token and response time percentiles per channel"""
+    try:
+        return jsonify(gemini_handler.get_latency_stats())
+    except Exception as e:
+        print(f"Error in latency stats endpoint: {str(e)}")
+        return jsonify({"error": "Failed to get latency stats"}), 500
+
 @app.route('/clear-context', methods=['POST'])
 def clear_context():
     """Clear user context"""
@@ -202,14 +352,21 @@ Key Components:
    - Gemini AI for response generation
    - Twilio for WhatsApp communication
    - ChromaDB for data storage
+   - Chat retention job (TTL per channel, rollup, compaction)
    - Health Tips service for random tips
 
 2. API Endpoints:
    a. Core Functionality:
-      - /health: System health check
+      - /health: System health check (liveness)
+      - /health/ready: Readiness check
       - /chat: Main chat interface
+      - /chat/stream: Streaming chat (Server-Sent Events)
+      - /history: Paginated chat history
       - /tips/random: Random health tip generator
       - /feedback: User feedback collection
+      - /feedback/stats: Feedback aggregates
+      - /cache/stats: Response and research cache metrics
+      - /metrics/latency: Time to first token and response time
       - /clear-context: Context management
 
    b. WhatsApp Integration:
@@ -225,35 +382,68 @@ Key Components:
 Endpoint Details:
 
 1. /health (GET):
-   - System status check
+   - System status check (liveness, always 200 while the process runs)
+   - Readiness flag
    - Feature availability status
    - WhatsApp integration status
 
+   /health/ready (GET):
+   - 200 once the database is initialized and the embedding model loaded
+   - 503 while the background warmup is still running or failed
+
 2. /chat (POST):
    - Handles chat messages
    - User identification
    - Response generation
    - Chat history storage
 
-3. /whatsapp/webhook (POST):
+   /chat/stream (POST):
+   - Same request body as /chat
+   - text/event-stream of "data: {"text": chunk}" events as the answer is
+     generated, then "event: done" (or "event: error")
+   - The async handler generator runs on an event loop owned by the response
+   - Chat history is stored once the stream completes
+
+3. /history (GET):
+   - user_id (required), limit (clamped to 1..100), cursor
+   - Time-ordered turns, newest first
+   - next_cursor for the following page
+
+4. /whatsapp/webhook (POST):
    - WhatsApp message processing
    - Sender identification
    - Response generation
+   - Chat history storage (channel "whatsapp")
    - WhatsApp-specific formatting
 
-4. /tips/random (GET):
+5. /tips/random (GET):
    - Random health tip generation
    - Category-based filtering
    - Product recommendations
    - Error handling
 
-5. /feedback (POST):
+6. /feedback (POST):
    - User feedback collection
    - Rating processing
-   - Comment storage
+   - Comment storage (optional channel, default streamlit)
    - Success confirmation
 
-6. /clear-context (POST):
+   /feedback/stats (GET):
+   - Overall and per-channel count, mean rating and histogram
+   - Optional days=N for a per-day breakdown
+   - Summed from the daily aggregate tables on each request, no scan of
+     stored feedback (consistent across workers)
+
+   /cache/stats (GET):
+   - Response cache entries, hits, misses, bypasses and hit rate per channel
+   - Research (Sonar) cache entries, exact/semantic hits and evictions
+   - Query decomposer cache hits, classifier skips and skip rate
+
+   /metrics/latency (GET):
+   - Per channel p50/p95/mean time to first token and response time
+   - Time to first token is the tracked user-facing latency metric
+
+7. /clear-context (POST):
    - Context clearing
    - User session management
    - Success confirmation
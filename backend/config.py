@@ -15,16 +15,88 @@ class Config:
     
     # Database Configuration
     CHROMA_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'chromadb')
+    EMBEDDING_ARTIFACT_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'health_knowledge', 'embeddings')
+    LAZY_DB_INIT = os.getenv('LAZY_DB_INIT', 'true').lower() == 'true'  # warm up in the background
+    COLLECTION_COUNT_TTL = 30  # seconds before a cached collection count is revalidated
+    EMBEDDING_CACHE_SIZE = 2048  # in-process LRU entries
+    EMBEDDING_CACHE_DISK_SIZE = 100000  # SQLite entries shared across workers
+    USE_MEMORY_INDEX = os.getenv('USE_MEMORY_INDEX', 'true').lower() == 'true'
+    MEMORY_INDEX_MAX_ITEMS = 50000  # larger collections are served by Chroma
+    INDEX_PRECISION = os.getenv('INDEX_PRECISION', 'float32')  # float32 / float16 / int8
+    INDEX_RERANK_FACTOR = 4  # quantized candidates per result rescored at float32
+    WRITE_BEHIND_ENABLED = os.getenv('WRITE_BEHIND_ENABLED', 'true').lower() == 'true'
+    WRITE_BATCH_SIZE = 64  # records per background flush
+    WRITE_FLUSH_INTERVAL = 1.0  # seconds before a partial batch is flushed
+    WRITE_QUEUE_SIZE = 10000  # pending records before writes fall back inline
+    HYBRID_SEARCH_ENABLED = os.getenv('HYBRID_SEARCH_ENABLED', 'true').lower() == 'true'
+    HYBRID_CANDIDATES = 10  # vector and BM25 candidates fused per collection
+    RAG_RESULTS_PER_COLLECTION = 3  # fused results kept per collection
+    PROFILE_CACHE_SIZE = 1024  # cached user profiles per process
+    PROFILE_CACHE_TTL = 30  # seconds before a cached profile is re-read
+    PERSONALIZATION_MODE = os.getenv('PERSONALIZATION_MODE', 'vector')  # vector / text / off
+    PERSONALIZATION_WEIGHT = 0.2  # share of the user's topic vector in the blended query
+    CHAT_HISTORY_SHARDS = int(os.getenv('CHAT_HISTORY_SHARDS', '1'))  # hashed chat_history collections (1 = the single collection)
+    CHAT_RETENTION_ENABLED = os.getenv('CHAT_RETENTION_ENABLED', 'true').lower() == 'true'
+    CHAT_RETENTION_DAYS = {
+        "streamlit": 30,
+        "whatsapp": 90
+    }
+    CHAT_RETENTION_INTERVAL = 6 * 3600  # seconds between retention runs
     
     # Model Configuration
     GEMINI_FLASH_MODEL = "gemini-1.5-flash"
     GEMINI_PRO_MODEL = "gemini-1.5-pro"
     SONAR_MODEL = "llama-3.1-sonar-small-128k-online"
+    GEMINI_MAX_CONCURRENCY = int(os.getenv('GEMINI_MAX_CONCURRENCY', '16'))  # pooled in-flight Gemini calls
+    GENERATION_MODE = {  # two_pass (reasoning + rewrite) or single_pass (one JSON call)
+        "streamlit": os.getenv('STREAMLIT_GENERATION_MODE', 'two_pass'),
+        "whatsapp": os.getenv('WHATSAPP_GENERATION_MODE', 'single_pass')
+    }
     
     # Chat Configuration
     MAX_CHAT_HISTORY = 10
     MAX_SUB_QUERIES = 4
     
+    # FAQ Fast Path Configuration
+    FAQ_FAST_PATH_ENABLED = os.getenv('FAQ_FAST_PATH_ENABLED', 'true').lower() == 'true'
+    FAQ_MATCH_THRESHOLD = 0.35  # max squared L2 distance (~0.82 cosine similarity)
+    
+    # Response Cache Configuration
+    RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+    RESPONSE_CACHE_MAX_DISTANCE = 0.1  # max squared L2 distance (~0.95 cosine similarity)
+    RESPONSE_CACHE_TTL = 3600  # seconds a cached answer is served
+    RESPONSE_CACHE_SIZE = 1000  # cached answers (LRU)
+    
+    # Research Cache Configuration (Sonar results per sub-query)
+    RESEARCH_CACHE_ENABLED = os.getenv('RESEARCH_CACHE_ENABLED', 'true').lower() == 'true'
+    RESEARCH_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'cache', 'research_cache.sqlite3')
+    RESEARCH_CACHE_TTL = 7 * 86400  # seconds a research summary stays valid
+    RESEARCH_CACHE_SIZE = 5000  # stored sub-queries (LRU beyond this)
+    RESEARCH_CACHE_SEMANTIC = True  # also match differently worded sub-queries
+    RESEARCH_CACHE_MAX_DISTANCE = 0.08  # max squared L2 distance for a semantic match
+    
+    # Query Decomposition Configuration
+    DECOMPOSITION_CACHE_SIZE = 1000  # memoized decompositions (LRU)
+    RESEARCH_CLASSIFIER_ENABLED = os.getenv('RESEARCH_CLASSIFIER_ENABLED', 'true').lower() == 'true'
+    RESEARCH_CLASSIFIER_MAX_DISTANCE = 0.6  # max squared L2 distance to a labelled example
+    RESEARCH_CLASSIFIER_NEIGHBOURS = 3  # nearest examples that must agree
+    
+    # Prompt Context Budgets (estimated tokens per channel)
+    CONTEXT_TOKEN_BUDGETS = {
+        "rag": 600,
+        "profile": 150,
+        "research": 2500
+    }
+    CONTEXT_MAX_DISTANCE = 1.6  # drop retrieved snippets farther than this (squared L2)
+    CONTEXT_SOURCE_PRIORITY = {
+        "faqs": 1.0,
+        "health_tips": 0.8,
+        "products": 0.6,
+        "user_history": 0.5,
+        "profile": 1.0,
+        "research": 1.0
+    }
+    
     # Response Configuration
     DEFAULT_RESPONSE = "I apologize, but I'm having trouble processing your request. Please try again."
     SAFETY_WARNING = "For your safety, please consult a healthcare professional for accurate advice."
@@ -56,6 +128,18 @@ Configuration Categories:
 
 2. Database Settings:
    - ChromaDB path configuration
+   - Precomputed embedding artifact location
+   - Lazy initialization with background warmup
+   - Collection count cache TTL
+   - Embedding cache sizes (memory and disk tiers)
+   - In-memory knowledge index toggle, size limit and vector precision
+   - Write-behind batching for chat and feedback
+   - Hybrid (BM25 + vector) retrieval settings
+   - User profile cache size and TTL
+   - Retrieval personalization mode and topic vector weight
+   - Chat history shard count (default 1, the single collection; migrate
+     with database/migrate_chat_history.py before raising it)
+   - Chat history retention (TTL days per channel, run interval)
    - Persistent storage location
    - Database structure settings
 
@@ -63,23 +147,36 @@ Configuration Categories:
    - Gemini Flash (fast queries)
    - Gemini Pro (detailed responses)
    - Sonar Model (research queries)
+   - Response generation mode per channel (two_pass / single_pass)
+   - Maximum concurrent Gemini calls (thread pool size)
 
 4. Chat Settings:
    - Maximum chat history
    - Maximum sub-queries
    - Response limitations
+   - FAQ fast path toggle and match threshold
+
+5. Response and Research Caches:
+   - Toggle, similarity threshold, TTL and size of the semantic answer cache
+   - Location, TTL, size and semantic matching of the Sonar result cache
+   - Decomposition cache size and the local no-research classifier
+
+6. Prompt Context Budgets:
+   - Token budget per channel (rag, profile, research)
+   - Distance cutoff for retrieved snippets
+   - Source priorities for snippet scoring
 
-5. Response Templates:
+7. Response Templates:
    - Default error responses
    - Safety warnings
    - System messages
 
-6. Session Management:
+8. Session Management:
    - Timeout settings
    - Session persistence
    - State management
 
-7. WhatsApp Integration:
+9. WhatsApp Integration:
    - Feature toggle
    - Credential validation
    - Number configuration
@@ -0,0 +1,141 @@
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Tuple
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "for", "from",
+    "how", "i", "in", "is", "it", "my", "of", "on", "or", "should", "that", "the",
+    "to", "what", "with", "you", "your"
+}
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+class BM25Index:
+    def __init__(self, name: str, k1: float = 1.5, b: float = 0.75):
+        self.name = name
+        self.k1 = k1
+        self.b = b
+        self.ids: List[str] = []
+        self.documents: List[str] = []
+        self.metadatas: List[Dict] = []
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+        self._doc_lengths: List[int] = []
+        self._avg_length = 0.0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @staticmethod
+    def _searchable_text(document: str, metadata: Dict) -> str:
+        """Index the document plus short name-like metadata (e.g. product name)"""
+        extra = [str(metadata[field]) for field in ("name", "category") if metadata.get(field)]
+        return " ".join([document] + extra)
+
+    def build(self, ids: List[str], documents: List[str], metadatas: List[Dict]):
+        """Build the inverted index from parallel lists"""
+        self.ids = list(ids)
+        self.documents = list(documents)
+        self.metadatas = [metadata or {} for metadata in metadatas]
+
+        postings = defaultdict(list)
+        self._doc_lengths = []
+        for position, (document, metadata) in enumerate(zip(self.documents, self.metadatas)):
+            tokens = tokenize(self._searchable_text(document or "", metadata))
+            self._doc_lengths.append(len(tokens))
+            for term, frequency in Counter(tokens).items():
+                postings[term].append((position, frequency))
+
+        self._postings = dict(postings)
+        self._avg_length = sum(self._doc_lengths) / len(self._doc_lengths) if self._doc_lengths else 0.0
+
+    def _idf(self, term: str) -> float:
+        document_frequency = len(self._postings.get(term, ()))
+        return math.log(1 + (len(self) - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    def query(self, text: str, n_results: int) -> Dict:
+        """Get the top n_results documents by BM25 score"""
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(text)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf(term)
+            for position, frequency in postings:
+                length_norm = 1 - self.b + self.b * self._doc_lengths[position] / (self._avg_length or 1.0)
+                scores[position] += idf * frequency * (self.k1 + 1) / (frequency + self.k1 * length_norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:n_results]
+        return {
+            'ids': [self.ids[position] for position, _ in ranked],
+            'documents': [self.documents[position] for position, _ in ranked],
+            'metadatas': [self.metadatas[position] for position, _ in ranked],
+            'scores': [score for _, score in ranked]
+        }
+
+def reciprocal_rank_fusion(result_lists: List[Dict], limit: int, k: int = 60) -> Dict:
+    """Fuse ranked result lists by reciprocal rank, keeping the first seen document/metadata"""
+    fused: Dict[str, float] = defaultdict(float)
+    entries: Dict[str, Dict] = {}
+
+    for results in result_lists:
+        distances = results.get('distances') or [None] * len(results['ids'])
+        for rank, (item_id, document, metadata, distance) in enumerate(
+            zip(results['ids'], results['documents'], results['metadatas'], distances)
+        ):
+            fused[item_id] += 1.0 / (k + rank + 1)
+            entry = entries.setdefault(item_id, {
+                'document': document,
+                'metadata': metadata,
+                'distance': None
+            })
+            if distance is not None:
+                entry['distance'] = distance
+
+    ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:limit]
+    return {
+        'ids': [item_id for item_id, _ in ranked],
+        'documents': [entries[item_id]['document'] for item_id, _ in ranked],
+        'metadatas': [entries[item_id]['metadata'] for item_id, _ in ranked],
+        'distances': [entries[item_id]['distance'] for item_id, _ in ranked],
+        'scores': [score for _, score in ranked]
+    }
+
+
+
+"""
+BM25Index: In-Process Keyword Index for Hybrid Retrieval
+
+This module provides an inverted index with Okapi BM25 scoring over the static
+knowledge collections (health tips, products, FAQs), and reciprocal rank fusion
+(RRF) to merge its rankings with vector search results.
+
+Why Keyword Search:
+- Dense embeddings blur exact terms such as product names or ingredients
+  ("melatonin", "magnesium")
+- BM25 ranks documents containing those exact terms first
+- Fusing both rankings lets retrieval return fewer, better candidates
+
+Indexing:
+- Lowercased alphanumeric tokens, common stopwords removed
+- Product name and category metadata are indexed with the document text
+- Postings lists: term -> [(document position, term frequency)]
+
+Scoring:
+- BM25 with k1 = 1.5, b = 0.75
+- idf = log(1 + (N - df + 0.5) / (df + 0.5))
+
+Fusion:
+- reciprocal_rank_fusion(): score = sum over lists of 1 / (k + rank), k = 60
+- Vector distances are carried through; keyword-only hits have distance None
+
+Usage Example:
+index = BM25Index("products")
+index.build(ids, documents, metadatas)
+keyword_results = index.query("melatonin supplement", 10)
+fused = reciprocal_rank_fusion([vector_results, keyword_results], limit=3)
+"""
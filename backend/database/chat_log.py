@@ -0,0 +1,218 @@
+import math
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+class ChatLog:
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS chat_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                timestamp REAL NOT NULL,
+                channel TEXT NOT NULL DEFAULT 'streamlit',
+                message TEXT NOT NULL,
+                response TEXT NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_chat_log_user_time ON chat_log (user_id, timestamp, id)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_chat_log_channel_time ON chat_log (channel, timestamp)"
+        )
+        self._conn.commit()
+
+    def append(
+        self,
+        user_id: str,
+        message: str,
+        response: str,
+        channel: str = "streamlit",
+        timestamp: Optional[float] = None
+    ) -> int:
+        """Append one chat turn and return its row id"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO chat_log (user_id, timestamp, channel, message, response) VALUES (?, ?, ?, ?, ?)",
+                (user_id, timestamp or datetime.now().timestamp(), channel, message, response)
+            )
+            self._conn.commit()
+            return cursor.lastrowid
+
+    def append_many(self, records: List[Dict]):
+        """Append several chat turns in one transaction"""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO chat_log (user_id, timestamp, channel, message, response) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        record["user_id"],
+                        record.get("timestamp") or datetime.now().timestamp(),
+                        record.get("channel", "streamlit"),
+                        record["message"],
+                        record["response"]
+                    )
+                    for record in records
+                ]
+            )
+            self._conn.commit()
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM chat_log LIMIT 1").fetchone() is None
+
+    def import_if_empty(self, records: List[Dict]) -> int:
+        """Append turns only if the log has none yet; returns how many were imported"""
+        with self._lock:
+            # The check and the insert share one write transaction, so of several
+            # workers starting at once only the first imports
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if self._conn.execute("SELECT 1 FROM chat_log LIMIT 1").fetchone():
+                    self._conn.rollback()
+                    return 0
+                self._conn.executemany(
+                    "INSERT INTO chat_log (user_id, timestamp, channel, message, response) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (
+                            record["user_id"],
+                            record["timestamp"],
+                            record.get("channel", "streamlit"),
+                            record["message"],
+                            record["response"]
+                        )
+                        for record in sorted(records, key=lambda record: record["timestamp"])
+                    ]
+                )
+                self._conn.commit()
+                return len(records)
+            except Exception:
+                self._conn.rollback()
+                raise
+
+    @staticmethod
+    def _to_entry(row) -> Dict:
+        return {
+            "id": row["id"],
+            "user_id": row["user_id"],
+            "channel": row["channel"],
+            "message": row["message"],
+            "response": row["response"],
+            "timestamp": datetime.fromtimestamp(row["timestamp"]).isoformat()
+        }
+
+    def get_page(self, user_id: str, limit: int = 10, cursor: Optional[str] = None) -> Dict:
+        """Get a page of turns, newest first, continuing from an opaque cursor
+
+        Raises ValueError for a malformed cursor or a limit below 1.
+        """
+        if limit < 1:
+            # SQLite treats a negative LIMIT as no limit
+            raise ValueError(f"Invalid limit: {limit}")
+        query = "SELECT * FROM chat_log WHERE user_id = ?"
+        params: list = [user_id]
+
+        if cursor:
+            before_ts, before_id = self._parse_cursor(cursor)
+            query += " AND (timestamp < ? OR (timestamp = ? AND id < ?))"
+            params += [before_ts, before_ts, before_id]
+
+        query += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = None
+        if has_more and rows:
+            next_cursor = f"{rows[-1]['timestamp']!r}:{rows[-1]['id']}"
+
+        return {
+            "messages": [self._to_entry(row) for row in rows],
+            "next_cursor": next_cursor
+        }
+
+    @staticmethod
+    def _parse_cursor(cursor: str):
+        """Split a "<timestamp>:<id>" cursor (the last row of the previous page)"""
+        parts = cursor.split(":")
+        if len(parts) != 2:
+            raise ValueError(f"Invalid cursor: {cursor}")
+        before_ts, before_id = float(parts[0]), int(parts[1])
+        if not math.isfinite(before_ts):
+            raise ValueError(f"Invalid cursor: {cursor}")
+        return before_ts, before_id
+
+    def get_recent(self, user_id: str, limit: int = 10) -> List[Dict]:
+        """Get the latest turns for a user in chronological order"""
+        return list(reversed(self.get_page(user_id, limit)["messages"]))
+
+    def delete_before(self, channel: str, cutoff: float) -> int:
+        """Delete a channel's turns older than cutoff (POSIX seconds)"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM chat_log WHERE channel = ? AND timestamp < ?",
+                (channel, cutoff)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def vacuum(self):
+        """Reclaim space left by deleted rows"""
+        with self._lock:
+            self._conn.execute("VACUUM")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+
+"""
+ChatLog: Append-Only Chronological Chat Store for Health Chatbot
+
+This class keeps every chat turn in a SQLite table indexed on
+(user_id, timestamp, id) and (channel, timestamp), so per-user history is read in time order with an
+index range scan instead of a semantic query against the vector store.
+
+Table Structure:
+chat_log:
+   - id: autoincrement row id (tie-breaker for equal timestamps)
+   - user_id: user identifier
+   - timestamp: POSIX seconds
+   - channel: streamlit / whatsapp
+   - message, response: the turn text
+
+Pagination:
+- get_page() returns turns newest first plus a next_cursor
+- The cursor encodes the (timestamp, id) of the last returned row
+- A malformed cursor or a limit below 1 raises ValueError (/history: 400)
+- Each page costs O(log N + page size)
+
+Methods:
+- append(): Stores one turn
+- append_many(): Stores a batch of turns in one transaction
+- import_if_empty(): One-time import of turns from an older store; a no-op
+  once the log holds any turn
+- get_page(): Cursor-paginated, time-ordered reads
+- get_recent(): Latest turns, oldest first
+- delete_before() / vacuum(): Retention support
+
+Usage Example:
+chat_log = ChatLog(os.path.join(persist_directory, "chat_log.sqlite3"))
+chat_log.append("user123", "How can I sleep better?", "Try a regular schedule...")
+page = chat_log.get_page("user123", limit=20)
+older = chat_log.get_page("user123", limit=20, cursor=page["next_cursor"])
+"""
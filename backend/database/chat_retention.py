@@ -0,0 +1,269 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+DAY_SECONDS = 86400
+
+def directory_size(path: str) -> int:
+    """Total size in bytes of all files under path"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                continue
+    return total
+
+class ChatRetentionJob:
+    def __init__(
+        self,
+        db_manager,
+        ttl_days: Dict[str, float],
+        default_ttl_days: float = 30,
+        batch_size: int = 500,
+        interval_seconds: float = 21600,
+        max_summary_questions: int = 10,
+        compact: bool = True
+    ):
+        self.db_manager = db_manager
+        self.ttl_days = ttl_days
+        self.default_ttl_days = default_ttl_days
+        self.batch_size = batch_size
+        self.interval_seconds = interval_seconds
+        self.max_summary_questions = max_summary_questions
+        self.compact_after_run = compact
+
+        self.last_metrics: Optional[Dict] = None
+        self._legacy_backfilled = set()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _measure(self) -> Dict:
+        """Collection size and on-disk footprint"""
+        return {
+            "chat_history_count": sum(shard.count() for shard in self.db_manager.chat_history_shards),
+            "disk_bytes": directory_size(self.db_manager.persist_directory)
+        }
+
+    def _backfill_legacy(self, collection):
+        """Add numeric ts/channel metadata to turns written before they existed"""
+        offset = 0
+        updated = 0
+        while True:
+            page = collection.get(include=["metadatas"], limit=self.batch_size, offset=offset)
+            if not page["ids"]:
+                break
+
+            ids, metadatas = [], []
+            for item_id, metadata in zip(page["ids"], page["metadatas"]):
+                metadata = metadata or {}
+                if "ts" in metadata or metadata.get("type") == "summary":
+                    continue
+                try:
+                    ts = datetime.fromisoformat(metadata["timestamp"]).timestamp()
+                except (KeyError, ValueError):
+                    ts = time.time()
+                ids.append(item_id)
+                metadatas.append({**metadata, "ts": ts, "channel": metadata.get("channel", "streamlit")})
+
+            if ids:
+                collection.update(ids=ids, metadatas=metadatas)
+                updated += len(ids)
+            offset += len(page["ids"])
+
+        if updated:
+            print(f"Backfilled ts/channel metadata on {updated} legacy chat turns")
+
+    @staticmethod
+    def _question(document: str) -> str:
+        """First line of a "User: ...\\nBot: ..." transcript, without the prefix"""
+        first_line = document.split("\n", 1)[0]
+        if first_line.startswith("User: "):
+            first_line = first_line[len("User: "):]
+        return first_line[:80]
+
+    def _rollup(self, collection, documents: List[str], metadatas: List[Dict]) -> int:
+        """Merge expired turns into one summary document per user"""
+        by_user: Dict[str, List[tuple]] = {}
+        for document, metadata in zip(documents, metadatas):
+            by_user.setdefault(metadata.get("user_id", "unknown"), []).append((metadata.get("ts", 0.0), document))
+
+        summary_ids = [f"summary_{user_id}" for user_id in by_user]
+        existing = collection.get(ids=summary_ids, include=["metadatas"])
+        existing_by_id = dict(zip(existing["ids"], existing["metadatas"]))
+
+        ids, summary_documents, summary_metadatas = [], [], []
+        for user_id, turns in by_user.items():
+            turns.sort()
+            previous = existing_by_id.get(f"summary_{user_id}") or {}
+            questions = json.loads(previous.get("recent_questions", "[]"))
+            questions = (questions + [self._question(document) for _, document in turns])[-self.max_summary_questions:]
+
+            turn_count = previous.get("turns", 0) + len(turns)
+            first_ts = min(previous.get("first_ts", turns[0][0]), turns[0][0])
+            last_ts = max(previous.get("last_ts", turns[-1][0]), turns[-1][0])
+
+            ids.append(f"summary_{user_id}")
+            summary_documents.append(
+                f"Conversation summary for {user_id} ({turn_count} turns, "
+                f"{datetime.fromtimestamp(first_ts):%Y-%m-%d} to {datetime.fromtimestamp(last_ts):%Y-%m-%d}). "
+                f"Earlier questions: {'; '.join(questions)}"
+            )
+            summary_metadatas.append({
+                "user_id": user_id,
+                "type": "summary",
+                "turns": turn_count,
+                "first_ts": first_ts,
+                "last_ts": last_ts,
+                "recent_questions": json.dumps(questions)
+            })
+
+        collection.upsert(ids=ids, documents=summary_documents, metadatas=summary_metadatas)
+        return len(ids)
+
+    def _expire_channel(self, collection, channel: str, cutoff: float) -> Dict:
+        """Roll up and delete a channel's turns older than cutoff, one batch at a time"""
+        stats = {"deleted": 0, "summary_updates": 0}
+        where = {"$and": [{"channel": channel}, {"ts": {"$lt": cutoff}}]}
+
+        while True:
+            batch = collection.get(where=where, include=["documents", "metadatas"], limit=self.batch_size)
+            if not batch["ids"]:
+                break
+            stats["summary_updates"] += self._rollup(collection, batch["documents"], batch["metadatas"])
+            collection.delete(ids=batch["ids"])
+            stats["deleted"] += len(batch["ids"])
+
+        return stats
+
+    def compact(self) -> Dict:
+        """VACUUM the chat log to reclaim space left by deleted turns"""
+        # Chroma's own files are left to Chroma: a VACUUM from outside the live
+        # client needs an exclusive lock that blocks its writers, and it would
+        # not shrink the HNSW segments anyway
+        result = {"chat_log": False}
+        try:
+            self.db_manager.chat_log.vacuum()
+            result["chat_log"] = True
+        except Exception as e:
+            print(f"Error compacting chat log: {str(e)}")
+        return result
+
+    def run_once(self) -> Optional[Dict]:
+        """Apply retention to every channel, then compact"""
+        if not self.db_manager.is_ready():
+            print("Skipping chat retention: database not ready")
+            return None
+
+        try:
+            # Let queued chat writes land so they are measured and aged consistently
+            self.db_manager.flush()
+            shards = self.db_manager.chat_history_shards
+            for shard in shards:
+                if shard.name not in self._legacy_backfilled:
+                    self._backfill_legacy(shard)
+                    self._legacy_backfilled.add(shard.name)
+
+            metrics = {
+                "started_at": datetime.now().isoformat(),
+                "before": self._measure(),
+                "channels": {}
+            }
+
+            now = time.time()
+            channels = set(self.ttl_days) | {"streamlit", "whatsapp"}
+            for channel in sorted(channels):
+                cutoff = now - self.ttl_days.get(channel, self.default_ttl_days) * DAY_SECONDS
+                channel_stats = {"deleted": 0, "summary_updates": 0}
+                for shard in shards:
+                    shard_stats = self._expire_channel(shard, channel, cutoff)
+                    channel_stats["deleted"] += shard_stats["deleted"]
+                    channel_stats["summary_updates"] += shard_stats["summary_updates"]
+                channel_stats["log_deleted"] = self.db_manager.chat_log.delete_before(channel, cutoff)
+                metrics["channels"][channel] = channel_stats
+
+            for shard in shards:
+                self.db_manager.invalidate_count(shard)
+            if self.compact_after_run:
+                metrics["compaction"] = self.compact()
+            metrics["after"] = self._measure()
+
+            print(
+                f"Chat retention: {metrics['before']['chat_history_count']} -> "
+                f"{metrics['after']['chat_history_count']} turns, "
+                f"{metrics['before']['disk_bytes']} -> {metrics['after']['disk_bytes']} bytes"
+            )
+            self.last_metrics = metrics
+            return metrics
+
+        except Exception as e:
+            print(f"Error running chat retention: {str(e)}")
+            return None
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            self.run_once()
+
+    def start(self):
+        """Run the job every interval_seconds in a daemon thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="chat-retention", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+
+"""
+ChatRetentionJob: Retention, Rollup and Compaction for Chat History
+
+This class keeps the chat_history shards (and the chat log) from growing
+without bound. Old turns are rolled up into one summary document per user and
+then deleted in batches, after which the chat log is compacted.
+
+Retention Policy:
+- TTL in days per channel (e.g. {"streamlit": 30, "whatsapp": 90})
+- Channels without an explicit TTL use default_ttl_days
+- Turns are selected with a metadata filter on channel and numeric ts,
+  shard by shard; a user's summary lives in the same shard as their turns
+- Turns written before ts/channel metadata existed are backfilled once
+  (ts parsed from the ISO timestamp, channel defaults to streamlit)
+
+Rollup:
+- Expired turns are grouped by user_id
+- Each user gets a summary_<user_id> document (metadata type="summary")
+  with turn count, first/last timestamps and the most recent questions
+- Existing summaries are merged, so repeated runs accumulate
+
+Deletion:
+- At most batch_size turns are fetched, summarized and deleted per step
+- Matching chat log rows are deleted with the same cutoff
+
+Compaction:
+- VACUUM on chat_log.sqlite3 (through the chat log's own connection, so it
+  is serialized with chat log writes)
+- Chroma storage (chroma.sqlite3 and HNSW segments) is not touched: an
+  external VACUUM would lock out the live client's writers, and deleted
+  vectors are managed by Chroma itself
+
+Metrics (run_once() return value / last_metrics):
+{
+    "started_at": ISO timestamp,
+    "before": {"chat_history_count": int, "disk_bytes": int},
+    "channels": {channel: {"deleted": int, "summary_updates": int, "log_deleted": int}},
+    "compaction": {"chat_log": bool},
+    "after": {"chat_history_count": int, "disk_bytes": int}
+}
+
+Usage Example:
+job = ChatRetentionJob(db_manager, {"streamlit": 30, "whatsapp": 90})
+job.start()          # every interval_seconds in the background
+metrics = job.run_once()
+"""
@@ -1,19 +1,146 @@
 import chromadb
 from chromadb.utils import embedding_functions
+import atexit
+import hashlib
+import json
 import os
+import threading
+import time
+import zlib
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional
+from .bm25_index import BM25Index, reciprocal_rank_fusion
+from .chat_log import ChatLog
+from .embedding_artifacts import iter_artifact_items, read_manifest
+from .embedding_cache import EmbeddingCache
+from .feedback_store import FeedbackStore
+from .knowledge_index import KnowledgeIndex
+from .profile_store import ProfileStore
+from .topic_vectors import TopicVectors
+from .write_behind import WriteBehindQueue
 
 class ChromaDBManager:
-    def __init__(self, persist_directory: str):
+    def __init__(
+        self,
+        persist_directory: str,
+        count_ttl: float = 30.0,
+        embedding_cache_size: int = 2048,
+        embedding_cache_disk_size: int = 100000,
+        use_memory_index: bool = True,
+        memory_index_max_items: int = 50000,
+        write_behind: bool = True,
+        write_batch_size: int = 64,
+        write_flush_interval: float = 1.0,
+        write_queue_size: int = 10000,
+        hybrid_search: bool = True,
+        hybrid_candidates: int = 10,
+        lazy: bool = False,
+        artifact_dir: Optional[str] = None,
+        profile_cache_size: int = 1024,
+        profile_cache_ttl: float = 30.0,
+        personalization_mode: str = "vector",
+        personalization_weight: float = 0.2,
+        chat_history_shards: int = 1,
+        index_precision: str = "float32",
+        index_rerank_factor: int = 4
+    ):
         self.persist_directory = persist_directory
+        # Cached collection sizes: name -> (count, time the count was read)
+        self.count_ttl = count_ttl
+        self._collection_counts: Dict[str, tuple] = {}
         # Ensure directory exists
         os.makedirs(persist_directory, exist_ok=True)
         
+        self.embedding_cache_size = embedding_cache_size
+        self.embedding_cache_disk_size = embedding_cache_disk_size
+        # Read-only in-memory indexes for the small, static knowledge collections
+        self.use_memory_index = use_memory_index
+        self.memory_index_max_items = memory_index_max_items
+        self.static_collections = ("health_tips", "products", "faqs")
+        self.memory_indexes: Dict[str, KnowledgeIndex] = {}
+        # float16/int8 matrices; exact float32 rows are memory-mapped for reranking
+        self.index_precision = index_precision
+        self.index_rerank_factor = index_rerank_factor
+        # BM25 keyword indexes fused with vector results in get_relevant_content
+        self.hybrid_search = hybrid_search
+        self.hybrid_candidates = hybrid_candidates
+        self.keyword_indexes: Dict[str, BM25Index] = {}
+        # Precomputed knowledge embeddings loaded at initialization, if present
+        self.artifact_dir = artifact_dir
+        self.artifact_load_stats: Dict[str, Dict] = {}
+        # Profile personalization: "vector" (blend topic centroids), "text" or "off"
+        self.personalization_mode = personalization_mode
+        self.personalization_weight = personalization_weight
+        self.topic_vectors = TopicVectors()
+        
+        # Chat turns are hashed by user_id over this many chat_history collections
+        self.chat_shard_count = max(1, chat_history_shards)
+        
+        # Time-ordered chat log used for history reads
+        self.chat_log = ChatLog(os.path.join(persist_directory, "chat_log.sqlite3"))
+        # Feedback rows and running rating aggregates (not embedded)
+        self.feedback_store = FeedbackStore(os.path.join(persist_directory, "feedback.sqlite3"))
+        # User profiles as versioned JSON keyed by user_id, behind an LRU cache
+        self.profile_store = ProfileStore(
+            os.path.join(persist_directory, "profiles.sqlite3"),
+            cache_size=profile_cache_size,
+            cache_ttl=profile_cache_ttl
+        )
+
+        # Chat and feedback writes are batched in the background, off the request path
+        self.write_queue = None
+        if write_behind:
+            self.write_queue = WriteBehindQueue(
+                self._write_records,
+                max_batch=write_batch_size,
+                flush_interval=write_flush_interval,
+                max_queue=write_queue_size,
+                dead_letter_path=os.path.join(persist_directory, "write_dead_letter.jsonl")
+            )
+            atexit.register(self.close)
+
+        # Model, client and collections are opened on first use (or by warmup())
+        self._init_lock = threading.RLock()
+        self._initialized = False
+        self._initializing = False
+        self._warmed_up = False
+        self.init_error: Optional[str] = None
+        if not lazy:
+            self._ensure_ready()
+
+    def _ensure_ready(self):
+        """Initialize the model, client and collections once, on first use"""
+        if self._initialized:
+            return
+        with self._init_lock:
+            # Re-entrant calls made while initializing must not start over
+            if self._initialized or self._initializing:
+                return
+            self._initializing = True
+            try:
+                self._initialize()
+                self._initialized = True
+                self.init_error = None
+            except Exception as e:
+                self.init_error = str(e)
+                raise
+            finally:
+                self._initializing = False
+
+    def _initialize(self):
+        """Open the embedding model, Chroma client, collections and indexes"""
         # Initialize embedding function
         self.embedding_function = embedding_functions.DefaultEmbeddingFunction()
         
-        self.client = chromadb.PersistentClient(path=persist_directory)
+        # Query embeddings are cached in memory and in a SQLite file shared by workers
+        self.embedding_cache = EmbeddingCache(
+            os.path.join(self.persist_directory, "embedding_cache.sqlite3"),
+            namespace=type(self.embedding_function).__name__,
+            memory_size=self.embedding_cache_size,
+            disk_size=self.embedding_cache_disk_size
+        )
+        
+        self.client = chromadb.PersistentClient(path=self.persist_directory)
         
         # Create collections with embedding function
         self.health_tips = self.client.get_or_create_collection(
@@ -24,27 +151,296 @@ class ChromaDBManager:
             name="products",
             embedding_function=self.embedding_function
         )
-        self.chat_history = self.client.get_or_create_collection(
-            name="chat_history",
-            embedding_function=self.embedding_function
-        )
-        self.feedback = self.client.get_or_create_collection(
-            name="feedback",
-            embedding_function=self.embedding_function
-        )
-        self.user_profiles = self.client.get_or_create_collection(
-            name="user_profiles",
+        self.chat_history_shards = [
+            self.client.get_or_create_collection(
+                name=self.chat_shard_name(shard),
+                embedding_function=self.embedding_function
+            )
+            for shard in range(self.chat_shard_count)
+        ]
+        self._check_chat_layout()
+        # Profiles written before ProfileStore existed are migrated on first read
+        self.user_profiles = None
+        if "user_profiles" in [collection.name for collection in self.client.list_collections()]:
+            self.user_profiles = self.client.get_collection(
+                name="user_profiles",
+                embedding_function=self.embedding_function
+            )
+        self.faqs = self.client.get_or_create_collection(
+            name="faqs",
             embedding_function=self.embedding_function
         )
 
+        self._migrate_legacy_feedback()
+        self._migrate_legacy_chat_log()
+
+        # Knowledge collections searched together by get_relevant_content
+        self.knowledge_collections = {
+            "health_tips": self.health_tips,
+            "products": self.products,
+            "faqs": self.faqs
+        }
+
+        # Load precomputed embeddings first, so fresh deployments never embed defaults
+        if self.artifact_dir:
+            self.load_artifacts(self.artifact_dir)
+
         # Initialize with default data
         self._initialize_default_data()
 
+        if self.use_memory_index or self.hybrid_search:
+            for name in self.static_collections:
+                self.refresh_memory_index(name)
+
+    def _check_chat_layout(self):
+        """Warn when chat history was stored with a different shard count"""
+        try:
+            existing_chat_collections = {
+                collection.name for collection in self.client.list_collections()
+                if collection.name.startswith("chat_history")
+            } - {shard.name for shard in self.chat_history_shards}
+            
+            marker_path = os.path.join(self.persist_directory, "chat_shards.json")
+            recorded = None
+            if os.path.exists(marker_path):
+                with open(marker_path, "r", encoding="utf-8") as file:
+                    recorded = json.load(file).get("shard_count")
+            
+            # Shards reused by name (e.g. 4 -> 6) hold turns hashed with the old count
+            if existing_chat_collections or (recorded is not None and recorded != self.chat_shard_count):
+                print(
+                    f"Chat history was stored with {recorded or 'another'} shard(s) "
+                    f"(found {sorted(existing_chat_collections) or 'no other collections'}); "
+                    f"run python -m database.migrate_chat_history --shards {self.chat_shard_count}"
+                )
+            elif recorded is None:
+                self.record_chat_shard_count()
+                
+        except Exception as e:
+            print(f"Error checking chat history layout: {str(e)}")
+
+    def record_chat_shard_count(self):
+        """Remember the shard count the chat history is laid out with"""
+        marker_path = os.path.join(self.persist_directory, "chat_shards.json")
+        with open(marker_path, "w", encoding="utf-8") as file:
+            json.dump({"shard_count": self.chat_shard_count}, file)
+
+    def _migrate_legacy_feedback(self):
+        """Copy feedback from the old Chroma collection into the feedback store once"""
+        try:
+            if self.feedback_store.count():
+                return
+            if "feedback" not in [collection.name for collection in self.client.list_collections()]:
+                return
+            legacy = self.client.get_collection(name="feedback", embedding_function=self.embedding_function)
+            
+            offset = 0
+            migrated = 0
+            while True:
+                page = legacy.get(include=["documents", "metadatas"], limit=500, offset=offset)
+                if not page["ids"]:
+                    break
+                records = []
+                for comment, metadata in zip(page["documents"], page["metadatas"]):
+                    metadata = metadata or {}
+                    if metadata.get("rating") is None:
+                        continue
+                    try:
+                        timestamp = datetime.fromisoformat(metadata["timestamp"]).timestamp()
+                    except (KeyError, TypeError, ValueError):
+                        timestamp = None
+                    records.append({
+                        "user_id": metadata.get("user_id", "unknown"),
+                        "rating": metadata["rating"],
+                        "comment": comment or "",
+                        "timestamp": timestamp
+                    })
+                if records:
+                    self.feedback_store.add_many(records)
+                migrated += len(records)
+                offset += len(page["ids"])
+            
+            if migrated:
+                print(f"Migrated {migrated} feedback entries from Chroma to the feedback store")
+                
+        except Exception as e:
+            print(f"Error migrating legacy feedback: {str(e)}")
+
+    def _migrate_legacy_chat_log(self):
+        """Copy chat turns written before the chat log existed into it once"""
+        try:
+            if not self.chat_log.is_empty():
+                return
+            
+            records = []
+            for collection in self.client.list_collections():
+                if not collection.name.startswith("chat_history"):
+                    continue
+                legacy = self.client.get_collection(name=collection.name, embedding_function=self.embedding_function)
+                offset = 0
+                while True:
+                    page = legacy.get(include=["documents", "metadatas"], limit=500, offset=offset)
+                    if not page["ids"]:
+                        break
+                    for document, metadata in zip(page["documents"], page["metadatas"]):
+                        metadata = metadata or {}
+                        # Rollup summaries are not turns; the turns they replaced are gone
+                        if metadata.get("type") == "summary" or not metadata.get("user_id"):
+                            continue
+                        message, _, response = (document or "").partition("\nBot: ")
+                        if message.startswith("User: "):
+                            message = message[len("User: "):]
+                        timestamp = metadata.get("ts")
+                        if timestamp is None:
+                            try:
+                                timestamp = datetime.fromisoformat(metadata["timestamp"]).timestamp()
+                            except (KeyError, TypeError, ValueError):
+                                continue
+                        records.append({
+                            "user_id": metadata["user_id"],
+                            "timestamp": timestamp,
+                            "channel": metadata.get("channel", "streamlit"),
+                            "message": message,
+                            "response": response
+                        })
+                    offset += len(page["ids"])
+            
+            if records:
+                migrated = self.chat_log.import_if_empty(records)
+                if migrated:
+                    print(f"Migrated {migrated} chat turns from Chroma to the chat log")
+                
+        except Exception as e:
+            print(f"Error migrating legacy chat history: {str(e)}")
+
+    def _build_topic_vectors(self):
+        """Embed the topic phrases (through the cache) into per-topic centroids"""
+        self.topic_vectors.build(self.embed_many)
+
+    def _personalize(self, query_embedding: List[float], topics: List[str]) -> List[float]:
+        """Blend the query embedding with the centroid of the user's topics"""
+        if not len(self.topic_vectors):
+            self._build_topic_vectors()
+        for topic in topics:
+            if topic not in self.topic_vectors.centroids:
+                self.topic_vectors.add_topic(topic, self.embed_query(topic))
+        
+        profile_vector = self.topic_vectors.profile_vector(topics)
+        if profile_vector is None:
+            return query_embedding
+        return TopicVectors.blend(query_embedding, profile_vector, self.personalization_weight)
+
+    def warmup(self) -> bool:
+        """Initialize everything and load the embedding model before serving traffic"""
+        try:
+            start = time.monotonic()
+            self._ensure_ready()
+            
+            # The ONNX model loads on first use; embed once (bypassing the cache) to pay that now
+            self.embedding_function(["warmup"])
+            if self.personalization_mode == "vector":
+                self._build_topic_vectors()
+            self._warmed_up = True
+            print(f"Database warmup complete in {time.monotonic() - start:.2f}s")
+            return True
+            
+        except Exception as e:
+            self.init_error = str(e)
+            print(f"Error warming up database: {str(e)}")
+            return False
+
+    def is_ready(self) -> bool:
+        """Readiness: collections are open and the embedding model is loaded"""
+        return self._initialized and self._warmed_up
+
+    def get_status(self) -> Dict:
+        """Get initialization status for health checks"""
+        return {
+            "initialized": self._initialized,
+            "warmed_up": self._warmed_up,
+            "error": self.init_error
+        }
+
+    def chat_shard_name(self, shard: int) -> str:
+        """Collection name of a chat history shard (unsharded: plain chat_history)"""
+        if self.chat_shard_count == 1:
+            return "chat_history"
+        return f"chat_history_{shard}"
+
+    def chat_shard_for(self, user_id: str):
+        """Get the chat history shard holding a user's turns (crc32 of user_id)"""
+        self._ensure_ready()
+        return self.chat_history_shards[zlib.crc32(user_id.encode("utf-8")) % self.chat_shard_count]
+
+    def _collection_count(self, collection) -> int:
+        """Get collection size from the count cache, revalidating with count()"""
+        cached = self._collection_counts.get(collection.name)
+        if cached and time.monotonic() - cached[1] < self.count_ttl:
+            return cached[0]
+        
+        count = collection.count()
+        self._collection_counts[collection.name] = (count, time.monotonic())
+        return count
+
+    def _record_added(self, collection, added: int):
+        """Bump the cached count after a successful add()"""
+        cached = self._collection_counts.get(collection.name)
+        if cached:
+            self._collection_counts[collection.name] = (cached[0] + added, cached[1])
+
+    def invalidate_count(self, collection):
+        """Drop the cached count after upsert()/delete(), where the delta is unknown"""
+        self._collection_counts.pop(collection.name, None)
+
+    def refresh_memory_index(self, name: str) -> bool:
+        """(Re)load the in-memory vector and keyword indexes for a static collection"""
+        try:
+            self._ensure_ready()
+            collection = self.knowledge_collections[name]
+            if self._collection_count(collection) > self.memory_index_max_items:
+                # Too large to hold in memory; keep serving it from Chroma
+                self.memory_indexes.pop(name, None)
+                self.keyword_indexes.pop(name, None)
+                return False
+            
+            include = ["documents", "metadatas"]
+            if self.use_memory_index:
+                include.append("embeddings")
+            data = collection.get(include=include)
+            
+            if self.use_memory_index:
+                index = KnowledgeIndex(
+                    name,
+                    precision=self.index_precision,
+                    rerank_factor=self.index_rerank_factor,
+                    full_precision_dir=os.path.join(self.persist_directory, "index_cache")
+                )
+                index.build(data["ids"], data["documents"], data["metadatas"], data["embeddings"])
+                self.memory_indexes[name] = index
+            
+            if self.hybrid_search:
+                keyword_index = BM25Index(name)
+                keyword_index.build(data["ids"], data["documents"], data["metadatas"])
+                self.keyword_indexes[name] = keyword_index
+            
+            print(f"Loaded {len(data['ids'])} {name} into memory index ({self.index_precision})")
+            return True
+            
+        except Exception as e:
+            print(f"Error loading memory index for {name}: {str(e)}")
+            self.memory_indexes.pop(name, None)
+            self.keyword_indexes.pop(name, None)
+            return False
+
+    def _n_results(self, collection, limit: int) -> int:
+        """Size n_results without fetching the collection"""
+        return min(limit, self._collection_count(collection))
+
     def _initialize_default_data(self):
         """Initialize collections with default data if empty"""
         try:
             # Initialize default health tips
-            if len(self.health_tips.get()['ids']) == 0:
+            if self._collection_count(self.health_tips) == 0:
                 default_tips = [
                     {
                         "id": "tip1",
@@ -63,15 +459,17 @@ class ChromaDBManager:
                     }
                 ]
                 
-                for tip in default_tips:
-                    self.health_tips.add(
-                        documents=[tip["text"]],
-                        metadatas=[{"category": tip["category"]}],
-                        ids=[tip["id"]]
-                    )
+                self.bulk_upsert("health_tips", [
+                    {
+                        "id": tip["id"],
+                        "document": tip["text"],
+                        "metadata": {"category": tip["category"]}
+                    }
+                    for tip in default_tips
+                ])
 
             # Initialize default products
-            if len(self.products.get()['ids']) == 0:
+            if self._collection_count(self.products) == 0:
                 default_products = [
                     {
                         "id": "prod1",
@@ -96,116 +494,380 @@ class ChromaDBManager:
                     }
                 ]
                 
-                for product in default_products:
-                    self.products.add(
-                        documents=[product["description"]],
-                        metadatas=[{
+                self.bulk_upsert("products", [
+                    {
+                        "id": product["id"],
+                        "document": product["description"],
+                        "metadata": {
                             "name": product["name"],
                             "category": product["category"],
                             "price": product["price"]
-                        }],
-                        ids=[product["id"]]
-                    )
+                        }
+                    }
+                    for product in default_products
+                ])
                 
         except Exception as e:
             print(f"Error initializing default data: {str(e)}")
 
-    def get_user_profile(self, user_id: str) -> Optional[Dict]:
-        """Get user profile from database"""
+    @staticmethod
+    def _content_hash(document: str, metadata: Dict) -> str:
+        """Hash a document and its metadata to detect unchanged items"""
+        payload = json.dumps(
+            {"document": document, "metadata": metadata},
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _upsert_batch(self, collection, batch: List[Dict]) -> int:
+        """Upsert one batch, skipping items whose content hash is unchanged"""
+        ids = [item["id"] for item in batch]
+        hashes = [self._content_hash(item["document"], item.get("metadata") or {}) for item in batch]
+        
+        existing = collection.get(ids=ids, include=["metadatas"])
+        stored_hashes = {
+            item_id: (metadata or {}).get("content_hash")
+            for item_id, metadata in zip(existing["ids"], existing["metadatas"])
+        }
+        
+        changed = [
+            (item, content_hash)
+            for item, content_hash in zip(batch, hashes)
+            if stored_hashes.get(item["id"]) != content_hash
+        ]
+        if not changed:
+            return 0
+        
+        documents = [item["document"] for item, _ in changed]
+        metadatas = [
+            {**(item.get("metadata") or {}), "content_hash": content_hash}
+            for item, content_hash in changed
+        ]
+        
+        # Use supplied embeddings when every item has one, otherwise embed the batch at once
+        if all(item.get("embedding") is not None for item, _ in changed):
+            embeddings = [item["embedding"] for item, _ in changed]
+        else:
+            embeddings = self.embedding_function(documents)
+        
+        collection.upsert(
+            ids=[item["id"] for item, _ in changed],
+            documents=documents,
+            metadatas=metadatas,
+            embeddings=embeddings
+        )
+        return len(changed)
+
+    def bulk_upsert(self, collection_name: str, items: Iterable[Dict], batch_size: int = 256) -> Dict:
+        """Upsert items ({id, document, metadata[, embedding]}) in batches
+
+        Failed batches are counted in stats["failed"] (the items of that batch)
+        and a failure to read the items in stats["error"]; the remaining
+        batches are still written.
+        """
+        self._ensure_ready()
+        stats = {"upserted": 0, "skipped": 0, "failed": 0}
+        collection = self.knowledge_collections.get(collection_name)
+        if collection is None:
+            collection = self.client.get_collection(
+                name=collection_name,
+                embedding_function=self.embedding_function
+            )
+        
+        def write(batch: List[Dict]):
+            try:
+                upserted = self._upsert_batch(collection, batch)
+                stats["upserted"] += upserted
+                stats["skipped"] += len(batch) - upserted
+            except Exception as e:
+                stats["failed"] += len(batch)
+                print(f"Error bulk loading a batch of {len(batch)} into {collection_name}: {str(e)}")
+        
+        try:
+            batch = []
+            for item in items:
+                batch.append(item)
+                if len(batch) >= batch_size:
+                    write(batch)
+                    batch = []
+            if batch:
+                write(batch)
+                
+        except Exception as e:
+            # The items themselves could not be read (e.g. a broken artifact file)
+            stats["error"] = str(e)
+            print(f"Error bulk loading {collection_name}: {str(e)}")
+            
+        finally:
+            if stats["upserted"]:
+                self.invalidate_count(collection)
+                if collection_name in self.memory_indexes or collection_name in self.keyword_indexes:
+                    self.refresh_memory_index(collection_name)
+        
+        print(
+            f"{collection_name}: {stats['upserted']} upserted, {stats['skipped']} unchanged, "
+            f"{stats['failed']} failed"
+        )
+        return stats
+
+    def load_artifacts(self, artifact_dir: str) -> Dict:
+        """Load precomputed knowledge embeddings without running the embedding model"""
+        self._ensure_ready()
+        results = {}
         try:
-            results = self.user_profiles.get(
-                where={"user_id": user_id},
-                limit=1
+            manifest = read_manifest(artifact_dir)
+            if not manifest:
+                return results
+            
+            model = type(self.embedding_function).__name__
+            if manifest["model"] != model:
+                print(f"Skipping embedding artifacts built with {manifest['model']} (using {model})")
+                return results
+            
+            # Skip the load entirely if this version was already ingested
+            marker_path = os.path.join(self.persist_directory, "loaded_artifacts.json")
+            if os.path.exists(marker_path):
+                with open(marker_path, "r", encoding="utf-8") as file:
+                    if json.load(file).get("version") == manifest["version"]:
+                        return results
+            
+            for name in manifest["collections"]:
+                results[name] = self.bulk_upsert(name, iter_artifact_items(artifact_dir, manifest, name))
+            
+            # Only a clean load is recorded; anything else is retried on the next start
+            incomplete = sorted(
+                name for name, stats in results.items()
+                if stats["failed"] or stats.get("error")
             )
+            if incomplete:
+                print(f"Embedding artifacts version {manifest['version']} incomplete in {incomplete}; will retry")
+                self.artifact_load_stats = results
+                return results
             
-            if results and results['metadatas']:
-                return results['metadatas'][0]
+            with open(marker_path, "w", encoding="utf-8") as file:
+                json.dump({"version": manifest["version"], "loaded_at": datetime.now().isoformat()}, file)
+            print(f"Loaded embedding artifacts version {manifest['version']}")
+            
+        except Exception as e:
+            print(f"Error loading embedding artifacts: {str(e)}")
+        self.artifact_load_stats = results
+        return results
+
+    def add_health_tip(self, tip_id: str, tip_text: str, category: str) -> bool:
+        """Add or update a single health tip"""
+        stats = self.bulk_upsert("health_tips", [{
+            "id": tip_id,
+            "document": tip_text,
+            "metadata": {"category": category}
+        }])
+        return stats["upserted"] + stats["skipped"] == 1
+
+    def add_faq(self, faq_id: str, question: str, answer: str, category: str) -> bool:
+        """Add or update a single FAQ, indexed on its question"""
+        stats = self.bulk_upsert("faqs", [{
+            "id": faq_id,
+            "document": question,
+            "metadata": {"answer": answer, "category": category}
+        }])
+        return stats["upserted"] + stats["skipped"] == 1
+
+    def add_product(
+        self,
+        product_id: str,
+        name: str,
+        description: str,
+        category: str,
+        price: float
+    ) -> bool:
+        """Add or update a single product"""
+        stats = self.bulk_upsert("products", [{
+            "id": product_id,
+            "document": description,
+            "metadata": {"name": name, "category": category, "price": price}
+        }])
+        return stats["upserted"] + stats["skipped"] == 1
+
+    def _migrate_legacy_profile(self, user_id: str) -> Optional[Dict]:
+        """Move a profile from the old Chroma collection into the profile store"""
+        self._ensure_ready()
+        if self.user_profiles is None:
             return None
+        
+        results = self.user_profiles.get(ids=[f"profile_{user_id}"])
+        if not results['metadatas']:
+            return None
+        
+        profile = dict(results['metadatas'][0])
+        # Lists were stored as JSON strings where Chroma rejected them
+        for field in ("key_topics", "health_concerns", "preferences"):
+            if isinstance(profile.get(field), str):
+                try:
+                    profile[field] = json.loads(profile[field])
+                except ValueError:
+                    pass
+        
+        self.profile_store.put(user_id, profile, expected_version=0)
+        return self.profile_store.get(user_id)
+
+    def get_user_profile(self, user_id: str) -> Optional[Dict]:
+        """Get user profile (including its "version") from the profile store"""
+        try:
+            profile = self.profile_store.get(user_id)
+            if profile is None:
+                profile = self._migrate_legacy_profile(user_id)
+            return profile
             
         except Exception as e:
             print(f"Error getting user profile: {str(e)}")
             return None
 
     def store_user_profile(self, user_id: str, profile: Dict) -> bool:
-        """Store user profile in database"""
+        """Store user profile; fails if profile["version"] is no longer current"""
         try:
-            # Convert profile to string for document
-            profile_str = f"User Profile for {user_id}"
-            
-            # Store profile
-            self.user_profiles.upsert(
-                documents=[profile_str],
-                metadatas=[profile],
-                ids=[f"profile_{user_id}"]
-            )
+            version = self.profile_store.put(user_id, profile, expected_version=profile.get("version"))
+            if version is None:
+                print(f"Profile version conflict for {user_id}")
+                return False
+            
+            profile["version"] = version
             return True
             
         except Exception as e:
             print(f"Error storing user profile: {str(e)}")
             return False
 
+    def get_profile_cache_stats(self) -> Dict:
+        """Get profile cache hit/miss and write conflict counters"""
+        return self.profile_store.get_stats()
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query once so it can be reused across collections"""
+        self._ensure_ready()
+        return self.embedding_cache.get(text, self.embedding_function)
+
+    def embed_many(self, texts: List[str]) -> List[List[float]]:
+        """Embed several texts in one model call, through the embedding cache"""
+        self._ensure_ready()
+        return self.embedding_cache.get_many(texts, self.embedding_function)
+
+    def get_embedding_cache_stats(self) -> Dict:
+        """Get embedding cache hit/miss counters"""
+        self._ensure_ready()
+        return self.embedding_cache.get_stats()
+
+    def _query_collection(
+        self,
+        collection,
+        query_embedding: List[float],
+        limit: int,
+        where: Optional[Dict] = None
+    ) -> Dict:
+        """Query a collection with a precomputed embedding"""
+        index = self.memory_indexes.get(collection.name)
+        if index is not None:
+            try:
+                return index.query(query_embedding, limit, where)
+            except ValueError:
+                pass  # Filter not supported in memory, fall back to Chroma
+        
+        n_results = self._n_results(collection, limit)
+        if n_results == 0:
+            return {'ids': [], 'documents': [], 'metadatas': [], 'distances': []}
+        
+        query_args = {
+            "query_embeddings": [query_embedding],
+            "n_results": n_results
+        }
+        if where:
+            query_args["where"] = where
+        results = collection.query(**query_args)
+        
+        return {
+            'ids': results['ids'][0] if results['ids'] else [],
+            'documents': results['documents'][0] if results['documents'] else [],
+            'metadatas': results['metadatas'][0] if results['metadatas'] else [],
+            'distances': results['distances'][0] if results.get('distances') else []
+        }
+
     def get_relevant_content(self, query: str, user_profile: Optional[Dict] = None, limit: int = 5) -> Dict:
-        """Get relevant content based on query using vector similarity"""
+        """Get relevant content based on query using vector (and keyword) similarity"""
         try:
+            self._ensure_ready()
             print(f"\n=== Getting Relevant Content for Query: {query} ===")
             
             # Use user profile topics to enhance search if available
+            topics = (user_profile or {}).get('key_topics') or []
             search_query = query
-            if user_profile and user_profile.get('key_topics'):
-                topics = ' '.join(user_profile['key_topics'])
-                search_query = f"{query} {topics}"
-            
-            # Get relevant health tips
-            health_results = self.health_tips.query(
-                query_texts=[search_query],
-                n_results=min(limit, len(self.health_tips.get()['ids']))
-            )
+            if topics and self.personalization_mode == "text":
+                search_query = f"{query} {' '.join(topics)}"
             
-            # Get relevant products
-            product_results = self.products.query(
-                query_texts=[search_query],
-                n_results=min(limit, len(self.products.get()['ids']))
-            )
+            # Embed once and fan the vector out to every knowledge collection
+            query_embedding = self.embed_query(search_query)
+            if topics and self.personalization_mode == "vector":
+                query_embedding = self._personalize(query_embedding, topics)
             
-            print(f"Found {len(health_results['documents'][0] if health_results['documents'] else [])} relevant health tips")
-            print(f"Found {len(product_results['documents'][0] if product_results['documents'] else [])} relevant products")
+            relevant_content = {}
+            for name, collection in self.knowledge_collections.items():
+                keyword_index = self.keyword_indexes.get(name)
+                if keyword_index is not None:
+                    # Fuse vector and BM25 rankings, then keep only the best few
+                    candidates = max(limit, self.hybrid_candidates)
+                    relevant_content[name] = reciprocal_rank_fusion(
+                        [
+                            self._query_collection(collection, query_embedding, candidates),
+                            keyword_index.query(query, candidates)
+                        ],
+                        limit
+                    )
+                else:
+                    relevant_content[name] = self._query_collection(collection, query_embedding, limit)
+                print(f"Found {len(relevant_content[name]['documents'])} relevant {name}")
             
-            return {
-                'health_tips': {
-                    'documents': health_results['documents'][0] if health_results['documents'] else [],
-                    'metadatas': health_results['metadatas'][0] if health_results['metadatas'] else []
-                },
-                'products': {
-                    'documents': product_results['documents'][0] if product_results['documents'] else [],
-                    'metadatas': product_results['metadatas'][0] if product_results['metadatas'] else []
-                }
-            }
+            return relevant_content
             
         except Exception as e:
             print(f"Error getting relevant content: {str(e)}")
             return {
-                'health_tips': {'documents': [], 'metadatas': []}, 
-                'products': {'documents': [], 'metadatas': []}
+                name: {'ids': [], 'documents': [], 'metadatas': [], 'distances': []}
+                for name in self.static_collections
             }
 
+    def match_faq(self, query: str, max_distance: float) -> Optional[Dict]:
+        """Get the closest FAQ if its question is within max_distance of the query"""
+        try:
+            self._ensure_ready()
+            results = self._query_collection(self.faqs, self.embed_query(query), 1)
+            if not results['ids'] or results['distances'][0] > max_distance:
+                return None
+            
+            metadata = results['metadatas'][0]
+            return {
+                "id": results['ids'][0],
+                "question": results['documents'][0],
+                "answer": metadata.get('answer', ''),
+                "category": metadata.get('category', ''),
+                "distance": results['distances'][0]
+            }
+            
+        except Exception as e:
+            print(f"Error matching FAQ: {str(e)}")
+            return None
+
     def get_health_tips(self, category: Optional[str] = None, limit: int = 5) -> Dict:
         """Get health tips with proper error handling"""
         try:
-            if category:
-                results = self.health_tips.query(
-                    query_texts=["health tips"],
-                    where={"category": category},
-                    n_results=min(limit, len(self.health_tips.get()['ids']))
-                )
-            else:
-                results = self.health_tips.query(
-                    query_texts=["health tips"],
-                    n_results=min(limit, len(self.health_tips.get()['ids']))
-                )
+            self._ensure_ready()
+            results = self._query_collection(
+                self.health_tips,
+                self.embed_query("health tips"),
+                limit,
+                where={"category": category} if category else None
+            )
             
             return {
-                'documents': results['documents'][0] if results['documents'] else [],
-                'metadatas': results['metadatas'][0] if results['metadatas'] else []
+                'documents': results['documents'],
+                'metadatas': results['metadatas']
             }
             
         except Exception as e:
@@ -215,73 +877,200 @@ class ChromaDBManager:
     def get_products_by_category(self, category: str) -> Dict:
         """Get products by category with proper error handling"""
         try:
-            results = self.products.query(
-                query_texts=[""],
-                where={"category": category},
-                n_results=min(5, len(self.products.get()['ids']))
+            self._ensure_ready()
+            results = self._query_collection(
+                self.products,
+                self.embed_query(""),
+                5,
+                where={"category": category}
             )
             
             return {
-                'documents': results['documents'][0] if results['documents'] else [],
-                'metadatas': results['metadatas'][0] if results['metadatas'] else []
+                'documents': results['documents'],
+                'metadatas': results['metadatas']
             }
             
         except Exception as e:
             print(f"Error getting products: {str(e)}")
             return {'documents': [], 'metadatas': []}
 
-    def store_chat(self, user_id: str, message: str, response: str) -> bool:
+    def _write_records(self, records: List[Dict]) -> List[Dict]:
+        """Persist a batch of chat/feedback records; returns the records that failed"""
+        self._ensure_ready()
+        chats = [record for record in records if record["kind"] == "chat"]
+        feedback = [record for record in records if record["kind"] == "feedback"]
+        failed: List[Dict] = []
+        
+        # Each kind (and each chat shard) is written on its own, so one failure
+        # doesn't take the rest of the batch with it
+        if feedback:
+            try:
+                self.feedback_store.add_many(feedback)
+            except Exception as e:
+                print(f"Error writing {len(feedback)} feedback records: {str(e)}")
+                failed.extend(feedback)
+        
+        by_shard: Dict[str, tuple] = {}
+        for chat in chats:
+            shard = self.chat_shard_for(chat["user_id"])
+            by_shard.setdefault(shard.name, (shard, []))[1].append(chat)
+        
+        # The chat log is the history of record, so it is written whether or not
+        # the embedding model and vector store are up. "logged" / "indexed" mark
+        # the finished half, so a retry only redoes the half that failed
+        unlogged = [chat for chat in chats if not chat.get("logged")]
+        if unlogged:
+            try:
+                self.chat_log.append_many(unlogged)
+                for chat in unlogged:
+                    chat["logged"] = True
+            except Exception as e:
+                print(f"Error appending {len(unlogged)} chats to the chat log: {str(e)}")
+        
+        for shard, shard_chats in by_shard.values():
+            unindexed = [chat for chat in shard_chats if not chat.get("indexed")]
+            if not unindexed:
+                continue
+            try:
+                self._write_chat_shard(shard, unindexed)
+                for chat in unindexed:
+                    chat["indexed"] = True
+            except Exception as e:
+                print(f"Error writing {len(unindexed)} chats to {shard.name}: {str(e)}")
+        
+        failed.extend(chat for chat in chats if not (chat.get("logged") and chat.get("indexed")))
+        return failed
+
+    def _write_chat_shard(self, shard, chats: List[Dict]):
+        """Embed and upsert chats into their shard (upsert, so a retry can't duplicate)"""
+        shard.upsert(
+            documents=[f"User: {chat['message']}\nBot: {chat['response']}" for chat in chats],
+            metadatas=[
+                {
+                    "user_id": chat["user_id"],
+                    "channel": chat["channel"],
+                    "timestamp": datetime.fromtimestamp(chat["timestamp"]).isoformat(),
+                    "ts": chat["timestamp"]
+                }
+                for chat in chats
+            ],
+            ids=[f"chat_{chat['user_id']}_{chat['timestamp']}" for chat in chats]
+        )
+        if any(chat.get("attempts") or chat.get("replayed") for chat in chats):
+            # A retried upsert may overwrite rows written before, so the delta is unknown
+            self.invalidate_count(shard)
+        else:
+            self._record_added(shard, len(chats))
+
+    def _persist(self, record: Dict):
+        """Queue a record for write-behind, or write it now if disabled"""
+        if self.write_queue:
+            self.write_queue.put(record)
+        elif self._write_records([record]):
+            raise RuntimeError(f"Failed to write {record['kind']} record")
+
+    def store_chat(self, user_id: str, message: str, response: str, channel: str = "streamlit") -> bool:
         """Store chat with proper error handling"""
         try:
-            chat_id = f"chat_{user_id}_{datetime.now().timestamp()}"
-            self.chat_history.add(
-                documents=[f"User: {message}\nBot: {response}"],
-                metadatas=[{
-                    "user_id": user_id,
-                    "timestamp": datetime.now().isoformat()
-                }],
-                ids=[chat_id]
-            )
+            self._persist({
+                "kind": "chat",
+                "user_id": user_id,
+                "message": message,
+                "response": response,
+                "channel": channel,
+                "timestamp": datetime.now().timestamp()
+            })
             return True
         except Exception as e:
             print(f"Error storing chat: {str(e)}")
             return False
 
-    def store_feedback(self, user_id: str, rating: int, comment: str) -> bool:
+    def store_feedback(self, user_id: str, rating: int, comment: str, channel: str = "streamlit") -> bool:
         """Store user feedback"""
         try:
-            feedback_id = f"feedback_{user_id}_{datetime.now().timestamp()}"
-            self.feedback.add(
-                documents=[comment],
-                metadatas=[{
-                    "user_id": user_id,
-                    "rating": rating,
-                    "timestamp": datetime.now().isoformat()
-                }],
-                ids=[feedback_id]
-            )
+            self._persist({
+                "kind": "feedback",
+                "user_id": user_id,
+                "rating": int(rating),
+                "comment": comment,
+                "channel": channel,
+                "timestamp": datetime.now().timestamp()
+            })
             return True
         except Exception as e:
             print(f"Error storing feedback: {str(e)}")
             return False
 
-    def get_chat_history(self, user_id: str, limit: int = 10) -> Dict:
-        """Get chat history with proper error handling"""
+    def get_feedback_stats(self, days: Optional[int] = None) -> Dict:
+        """Get running feedback aggregates (overall, per channel, optionally per day)"""
         try:
-            results = self.chat_history.query(
-                query_texts=[""],
-                where={"user_id": user_id},
-                n_results=min(limit, len(self.chat_history.get()['ids']))
+            return self.feedback_store.get_stats(days)
+        except Exception as e:
+            print(f"Error getting feedback stats: {str(e)}")
+            return {"overall": {"count": 0, "mean": None, "histogram": {}}, "channels": {}}
+
+    def flush(self):
+        """Block until queued chat/feedback writes are persisted"""
+        if self.write_queue:
+            self.write_queue.flush()
+
+    def close(self):
+        """Flush pending writes and stop the background writer"""
+        if self.write_queue:
+            self.write_queue.close()
+
+    def search_chat_history(self, user_id: str, query: str, limit: int = 5) -> Dict:
+        """Get a user's past turns (and rollup summary) most similar to the query"""
+        try:
+            self._ensure_ready()
+            results = self._query_collection(
+                self.chat_shard_for(user_id),
+                self.embed_query(query),
+                limit,
+                where={"user_id": user_id}
             )
             
             return {
-                'documents': results['documents'][0] if results['documents'] else [],
-                'metadatas': results['metadatas'][0] if results['metadatas'] else []
+                'documents': results['documents'],
+                'metadatas': results['metadatas'],
+                'distances': results['distances']
+            }
+            
+        except Exception as e:
+            print(f"Error searching chat history: {str(e)}")
+            return {'documents': [], 'metadatas': [], 'distances': []}
+
+    def get_chat_history(self, user_id: str, limit: int = 10) -> Dict:
+        """Get the latest chat turns in chronological order"""
+        try:
+            entries = self.chat_log.get_recent(user_id, limit)
+            
+            return {
+                'documents': [f"User: {entry['message']}\nBot: {entry['response']}" for entry in entries],
+                'metadatas': [
+                    {
+                        "user_id": entry['user_id'],
+                        "channel": entry['channel'],
+                        "timestamp": entry['timestamp']
+                    }
+                    for entry in entries
+                ]
             }
             
         except Exception as e:
             print(f"Error getting chat history: {str(e)}")
             return {'documents': [], 'metadatas': []}
+
+    def get_chat_history_page(self, user_id: str, limit: int = 20, cursor: Optional[str] = None) -> Dict:
+        """Get a page of chat history, newest first; raises ValueError for a bad limit or cursor"""
+        try:
+            return self.chat_log.get_page(user_id, limit, cursor)
+        except ValueError:
+            # The caller's input, not a storage failure
+            raise
+        except Exception as e:
+            print(f"Error getting chat history page: {str(e)}")
+            return {"messages": [], "next_cursor": None}
         
 
 
@@ -289,13 +1078,16 @@ class ChromaDBManager:
 ChromaDBManager: Core Database Management System for Health Chatbot
 
 This class manages all database operations using ChromaDB, a vector database that enables 
-semantic search capabilities. It handles five main collections:
+semantic search capabilities. It handles four main collections:
 
 1. health_tips: Stores health-related tips and advice
 2. products: Stores product information and descriptions
 3. chat_history: Stores user conversations
-4. feedback: Stores user feedback and ratings
-5. user_profiles: Stores user information and preferences
+4. faqs: Stores curated questions and answers
+
+User feedback is kept outside the vector store in FeedbackStore
+(feedback.sqlite3), see Feedback below, and user profiles in ProfileStore
+(profiles.sqlite3), see User Profiles below.
 
 Key Features:
 - Vector embeddings for semantic search
@@ -316,42 +1108,163 @@ Collections Structure:
    - metadata: name, category, price
    - ids: unique product identifier
 
-3. chat_history:
+3. chat_history (chat_history_0 .. chat_history_<N-1> when sharded):
    - documents: conversation text
-   - metadata: user_id, timestamp
+   - metadata: user_id, channel, timestamp (ISO), ts (POSIX seconds)
    - ids: unique chat identifier
+   Per-user rollup summaries (ChatRetentionJob) use ids summary_<user_id>
+   and metadata type="summary".
+   Chat turns are also appended to ChatLog (chat_log.sqlite3), the history
+   of record, which serves all time-ordered history reads without touching
+   the vector index. Turns that exist only in Chroma (stores from before the
+   chat log) are copied into it once, while the log is still empty.
 
-4. feedback:
-   - documents: feedback comments
-   - metadata: user_id, rating, timestamp
-   - ids: unique feedback identifier
+4. faqs:
+   - documents: FAQ question (embedded for matching)
+   - metadata: answer, category
+   - ids: unique FAQ identifier
 
-5. user_profiles:
-   - documents: profile summary
-   - metadata: user preferences and history
-   - ids: unique profile identifier
+Knowledge items written through bulk_upsert() also carry a content_hash
+metadata field used to skip unchanged items on reload.
 
 Main Methods:
+- warmup(): Opens collections and loads the embedding model ahead of traffic
+- is_ready() / get_status(): Readiness signals for health checks
+- bulk_upsert(): Batched, idempotent loading of knowledge items; returns
+  upserted / skipped / failed counts (plus "error" if the items could not
+  be read)
+- load_artifacts(): Loads precomputed knowledge embeddings (no model run)
+- add_health_tip() / add_faq() / add_product(): Single-item loaders
 - get_user_profile(): Retrieves user profile information
-- store_user_profile(): Stores or updates user profiles
+- store_user_profile(): Stores or updates user profiles (versioned)
+- get_profile_cache_stats(): Reports profile cache hits and conflicts
+- embed_query(): Embeds a query once for reuse across collections
+- embed_many(): Embeds several texts in one model call (through the cache)
+- get_embedding_cache_stats(): Reports embedding cache hits and misses
+- refresh_memory_index(): Reloads the in-memory indexes of a static collection
 - get_relevant_content(): Performs semantic search for relevant content
+- match_faq(): Finds a curated FAQ answer close enough to return directly
 - get_health_tips(): Retrieves health tips by category
 - get_products_by_category(): Retrieves products by category
 - store_chat(): Stores chat interactions
 - store_feedback(): Stores user feedback
-- get_chat_history(): Retrieves chat history
+- get_feedback_stats(): Running rating aggregates
+- flush() / close(): Drain the write-behind queue
+- get_chat_history(): Retrieves the latest chat turns in time order
+- search_chat_history(): Semantic search over one user's turns (one shard)
+- get_chat_history_page(): Cursor-paginated chat history, newest first
 
 Error Handling:
 - All methods include try-except blocks
 - Failed operations return empty results or False
 - Errors are logged for debugging
 
+Collection Counts:
+- Collection sizes are cached per collection to size n_results
+- add() bumps the cached count, upsert()/delete() invalidate it
+- Cached counts are revalidated with count() after count_ttl seconds
+
 Vector Search:
 - Uses DefaultEmbeddingFunction for text vectorization
 - Enables semantic similarity search
+- Queries are embedded once and passed as query_embeddings to every
+  collection in knowledge_collections (health_tips, products, faqs)
 - Supports context-aware retrievals
+- Query embeddings go through EmbeddingCache (in-process LRU backed by
+  embedding_cache.sqlite3 in the persist directory)
+
+In-Memory Knowledge Index:
+- The static collections (static_collections: health_tips, products and
+  faqs) are loaded into KnowledgeIndex matrices at startup (when
+  use_memory_index is set and they hold <= memory_index_max_items)
+- Queries against them are served by vectorized cosine similarity
+- index_precision="float16" / "int8" stores the matrices at half / quarter
+  size; the top n_results * index_rerank_factor candidates are rescored
+  against exact float32 rows memory-mapped from index_cache/<name>-<pid>-<id>.npy
+  (one file per build, so refreshes never rewrite a mapped file)
+- Chat history is not covered: its shards stay on Chroma, whose HNSW index
+  stores float32 vectors. KnowledgeIndex is a snapshot rebuilt per refresh,
+  while chat turns arrive continuously and are searched one user at a time
+  (a filtered query over that user's shard), so a quantized copy would need
+  incremental appends and deletes (retention) that it does not support.
+  Sharding (chat_history_shards) and retention bound the chat index instead
+
+Profile Personalization:
+- personalization_mode="vector": the cached query embedding is blended with
+  the mean of the user's key_topics centroids (TopicVectors), weighted by
+  personalization_weight, so personalized queries reuse cached embeddings
+- Topic centroids are built during warmup(); unknown topics are embedded
+  through the cache on first use
+- "text" appends the topics to the query text (previous behavior), "off"
+  ignores the profile
+- BM25 keyword search always uses the raw query
+
+Hybrid Search:
+- With hybrid_search, each static collection also gets a BM25Index
+- get_relevant_content() takes hybrid_candidates results from both the
+  vector and the keyword index and fuses them by reciprocal rank
+- Keyword-only hits carry a distance of None
+
+Chat History Shards:
+- With chat_history_shards = N > 1, turns are stored in N collections
+  chat_history_0 .. chat_history_<N-1>; a user's shard is crc32(user_id) % N
+- Per-user queries (search_chat_history) only touch the user's shard, and
+  batched writes are split into one add() per shard
+- chat_history_shards = 1 keeps the single chat_history collection
+- migrate_chat_history.py moves turns from the single collection (or a
+  different shard count) into the current shards, reusing stored embeddings
+- The shard count is recorded in chat_shards.json; starting with another
+  count (or with chat collections outside the layout) prints a warning to
+  run the migration, since shards reused by name would otherwise keep turns
+  placed with the old count
+
+Write-Behind Persistence:
+- store_chat() and store_feedback() only enqueue a record
+- WriteBehindQueue flushes batches on size (write_batch_size) or time
+  (write_flush_interval), embedding each batch in one call
+- Feedback, the chat log and each chat shard are written independently; a
+  chat is appended to the chat log even while embedding or the vector store
+  fails, so /history never loses it
+- Chat records carry "logged" / "indexed" flags, so a retry only redoes the
+  write that failed (no duplicate chat log rows)
+- Failed records are retried with exponential backoff, then kept in
+  write_dead_letter.jsonl and requeued on the next start (never dropped)
+- close() is registered with atexit for a clean flush on shutdown
+- write_behind=False restores synchronous writes
+
+Feedback:
+- Feedback rows go to FeedbackStore, whose daily aggregates (count, rating
+  sum, histogram per day and channel) are updated in the same transaction
+- get_feedback_stats() sums the aggregate tables per request, never a scan
+- Feedback stored in the former Chroma "feedback" collection is copied into
+  the store once, when the store is still empty
+
+User Profiles:
+- Profiles are JSON documents in ProfileStore, keyed by user_id, so list
+  fields such as key_topics are stored as-is and nothing is embedded
+- Reads go through an LRU cache (profile_cache_size entries, revalidated
+  after profile_cache_ttl seconds); misses are a primary key lookup
+- get_user_profile() returns the stored "version"; store_user_profile()
+  only writes if that version is still current (returns False otherwise)
+- A profile missing from the store is looked up by id in the former Chroma
+  user_profiles collection and migrated on first read
+
+Embedding Artifacts:
+- With artifact_dir set, initialization first ingests the precomputed
+  embeddings described by its manifest.json (see embedding_artifacts.py)
+- Items carry their vectors, so bulk_upsert() skips the embedding model
+- The loaded version is recorded in loaded_artifacts.json and not reloaded,
+  but only once every collection loaded without failed batches; a partial
+  load is retried on the next start (unchanged items are skipped by hash)
+
+Lazy Initialization:
+- With lazy=True the constructor only opens the chat log and write queue
+- The embedding model, Chroma client, collections, default data and
+  in-memory indexes are set up by warmup() or on first use
+- is_ready() turns true once warmup() has loaded the embedding model
 
 Usage:
-db_manager = ChromaDBManager(persist_directory)
+db_manager = ChromaDBManager(persist_directory, count_ttl=30.0, lazy=True)
+db_manager.warmup()
 db_manager.get_relevant_content(query, user_profile)
 """
\ No newline at end of file
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+MANIFEST_NAME = "manifest.json"
+
+def _batched(items: List[Dict], batch_size: int) -> Iterator[List[Dict]]:
+    for start in range(0, len(items), batch_size):
+        yield items[start:start + batch_size]
+
+def artifact_version(sources: Dict[str, List[Dict]], model: str) -> str:
+    """Version string derived from the model name and every item's content"""
+    digest = hashlib.sha256(model.encode("utf-8"))
+    for name in sorted(sources):
+        digest.update(name.encode("utf-8"))
+        for item in sources[name]:
+            payload = json.dumps(
+                {"id": item["id"], "document": item["document"], "metadata": item.get("metadata") or {}},
+                sort_keys=True,
+                ensure_ascii=False
+            )
+            digest.update(payload.encode("utf-8"))
+    return digest.hexdigest()[:12]
+
+def build_artifacts(
+    sources: Dict[str, Iterable[Dict]],
+    output_dir: str,
+    embedding_function: Callable[[List[str]], List],
+    batch_size: int = 256
+) -> Dict:
+    """Embed each source's items and write <name>-<version>.npy/.json plus a manifest"""
+    os.makedirs(output_dir, exist_ok=True)
+    materialized = {name: list(items) for name, items in sources.items()}
+    model = type(embedding_function).__name__
+    version = artifact_version(materialized, model)
+
+    manifest = {
+        "version": version,
+        "model": model,
+        "created_at": datetime.now().isoformat(),
+        "collections": {}
+    }
+
+    for name, items in materialized.items():
+        vectors = []
+        for batch in _batched(items, batch_size):
+            vectors.extend(embedding_function([item["document"] for item in batch]))
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(len(items), -1)
+
+        matrix_file = f"{name}-{version}.npy"
+        sidecar_file = f"{name}-{version}.json"
+        np.save(os.path.join(output_dir, matrix_file), matrix)
+        with open(os.path.join(output_dir, sidecar_file), "w", encoding="utf-8") as file:
+            json.dump({
+                "ids": [item["id"] for item in items],
+                "documents": [item["document"] for item in items],
+                "metadatas": [item.get("metadata") or {} for item in items]
+            }, file, ensure_ascii=False)
+
+        manifest["collections"][name] = {
+            "count": len(items),
+            "dimension": int(matrix.shape[1]) if len(items) else 0,
+            "embeddings": matrix_file,
+            "sidecar": sidecar_file
+        }
+        print(f"Built {len(items)} {name} embeddings -> {matrix_file}")
+
+    # Write the manifest last so readers never see a half-built version
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    with open(manifest_path + ".tmp", "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(manifest_path + ".tmp", manifest_path)
+    return manifest
+
+def read_manifest(artifact_dir: str) -> Optional[Dict]:
+    """Get the artifact manifest, or None if no artifacts were built"""
+    manifest_path = os.path.join(artifact_dir, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+def iter_artifact_items(artifact_dir: str, manifest: Dict, name: str) -> Iterator[Dict]:
+    """Yield {id, document, metadata, embedding} items from a memory-mapped artifact"""
+    entry = manifest["collections"][name]
+    with open(os.path.join(artifact_dir, entry["sidecar"]), "r", encoding="utf-8") as file:
+        sidecar = json.load(file)
+    matrix = np.load(os.path.join(artifact_dir, entry["embeddings"]), mmap_mode="r")
+
+    for position, item_id in enumerate(sidecar["ids"]):
+        yield {
+            "id": item_id,
+            "document": sidecar["documents"][position],
+            "metadata": sidecar["metadatas"][position],
+            "embedding": np.asarray(matrix[position], dtype=np.float32)
+        }
+
+
+
+"""
+Embedding Artifacts: Precomputed Knowledge Base Embeddings for Health Chatbot
+
+This module builds and reads versioned embedding artifacts for the knowledge
+base, so deployments can load tips, FAQs and products into ChromaDB without
+running the embedding model.
+
+Artifact Layout (data/health_knowledge/embeddings/):
+├── manifest.json               # current version, model, per-collection files
+├── health_tips-<version>.npy   # float32 matrix, one row per item
+├── health_tips-<version>.json  # ids, documents, metadatas (row order)
+├── faqs-<version>.npy / .json
+└── products-<version>.npy / .json
+
+Versioning:
+- version = first 12 hex chars of SHA-256 over the model name and all items
+- Files of older versions are left in place, so a running (blue) deployment
+  keeps reading its version while the new (green) one is built
+- The manifest is replaced atomically after all files are written
+
+Loading:
+- .npy files are opened with mmap_mode="r", so rows are paged in on demand
+- iter_artifact_items() yields upsert-ready items with their embedding,
+  which ChromaDBManager.bulk_upsert() stores without re-embedding
+
+Functions:
+- build_artifacts(): Embeds item sources and writes the artifacts
+- read_manifest(): Reads the current manifest
+- iter_artifact_items(): Streams items and vectors for one collection
+
+Usage (from the backend directory):
+python -m database.init_db --build-artifacts   # offline, runs the model
+python -m database.init_db --from-artifacts    # deploy time, no model
+
+Note: Artifacts are tied to the embedding model recorded in the manifest;
+ChromaDBManager refuses to load artifacts built with a different model.
+"""
@@ -0,0 +1,251 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+class EmbeddingCache:
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        namespace: str = "default",
+        memory_size: int = 2048,
+        disk_size: int = 100000,
+        access_flush_interval: float = 30.0,
+        access_flush_size: int = 256
+    ):
+        self.db_path = db_path
+        self.namespace = namespace
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+        self.access_flush_interval = access_flush_interval
+        self.access_flush_size = access_flush_size
+
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Disk hits whose last_access is not written yet: key -> access time
+        self._pending_access: Dict[str, float] = {}
+        self._last_access_flush = time.monotonic()
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0
+        }
+
+        self._conn = None
+        if db_path:
+            try:
+                os.makedirs(os.path.dirname(db_path), exist_ok=True)
+                self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+                # WAL lets several worker processes read while one writes
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("""
+                    CREATE TABLE IF NOT EXISTS embeddings (
+                        key TEXT PRIMARY KEY,
+                        vector BLOB NOT NULL,
+                        last_access REAL NOT NULL
+                    )
+                """)
+                self._conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings (last_access)"
+                )
+                self._conn.commit()
+            except Exception as e:
+                print(f"Error opening embedding cache, using memory tier only: {str(e)}")
+                self._conn = None
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Normalize text so trivially different queries share an entry"""
+        return " ".join(text.lower().split())
+
+    def _key(self, text: str) -> str:
+        """Hash normalized text together with the embedding namespace"""
+        normalized = self.normalize(text)
+        return hashlib.sha256(f"{self.namespace}\x00{normalized}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector: np.ndarray):
+        """Insert into the in-process LRU tier, evicting the oldest entry"""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _read_disk(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Read entries from the persistent tier, noting their access time for a later batch"""
+        if not self._conn or not keys:
+            return {}
+
+        placeholders = ",".join("?" for _ in keys)
+        rows = self._conn.execute(
+            f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+            keys
+        ).fetchall()
+        if rows:
+            now = time.time()
+            for key, _ in rows:
+                self._pending_access[key] = now
+            if (
+                len(self._pending_access) >= self.access_flush_size
+                or time.monotonic() - self._last_access_flush >= self.access_flush_interval
+            ):
+                self._flush_access()
+                self._conn.commit()
+        return {key: np.frombuffer(blob, dtype=np.float32) for key, blob in rows}
+
+    def _flush_access(self):
+        """Write pending last_access times (the caller commits)"""
+        if self._pending_access:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                [(accessed, key) for key, accessed in self._pending_access.items()]
+            )
+            self._pending_access.clear()
+        self._last_access_flush = time.monotonic()
+
+    def _write_disk(self, entries: Dict[str, np.ndarray]):
+        """Write entries to the persistent tier and enforce its size bound"""
+        if not self._conn or not entries:
+            return
+
+        now = time.time()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)",
+            [(key, vector.tobytes(), now) for key, vector in entries.items()]
+        )
+        count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if count > self.disk_size:
+            # Recent hits must count before choosing what to evict
+            self._flush_access()
+            # Evict least recently used rows, leaving 10% headroom
+            excess = count - int(self.disk_size * 0.9)
+            self._conn.execute(
+                """DELETE FROM embeddings WHERE key IN (
+                    SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?
+                )""",
+                (excess,)
+            )
+        self._conn.commit()
+
+    def get_many(self, texts: List[str], embed_fn: Callable[[List[str]], List]) -> List[np.ndarray]:
+        """Get embeddings for texts, computing only the ones not cached"""
+        keys = [self._key(text) for text in texts]
+        found: Dict[str, np.ndarray] = {}
+
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+                    self.stats["memory_hits"] += 1
+
+            remaining = [key for key in dict.fromkeys(keys) if key not in found]
+            if remaining:
+                try:
+                    disk_found = self._read_disk(remaining)
+                except Exception as e:
+                    print(f"Error reading embedding cache: {str(e)}")
+                    disk_found = {}
+                for key, vector in disk_found.items():
+                    self._remember(key, vector)
+                    found[key] = vector
+                self.stats["disk_hits"] += len(disk_found)
+
+        # Embed all misses in one batch, outside the lock
+        missing = {}
+        for text, key in zip(texts, keys):
+            if key not in found and key not in missing:
+                missing[key] = text
+
+        if missing:
+            vectors = embed_fn(list(missing.values()))
+            computed = {
+                key: np.asarray(vector, dtype=np.float32)
+                for key, vector in zip(missing.keys(), vectors)
+            }
+            with self._lock:
+                self.stats["misses"] += len(computed)
+                for key, vector in computed.items():
+                    self._remember(key, vector)
+                try:
+                    self._write_disk(computed)
+                except Exception as e:
+                    print(f"Error writing embedding cache: {str(e)}")
+            found.update(computed)
+
+        return [found[key] for key in keys]
+
+    def get(self, text: str, embed_fn: Callable[[List[str]], List]) -> np.ndarray:
+        """Get the embedding for a single text"""
+        return self.get_many([text], embed_fn)[0]
+
+    def get_stats(self) -> Dict:
+        """Get hit/miss counters and tier sizes"""
+        with self._lock:
+            total = sum(self.stats.values())
+            hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+            return {
+                **self.stats,
+                "hit_rate": hits / total if total else 0.0,
+                "memory_entries": len(self._memory)
+            }
+
+    def close(self):
+        """Close the persistent tier"""
+        with self._lock:
+            if self._conn:
+                try:
+                    self._flush_access()
+                    self._conn.commit()
+                except Exception as e:
+                    print(f"Error writing embedding cache access times: {str(e)}")
+                self._conn.close()
+                self._conn = None
+
+
+
+"""
+EmbeddingCache: Two-Tier Query Embedding Cache for Health Chatbot
+
+This class caches text embeddings so repeated or near-identical queries
+("how to sleep better", "How to  sleep better") are embedded only once.
+
+Cache Tiers:
+1. Memory Tier:
+   - In-process LRU (OrderedDict)
+   - Bounded by memory_size entries
+   - Fastest lookups, lost on restart
+
+2. Disk Tier:
+   - SQLite table shared by all worker processes
+   - WAL journal for concurrent readers
+   - Bounded by disk_size entries, evicted by last access time
+   - Disk hits don't write on the read path: their access times are
+     batched and written every access_flush_size hits or
+     access_flush_interval seconds (and before evicting, and on close)
+
+Keys:
+- Text is lowercased and whitespace-collapsed before hashing; punctuation
+  is kept, since it is part of what gets embedded ("sleep better?" and
+  "sleep better" are separate entries)
+- SHA-256 of namespace + normalized text
+- The namespace should identify the embedding model, so vectors from
+  different models never mix
+
+Statistics:
+- memory_hits, disk_hits, misses
+- hit_rate and memory tier size via get_stats()
+
+Error Handling:
+- Disk tier failures fall back to memory-only caching
+- Embedding errors propagate to the caller
+
+Usage Example:
+cache = EmbeddingCache(db_path, namespace="all-MiniLM-L6-v2")
+vector = cache.get("how to sleep better", embedding_function)
+vectors = cache.get_many(["sleep", "stress"], embedding_function)
+"""
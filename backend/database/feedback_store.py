@@ -0,0 +1,229 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+class FeedbackStore:
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS feedback (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                timestamp REAL NOT NULL,
+                channel TEXT NOT NULL DEFAULT 'streamlit',
+                rating INTEGER NOT NULL,
+                comment TEXT NOT NULL DEFAULT ''
+            );
+            CREATE TABLE IF NOT EXISTS feedback_daily (
+                day TEXT NOT NULL,
+                channel TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                rating_sum INTEGER NOT NULL,
+                PRIMARY KEY (day, channel)
+            );
+            CREATE TABLE IF NOT EXISTS feedback_histogram (
+                day TEXT NOT NULL,
+                channel TEXT NOT NULL,
+                rating INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (day, channel, rating)
+            );
+            CREATE TABLE IF NOT EXISTS feedback_totals (
+                channel TEXT NOT NULL,
+                rating INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                rating_sum INTEGER NOT NULL,
+                PRIMARY KEY (channel, rating)
+            );
+        """)
+        # Stores written before feedback_totals existed: seed it from the histogram
+        # once (one statement, so concurrent workers can't seed it twice)
+        self._conn.execute("""
+            INSERT OR IGNORE INTO feedback_totals (channel, rating, count, rating_sum)
+            SELECT channel, rating, SUM(count), SUM(count) * rating
+            FROM feedback_histogram
+            WHERE NOT EXISTS (SELECT 1 FROM feedback_totals)
+            GROUP BY channel, rating
+        """)
+        self._conn.commit()
+
+    def _read_totals(self) -> Dict[str, Dict]:
+        """Per-channel totals from feedback_totals (caller holds the lock)"""
+        # One row per channel and rating, however many days are stored; read on
+        # every call rather than cached, so every worker sees the others' writes
+        totals: Dict[str, Dict] = {}
+        for row in self._conn.execute("SELECT channel, rating, count, rating_sum FROM feedback_totals"):
+            channel_totals = totals.setdefault(row["channel"], {"count": 0, "rating_sum": 0, "histogram": {}})
+            channel_totals["count"] += row["count"]
+            channel_totals["rating_sum"] += row["rating_sum"]
+            channel_totals["histogram"][row["rating"]] = row["count"]
+        return totals
+
+    def add_many(self, records: List[Dict]):
+        """Store feedback rows and update the aggregates in one transaction"""
+        rows = []
+        for record in records:
+            timestamp = record.get("timestamp") or datetime.now().timestamp()
+            rows.append((
+                record["user_id"],
+                timestamp,
+                record.get("channel", "streamlit"),
+                int(record["rating"]),
+                record.get("comment") or "",
+                datetime.fromtimestamp(timestamp).date().isoformat()
+            ))
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO feedback (user_id, timestamp, channel, rating, comment) VALUES (?, ?, ?, ?, ?)",
+                [row[:5] for row in rows]
+            )
+            self._conn.executemany(
+                """
+                INSERT INTO feedback_daily (day, channel, count, rating_sum) VALUES (?, ?, 1, ?)
+                ON CONFLICT (day, channel) DO UPDATE SET
+                    count = count + 1,
+                    rating_sum = rating_sum + excluded.rating_sum
+                """,
+                [(day, channel, rating) for _, _, channel, rating, _, day in rows]
+            )
+            self._conn.executemany(
+                """
+                INSERT INTO feedback_histogram (day, channel, rating, count) VALUES (?, ?, ?, 1)
+                ON CONFLICT (day, channel, rating) DO UPDATE SET count = count + 1
+                """,
+                [(day, channel, rating) for _, _, channel, rating, _, day in rows]
+            )
+            self._conn.executemany(
+                """
+                INSERT INTO feedback_totals (channel, rating, count, rating_sum) VALUES (?, ?, 1, ?)
+                ON CONFLICT (channel, rating) DO UPDATE SET
+                    count = count + 1,
+                    rating_sum = rating_sum + excluded.rating_sum
+                """,
+                [(channel, rating, rating) for _, _, channel, rating, _, _ in rows]
+            )
+            self._conn.commit()
+
+    def add(self, user_id: str, rating: int, comment: str = "", channel: str = "streamlit"):
+        """Store one feedback row"""
+        self.add_many([{"user_id": user_id, "rating": rating, "comment": comment, "channel": channel}])
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(count), 0) FROM feedback_totals").fetchone()[0]
+
+    @staticmethod
+    def _summary(count: int, rating_sum: int, histogram: Dict[int, int]) -> Dict:
+        return {
+            "count": count,
+            "mean": round(rating_sum / count, 3) if count else None,
+            "histogram": {str(rating): histogram[rating] for rating in sorted(histogram)}
+        }
+
+    def get_stats(self, days: Optional[int] = None) -> Dict:
+        """Overall and per-channel aggregates, plus daily rows for the last days if given"""
+        with self._lock:
+            channel_totals = self._read_totals()
+            overall_histogram: Dict[int, int] = {}
+            for totals in channel_totals.values():
+                for rating, count in totals["histogram"].items():
+                    overall_histogram[rating] = overall_histogram.get(rating, 0) + count
+
+            stats = {
+                "overall": self._summary(
+                    sum(totals["count"] for totals in channel_totals.values()),
+                    sum(totals["rating_sum"] for totals in channel_totals.values()),
+                    overall_histogram
+                ),
+                "channels": {
+                    channel: self._summary(totals["count"], totals["rating_sum"], totals["histogram"])
+                    for channel, totals in sorted(channel_totals.items())
+                }
+            }
+
+            if days:
+                since = (datetime.now().date() - timedelta(days=days - 1)).isoformat()
+                daily: Dict[str, Dict] = {}
+                for row in self._conn.execute(
+                    "SELECT day, channel, count, rating_sum FROM feedback_daily WHERE day >= ? ORDER BY day",
+                    (since,)
+                ):
+                    daily.setdefault(row["day"], {})[row["channel"]] = {
+                        "count": row["count"],
+                        "rating_sum": row["rating_sum"],
+                        "histogram": {}
+                    }
+                for row in self._conn.execute(
+                    "SELECT day, channel, rating, count FROM feedback_histogram WHERE day >= ?",
+                    (since,)
+                ):
+                    daily[row["day"]][row["channel"]]["histogram"][row["rating"]] = row["count"]
+
+                stats["daily"] = {
+                    day: {
+                        channel: self._summary(entry["count"], entry["rating_sum"], entry["histogram"])
+                        for channel, entry in channels.items()
+                    }
+                    for day, channels in daily.items()
+                }
+
+        return stats
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+
+"""
+FeedbackStore: Tabular Feedback Store with Incremental Aggregates
+
+This class keeps user feedback in SQLite instead of the vector store. Ratings
+are only ever aggregated, so comments are stored as plain text and never
+embedded.
+
+Table Structure:
+feedback:
+   - id, user_id, timestamp (POSIX seconds), channel, rating, comment
+
+feedback_daily (primary key day, channel):
+   - count: number of ratings
+   - rating_sum: sum of ratings (mean = rating_sum / count)
+
+feedback_histogram (primary key day, channel, rating):
+   - count: number of ratings with that value
+
+feedback_totals (primary key channel, rating):
+   - count, rating_sum: all-time totals, one row per channel and rating
+
+Incremental Aggregates:
+- add_many() inserts the rows and upserts the daily aggregates and the
+  totals in the same transaction, so aggregates never drift from the rows
+- get_stats() reads feedback_totals, whose size depends only on channels x
+  ratings (not on days stored), and never scans feedback; nothing is
+  cached in memory, so every worker sharing the file reports the same totals
+- Files created before feedback_totals existed are seeded from
+  feedback_histogram when opened
+- days=N adds the daily breakdown via a primary key range read
+
+Stats Format:
+{
+    "overall": {"count": 42, "mean": 4.2, "histogram": {"1": 1, ..., "5": 20}},
+    "channels": {"streamlit": {...}, "whatsapp": {...}},
+    "daily": {"2024-05-01": {"streamlit": {...}}}   # only with days=N
+}
+
+Usage Example:
+store = FeedbackStore(os.path.join(persist_directory, "feedback.sqlite3"))
+store.add("user123", 5, "Very helpful", channel="streamlit")
+stats = store.get_stats(days=7)
+"""
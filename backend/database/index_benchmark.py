@@ -0,0 +1,121 @@
+import argparse
+import tempfile
+import time
+from typing import Dict, List
+
+import numpy as np
+from .knowledge_index import KnowledgeIndex
+
+def synthetic_vectors(count: int, dimension: int, clusters: int = 64, seed: int = 0) -> np.ndarray:
+    """Clustered random vectors, closer to sentence embeddings than uniform noise"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimension)).astype(np.float32)
+    assignments = rng.integers(0, clusters, size=count)
+    return centers[assignments] + 0.6 * rng.normal(size=(count, dimension)).astype(np.float32)
+
+def collection_vectors(persist_directory: str, name: str) -> np.ndarray:
+    """Stored embeddings of an existing Chroma collection"""
+    import chromadb
+    client = chromadb.PersistentClient(path=persist_directory)
+    return np.asarray(client.get_collection(name).get(include=["embeddings"])["embeddings"], dtype=np.float32)
+
+def benchmark(vectors: np.ndarray, queries: int = 200, k: int = 10, rerank_factor: int = 4, seed: int = 1) -> List[Dict]:
+    """Recall@k against exact float32 search, plus memory and latency, per precision"""
+    rng = np.random.default_rng(seed)
+    ids = [str(i) for i in range(len(vectors))]
+    empty = [""] * len(vectors)
+    metadatas = [{}] * len(vectors)
+    # Queries near stored vectors, like paraphrases of known questions
+    picks = rng.integers(0, len(vectors), size=queries)
+    query_vectors = vectors[picks] + 0.3 * rng.normal(size=(queries, vectors.shape[1])).astype(np.float32)
+
+    exact = KnowledgeIndex("exact")
+    exact.build(ids, empty, metadatas, vectors)
+    truth = [set(exact.query(query, k)["ids"]) for query in query_vectors]
+
+    rows = []
+    with tempfile.TemporaryDirectory() as full_precision_dir:
+        configurations = [
+            ("float32", None),
+            ("float16", None),
+            ("float16", full_precision_dir),
+            ("int8", None),
+            ("int8", full_precision_dir)
+        ]
+        for precision, rerank_dir in configurations:
+            index = KnowledgeIndex(
+                f"bench_{precision}",
+                precision=precision,
+                rerank_factor=rerank_factor,
+                full_precision_dir=rerank_dir
+            )
+            index.build(ids, empty, metadatas, vectors)
+
+            latencies = []
+            hits = 0
+            for query, expected in zip(query_vectors, truth):
+                start = time.perf_counter()
+                found = index.query(query, k)["ids"]
+                latencies.append((time.perf_counter() - start) * 1000)
+                hits += len(expected.intersection(found))
+
+            rows.append({
+                "precision": precision,
+                "rerank": rerank_dir is not None,
+                "memory_mb": index.memory_bytes() / 2**20,
+                "recall": hits / (k * len(query_vectors)),
+                "p50_ms": float(np.percentile(latencies, 50)),
+                "p99_ms": float(np.percentile(latencies, 99))
+            })
+    return rows
+
+def print_report(rows: List[Dict], count: int, dimension: int, k: int):
+    print(f"{count} vectors x {dimension} dims, recall@{k} vs exact float32")
+    print(f"{'precision':<10}{'rerank':<8}{'memory MB':>10}{'recall':>9}{'p50 ms':>9}{'p99 ms':>9}")
+    for row in rows:
+        print(
+            f"{row['precision']:<10}{'yes' if row['rerank'] else 'no':<8}{row['memory_mb']:>10.1f}"
+            f"{row['recall']:>9.3f}{row['p50_ms']:>9.2f}{row['p99_ms']:>9.2f}"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall vs memory of quantized KnowledgeIndex storage")
+    parser.add_argument('--count', type=int, default=100000, help="synthetic vectors to index")
+    parser.add_argument('--dimension', type=int, default=384, help="synthetic vector size")
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--rerank-factor', type=int, default=4)
+    parser.add_argument('--chroma-dir', help="benchmark a stored collection instead of synthetic data")
+    parser.add_argument('--collection', default="health_tips")
+    args = parser.parse_args()
+
+    if args.chroma_dir:
+        data = collection_vectors(args.chroma_dir, args.collection)
+    else:
+        data = synthetic_vectors(args.count, args.dimension)
+    results = benchmark(data, queries=args.queries, k=args.k, rerank_factor=args.rerank_factor)
+    print_report(results, len(data), data.shape[1], args.k)
+
+
+
+"""
+Index Precision Benchmark for Health Chatbot
+
+This script measures what float16 and int8 storage in KnowledgeIndex cost in
+retrieval quality, and what they save in memory.
+
+What It Reports (per precision, with and without full-precision rerank):
+- memory MB: resident matrix size (int8 includes the per-row scales)
+- recall: recall@k of the top-k ids against exact float32 search
+- p50 / p99 ms: single-query latency
+
+Data:
+- Default: clustered synthetic 384-d vectors (same size as the default
+  embedding model), queries are noisy copies of stored vectors
+- --chroma-dir / --collection: the stored embeddings of a real collection
+
+Usage (from the backend directory):
+python -m database.index_benchmark
+python -m database.index_benchmark --count 1000000 --rerank-factor 8
+python -m database.index_benchmark --chroma-dir ../data/chromadb --collection products
+"""
@@ -0,0 +1,313 @@
+import argparse
+import os
+import sqlite3
+import time
+from typing import Dict, List, Optional
+
+import chromadb
+import numpy as np
+from .chat_retention import directory_size
+from .init_db import get_paths
+
+REBUILD_SUFFIX = "__rebuild"
+
+def open_client(chroma_dir: str):
+    return chromadb.PersistentClient(path=chroma_dir)
+
+def _vector_segments(chroma_dir: str) -> Dict[str, str]:
+    """collection id -> vector segment id, read from Chroma's SQLite catalog"""
+    catalog = os.path.join(chroma_dir, "chroma.sqlite3")
+    if not os.path.exists(catalog):
+        return {}
+    conn = sqlite3.connect(f"file:{catalog}?mode=ro", uri=True)
+    try:
+        return {
+            collection_id: segment_id
+            for segment_id, collection_id in conn.execute(
+                "SELECT id, collection FROM segments WHERE scope = 'VECTOR'"
+            )
+        }
+    finally:
+        conn.close()
+
+def _hnsw_config(collection) -> Dict:
+    return dict((collection.configuration or {}).get("hnsw") or {})
+
+def collection_stats(chroma_dir: str) -> List[Dict]:
+    """Size, HNSW parameters and vector index disk use of every collection"""
+    client = open_client(chroma_dir)
+    segments = _vector_segments(chroma_dir)
+    stats = []
+    for collection in sorted(client.list_collections(), key=lambda item: item.name):
+        hnsw = _hnsw_config(collection)
+        segment_id = segments.get(str(collection.id))
+        segment_dir = os.path.join(chroma_dir, segment_id) if segment_id else None
+        stats.append({
+            "name": collection.name,
+            "count": collection.count(),
+            "space": hnsw.get("space"),
+            "M": hnsw.get("max_neighbors"),
+            "ef_construction": hnsw.get("ef_construction"),
+            "ef_search": hnsw.get("ef_search"),
+            "index_bytes": directory_size(segment_dir) if segment_dir and os.path.isdir(segment_dir) else 0
+        })
+    return stats
+
+def _load_all(collection, batch_size: int = 1000, include: Optional[List[str]] = None) -> Dict:
+    """Page through a collection and return ids plus the requested fields"""
+    include = include or ["embeddings"]
+    data = {"ids": [], **{field: [] for field in include}}
+    offset = 0
+    while True:
+        page = collection.get(include=include, limit=batch_size, offset=offset)
+        if not page["ids"]:
+            break
+        data["ids"].extend(page["ids"])
+        for field in include:
+            data[field].extend(page[field])
+        offset += len(page["ids"])
+    return data
+
+def rebuild_collection(
+    chroma_dir: str,
+    name: str,
+    m: Optional[int] = None,
+    ef_construction: Optional[int] = None,
+    ef_search: Optional[int] = None,
+    space: Optional[str] = None,
+    batch_size: int = 1000
+) -> Dict:
+    """Recreate a collection with new HNSW parameters, reusing stored embeddings"""
+    client = open_client(chroma_dir)
+    names = {collection.name for collection in client.list_collections()}
+    temp_name = f"{name}{REBUILD_SUFFIX}"
+
+    if name not in names and temp_name in names:
+        # A previous rebuild stopped after dropping the original; finish it
+        client.get_collection(temp_name).modify(name=name)
+        print(f"Recovered {name} from {temp_name}")
+        return _hnsw_config(client.get_collection(name))
+
+    source = client.get_collection(name)
+    hnsw = _hnsw_config(source)
+    requested = {
+        "max_neighbors": m,
+        "ef_construction": ef_construction,
+        "ef_search": ef_search,
+        "space": space
+    }
+    changes = {key: value for key, value in requested.items() if value is not None and value != hnsw.get(key)}
+    if not changes:
+        print(f"{name}: parameters unchanged")
+        return hnsw
+
+    if set(changes) == {"ef_search"}:
+        # Search-time only; no need to rebuild the graph
+        source.modify(configuration={"hnsw": {"ef_search": changes["ef_search"]}})
+        print(f"{name}: ef_search set to {changes['ef_search']}")
+        return _hnsw_config(client.get_collection(name))
+
+    if temp_name in names:
+        client.delete_collection(temp_name)
+    new_hnsw = {
+        key: value for key, value in {**hnsw, **changes}.items()
+        if key in ("space", "max_neighbors", "ef_construction", "ef_search")
+    }
+    target = client.create_collection(
+        temp_name,
+        configuration={"hnsw": new_hnsw},
+        metadata=source.metadata
+    )
+
+    copied = 0
+    offset = 0
+    while True:
+        page = source.get(include=["embeddings", "documents", "metadatas"], limit=batch_size, offset=offset)
+        if not page["ids"]:
+            break
+        target.add(
+            ids=page["ids"],
+            embeddings=page["embeddings"],
+            documents=page["documents"],
+            metadatas=page["metadatas"]
+        )
+        copied += len(page["ids"])
+        offset += len(page["ids"])
+        print(f"{name}: copied {copied} items")
+
+    client.delete_collection(name)
+    target.modify(name=name)
+    print(f"{name}: rebuilt with {new_hnsw}")
+    if new_hnsw.get("space", "l2") != "l2":
+        print(
+            f"Warning: {name} now reports {new_hnsw['space']} distances; the app's "
+            "FAQ_MATCH_THRESHOLD and CONTEXT_MAX_DISTANCE assume squared L2"
+        )
+    return _hnsw_config(client.get_collection(name))
+
+def _brute_force(matrix: np.ndarray, queries: np.ndarray, k: int, space: str) -> np.ndarray:
+    """Exact top-k row positions per query for the collection's distance space"""
+    if space == "l2":
+        scores = -((queries ** 2).sum(axis=1)[:, None] - 2 * queries @ matrix.T + (matrix ** 2).sum(axis=1)[None, :])
+    elif space == "cosine":
+        unit = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        scores = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12) @ unit.T
+    else:
+        scores = queries @ matrix.T
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return top
+
+def benchmark_collection(
+    chroma_dir: str,
+    name: str,
+    k: int = 10,
+    queries: int = 100,
+    ef_search_values: Optional[List[int]] = None,
+    noise: float = 0.05,
+    seed: int = 0
+) -> List[Dict]:
+    """Recall@k of Chroma's HNSW results against brute force, with query latency"""
+    client = open_client(chroma_dir)
+    collection = client.get_collection(name)
+    hnsw = _hnsw_config(collection)
+    space = hnsw.get("space") or "l2"
+
+    data = _load_all(collection)
+    if not data["ids"]:
+        print(f"{name} is empty")
+        return []
+    matrix = np.asarray(data["embeddings"], dtype=np.float32)
+    k = min(k, len(matrix))
+
+    # Queries near stored vectors, like paraphrases of stored text
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, len(matrix), size=queries)
+    query_vectors = matrix[picks] + noise * rng.normal(size=(queries, matrix.shape[1])).astype(np.float32)
+
+    start = time.perf_counter()
+    truth_positions = _brute_force(matrix, query_vectors, k, space)
+    brute_force_ms = (time.perf_counter() - start) * 1000 / queries
+    truth = [{data["ids"][position] for position in row} for row in truth_positions]
+
+    original_ef_search = hnsw.get("ef_search")
+    results = []
+    try:
+        for ef_search in ef_search_values or [original_ef_search]:
+            if ef_search != original_ef_search:
+                collection.modify(configuration={"hnsw": {"ef_search": ef_search}})
+                collection = client.get_collection(name)
+
+            latencies = []
+            hits = 0
+            for query, expected in zip(query_vectors, truth):
+                start = time.perf_counter()
+                found = collection.query(query_embeddings=[query.tolist()], n_results=k, include=[])["ids"][0]
+                latencies.append((time.perf_counter() - start) * 1000)
+                hits += len(expected.intersection(found))
+
+            results.append({
+                "ef_search": ef_search,
+                "recall": hits / (k * queries),
+                "p50_ms": float(np.percentile(latencies, 50)),
+                "p99_ms": float(np.percentile(latencies, 99)),
+                "brute_force_ms": brute_force_ms
+            })
+    finally:
+        if ef_search_values and original_ef_search is not None:
+            collection.modify(configuration={"hnsw": {"ef_search": original_ef_search}})
+
+    return results
+
+def _print_stats(stats: List[Dict], chroma_dir: str):
+    print(f"{'collection':<24}{'count':>10}{'space':>8}{'M':>5}{'ef_con':>8}{'ef_srch':>8}{'index MB':>10}")
+    for row in stats:
+        print(
+            f"{row['name']:<24}{row['count']:>10}{str(row['space']):>8}{str(row['M']):>5}"
+            f"{str(row['ef_construction']):>8}{str(row['ef_search']):>8}{row['index_bytes'] / 2**20:>10.2f}"
+        )
+    print(f"Total on disk: {directory_size(chroma_dir) / 2**20:.2f} MB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect, rebuild and benchmark the ChromaDB HNSW indexes")
+    parser.add_argument('--chroma-dir', default=get_paths()["chroma_dir"])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("stats", help="per-collection size, HNSW parameters and disk use")
+
+    rebuild = commands.add_parser("rebuild", help="recreate a collection with new HNSW parameters")
+    rebuild.add_argument("collection")
+    rebuild.add_argument("--m", type=int, help="max neighbors per node (HNSW M)")
+    rebuild.add_argument("--ef-construction", type=int)
+    rebuild.add_argument("--ef-search", type=int)
+    rebuild.add_argument("--space", choices=["l2", "cosine", "ip"])
+    rebuild.add_argument("--batch-size", type=int, default=1000)
+
+    bench = commands.add_parser("bench", help="recall@k and latency against brute force")
+    bench.add_argument("collection")
+    bench.add_argument("--k", type=int, default=10)
+    bench.add_argument("--queries", type=int, default=100)
+    bench.add_argument("--ef-search", help="comma-separated ef_search values to compare")
+
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        _print_stats(collection_stats(args.chroma_dir), args.chroma_dir)
+    elif args.command == "rebuild":
+        rebuild_collection(
+            args.chroma_dir,
+            args.collection,
+            m=args.m,
+            ef_construction=args.ef_construction,
+            ef_search=args.ef_search,
+            space=args.space,
+            batch_size=args.batch_size
+        )
+    else:
+        ef_values = [int(value) for value in args.ef_search.split(",")] if args.ef_search else None
+        rows = benchmark_collection(args.chroma_dir, args.collection, k=args.k, queries=args.queries, ef_search_values=ef_values)
+        print(f"{args.collection}: recall@{args.k} vs brute force over {args.queries} queries")
+        print(f"{'ef_search':>10}{'recall':>9}{'p50 ms':>9}{'p99 ms':>9}{'brute ms':>10}")
+        for row in rows:
+            print(
+                f"{str(row['ef_search']):>10}{row['recall']:>9.3f}{row['p50_ms']:>9.2f}"
+                f"{row['p99_ms']:>9.2f}{row['brute_force_ms']:>10.2f}"
+            )
+
+
+
+"""
+Index Management Tool for Health Chatbot
+
+This CLI inspects and tunes the HNSW indexes behind the ChromaDB collections
+that ChromaDBManager creates (health_tips, products, faqs, chat_history...).
+
+Commands:
+
+1. stats:
+   - Item count per collection
+   - HNSW parameters: space, M (max_neighbors), ef_construction, ef_search
+   - Disk use of each collection's vector segment, and of the whole store
+
+2. rebuild <collection> [--m] [--ef-construction] [--ef-search] [--space]:
+   - ef_search only: changed in place (search-time parameter)
+   - Otherwise: items are copied with their stored embeddings (no model
+     run) into <collection>__rebuild with the new parameters, the original
+     is dropped and the copy renamed
+   - If a rebuild stops after the drop, rerunning it finishes the rename
+   - Changing space away from l2 changes the distance scale the app's
+     thresholds are tuned for; a warning is printed
+
+3. bench <collection> [--k] [--queries] [--ef-search 10,50,100]:
+   - Queries are stored vectors plus small noise
+   - Ground truth is exact (brute force) search in the collection's space
+   - Reports recall@k, p50/p99 Chroma query latency and brute force cost
+     per query, for each ef_search value (restored afterwards)
+
+Usage (from the repository root):
+python -m backend.database.index_tool stats
+python -m backend.database.index_tool rebuild chat_history_0 --m 32 --ef-construction 200
+python -m backend.database.index_tool bench products --k 5 --ef-search 10,50,100
+
+Note: Run rebuild with the app stopped; bench loads all embeddings of the
+collection into memory for the brute force baseline.
+"""
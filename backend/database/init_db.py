@@ -1,53 +1,125 @@
+import argparse
 import json
 import os
-from chromadb_manager import ChromaDBManager
+from typing import Dict, Iterator
+from .chromadb_manager import ChromaDBManager
+from .embedding_artifacts import build_artifacts
 
 def load_json_data(file_path):
     with open(file_path, 'r', encoding='utf-8') as file:
         return json.load(file)
 
-def init_database():
+def iter_json_items(file_path: str, key: str) -> Iterator[Dict]:
+    """Yield records from a JSON file ({key: [...]}) or a JSON Lines file"""
+    if file_path.endswith('.jsonl'):
+        # One record per line, streamed without loading the whole file
+        with open(file_path, 'r', encoding='utf-8') as file:
+            for line in file:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+    else:
+        yield from load_json_data(file_path)[key]
+
+def find_data_file(knowledge_dir: str, name: str) -> str:
+    """Prefer name.jsonl over name.json for large catalogs"""
+    jsonl_path = os.path.join(knowledge_dir, f'{name}.jsonl')
+    if os.path.exists(jsonl_path):
+        return jsonl_path
+    return os.path.join(knowledge_dir, f'{name}.json')
+
+def tip_items(file_path: str) -> Iterator[Dict]:
+    for tip in iter_json_items(file_path, 'tips'):
+        yield {
+            "id": tip['id'],
+            "document": tip['text'],
+            "metadata": {"category": tip['category']}
+        }
+
+def faq_items(file_path: str) -> Iterator[Dict]:
+    for faq in iter_json_items(file_path, 'faqs'):
+        yield {
+            "id": faq['id'],
+            "document": faq['question'],
+            "metadata": {"answer": faq['answer'], "category": faq['category']}
+        }
+
+def product_items(file_path: str) -> Iterator[Dict]:
+    for product in iter_json_items(file_path, 'products'):
+        yield {
+            "id": product['id'],
+            "document": product['description'],
+            "metadata": {
+                "name": product['name'],
+                "category": product['category'],
+                "price": product['price']
+            }
+        }
+
+def get_paths() -> Dict[str, str]:
     # Get the absolute path to the data directory
-    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     data_dir = os.path.join(base_dir, 'data')
-    chroma_dir = os.path.join(data_dir, 'chromadb')
+    knowledge_dir = os.path.join(data_dir, 'health_knowledge')
+    return {
+        "chroma_dir": os.path.join(data_dir, 'chromadb'),
+        "knowledge_dir": knowledge_dir,
+        "artifact_dir": os.path.join(knowledge_dir, 'embeddings')
+    }
+
+def knowledge_sources(knowledge_dir: str) -> Dict[str, Iterator[Dict]]:
+    """Upsert item streams for every knowledge collection"""
+    return {
+        "health_tips": tip_items(find_data_file(knowledge_dir, 'health_tips')),
+        "faqs": faq_items(find_data_file(knowledge_dir, 'faqs')),
+        "products": product_items(find_data_file(knowledge_dir, 'products'))
+    }
+
+def init_database(batch_size: int = 256, from_artifacts: bool = False) -> Dict[str, Dict]:
+    paths = get_paths()
     
-    # Create ChromaDB manager
-    db_manager = ChromaDBManager(chroma_dir)
+    # Create ChromaDB manager; with from_artifacts it ingests the precomputed
+    # vectors before seeding defaults, so the embedding model is not run
+    db_manager = ChromaDBManager(
+        paths["chroma_dir"],
+        write_behind=False,
+        artifact_dir=paths["artifact_dir"] if from_artifacts else None
+    )
     
-    # Load and insert health tips
-    tips_data = load_json_data(os.path.join(data_dir, 'health_knowledge', 'health_tips.json'))
-    for tip in tips_data['tips']:
-        db_manager.add_health_tip(
-            tip_id=tip['id'],
-            tip_text=tip['text'],
-            category=tip['category']
-        )
+    if from_artifacts:
+        return db_manager.artifact_load_stats
     
-    # Load and insert FAQs
-    faqs_data = load_json_data(os.path.join(data_dir, 'health_knowledge', 'faqs.json'))
-    for faq in faqs_data['faqs']:
-        db_manager.add_faq(
-            faq_id=faq['id'],
-            question=faq['question'],
-            answer=faq['answer'],
-            category=faq['category']
-        )
+    # Stream each file into batched upserts; unchanged items are skipped
+    return {
+        name: db_manager.bulk_upsert(name, items, batch_size=batch_size)
+        for name, items in knowledge_sources(paths["knowledge_dir"]).items()
+    }
+
+def build_embedding_artifacts(batch_size: int = 256) -> Dict:
+    """Embed the knowledge base offline and write versioned artifacts"""
+    from chromadb.utils import embedding_functions
     
-    # Load and insert products
-    products_data = load_json_data(os.path.join(data_dir, 'health_knowledge', 'products.json'))
-    for product in products_data['products']:
-        db_manager.add_product(
-            product_id=product['id'],
-            name=product['name'],
-            description=product['description'],
-            category=product['category'],
-            price=product['price']
-        )
+    paths = get_paths()
+    return build_artifacts(
+        knowledge_sources(paths["knowledge_dir"]),
+        paths["artifact_dir"],
+        embedding_functions.DefaultEmbeddingFunction(),
+        batch_size=batch_size
+    )
 
 if __name__ == "__main__":
-    init_database()
-    print("Database initialized successfully!")
+    parser = argparse.ArgumentParser(description="Load the health knowledge base into ChromaDB")
+    parser.add_argument('--batch-size', type=int, default=256, help="items per upsert/embedding batch")
+    parser.add_argument('--build-artifacts', action='store_true', help="write precomputed embedding artifacts")
+    parser.add_argument('--from-artifacts', action='store_true', help="load precomputed embeddings instead of embedding")
+    args = parser.parse_args()
+    
+    if args.build_artifacts:
+        manifest = build_embedding_artifacts(batch_size=args.batch_size)
+        print(f"Embedding artifacts version {manifest['version']} built successfully!")
+    else:
+        init_database(batch_size=args.batch_size, from_artifacts=args.from_artifacts)
+        print("Database initialized successfully!")
 
 
 
@@ -70,7 +142,8 @@ data/
 ├── health_knowledge/
 │   ├── health_tips.json
 │   ├── faqs.json
-│   └── products.json
+│   ├── products.json
+│   └── embeddings/        (optional, written by --build-artifacts)
 └── chromadb/
 
 JSON File Formats:
@@ -111,16 +184,27 @@ JSON File Formats:
     ]
 }
 
+Large catalogs can instead be shipped as JSON Lines (health_tips.jsonl,
+faqs.jsonl, products.jsonl), one record per line; a .jsonl file takes
+precedence over the .json file of the same name and is streamed.
+
 Functions:
 - load_json_data(): Loads and parses JSON files
+- iter_json_items(): Streams records from .json or .jsonl files
+- tip_items() / faq_items() / product_items(): Map records to upsert items
+- knowledge_sources(): Item streams for every knowledge collection
+- build_embedding_artifacts(): Writes versioned .npy/.json embedding artifacts
 - init_database(): Main initialization function that:
   1. Sets up ChromaDB manager
-  2. Loads JSON data
-  3. Populates database collections
+  2. Streams JSON data in batches
+  3. Upserts each batch with one embedding call, skipping items whose
+     content hash is unchanged since the last load
 
-Usage:
-python init_db.py
+Usage (from the backend directory):
+python -m database.init_db [--batch-size 256]
+python -m database.init_db --build-artifacts   # offline: embed and write artifacts
+python -m database.init_db --from-artifacts    # deploy: load without the model
 
-Note: This script should be run once during initial setup or when
-resetting the database with default data.
+Note: This script is idempotent. Re-running it only re-embeds items that
+were added or changed since the previous run.
 """
\ No newline at end of file
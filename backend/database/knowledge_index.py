@@ -0,0 +1,298 @@
+import os
+import uuid
+from typing import Dict, List, Optional
+
+import numpy as np
+
+PRECISIONS = ("float32", "float16", "int8")
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # Exists but belongs to someone else (or can't be checked); keep its files
+        return True
+    return True
+
+class KnowledgeIndex:
+    def __init__(
+        self,
+        name: str,
+        precision: str = "float32",
+        rerank_factor: int = 4,
+        full_precision_dir: Optional[str] = None,
+        block_rows: int = 4096
+    ):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unsupported index precision: {precision}")
+        self.name = name
+        self.precision = precision
+        self.rerank_factor = rerank_factor
+        self.full_precision_dir = full_precision_dir
+        self.block_rows = block_rows
+        self.ids: List[str] = []
+        self.documents: List[str] = []
+        self.metadatas: List[Dict] = []
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        # int8 only: per-row dequantization scale
+        self.scales = np.zeros(0, dtype=np.float32)
+        # Memory-mapped float32 rows used to rerank quantized candidates
+        self.full_matrix = None
+        self._masks: Dict[tuple, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def load(self, collection) -> int:
+        """Load all embeddings of a Chroma collection into memory"""
+        data = collection.get(include=["embeddings", "documents", "metadatas"])
+        self.build(
+            ids=data["ids"],
+            documents=data["documents"],
+            metadatas=data["metadatas"],
+            embeddings=data["embeddings"]
+        )
+        return len(self)
+
+    def build(
+        self,
+        ids: List[str],
+        documents: List[str],
+        metadatas: List[Dict],
+        embeddings
+    ):
+        """Build the index from parallel lists of ids, documents, metadatas and vectors"""
+        self.ids = list(ids)
+        self.documents = list(documents)
+        self.metadatas = [metadata or {} for metadata in metadatas]
+        self._masks = {}
+        self.scales = np.zeros(0, dtype=np.float32)
+        self.full_matrix = None
+
+        if not self.ids:
+            self.matrix = np.zeros((0, 0), dtype=np.float32)
+            return
+
+        # Contiguous, L2-normalized rows so a dot product is cosine similarity
+        matrix = np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix = matrix / norms
+
+        if self.precision == "float32":
+            self.matrix = matrix
+            return
+
+        if self.precision == "float16":
+            self.matrix = matrix.astype(np.float16)
+        else:
+            # Symmetric per-row int8: row ~= int8_row * scale
+            scales = np.abs(matrix).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            self.matrix = np.round(matrix / scales[:, None]).astype(np.int8)
+            self.scales = scales.astype(np.float32)
+
+        if self.full_precision_dir:
+            # Keep exact vectors on disk; only reranked rows get paged in
+            self.full_matrix = self._save_full_precision(matrix)
+
+    def _save_full_precision(self, matrix: np.ndarray) -> np.ndarray:
+        """Write the exact vectors to a file of this build only and memory-map it"""
+        os.makedirs(self.full_precision_dir, exist_ok=True)
+        # Never rewrite a file another index (or worker) may have mapped:
+        # truncating a mapped file kills its readers with SIGBUS
+        path = os.path.join(self.full_precision_dir, f"{self.name}-{os.getpid()}-{uuid.uuid4().hex[:8]}.npy")
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as f:
+            np.save(f, matrix)
+        os.replace(temp_path, path)
+        full_matrix = np.load(path, mmap_mode="r")
+        self._remove_stale_files(path)
+        return full_matrix
+
+    def _remove_stale_files(self, current_path: str):
+        """Delete earlier builds of this process and files of workers that have exited"""
+        prefix = f"{self.name}-"
+        for filename in os.listdir(self.full_precision_dir):
+            path = os.path.join(self.full_precision_dir, filename)
+            if path == current_path:
+                continue
+            if filename != f"{self.name}.npy":
+                # Besides the single shared file older versions wrote, only <name>-<pid>-<id>.npy
+                if not filename.startswith(prefix) or not filename.endswith(".npy"):
+                    continue
+                try:
+                    pid = int(filename[len(prefix):].split("-")[0])
+                except ValueError:
+                    continue
+                if pid != os.getpid() and _process_alive(pid):
+                    continue
+            try:
+                # Unlinking is safe for indexes still mapping the file; the data
+                # stays until they are released
+                os.remove(path)
+            except OSError as e:
+                print(f"Could not remove old index file {filename}: {str(e)}")
+
+    def memory_bytes(self) -> int:
+        """Resident size of the vectors used for scoring"""
+        return int(self.matrix.nbytes + self.scales.nbytes)
+
+    def _similarities(self, query: np.ndarray) -> np.ndarray:
+        """Approximate cosine similarity of every row, upcasting one block at a time"""
+        if self.precision == "float32":
+            return self.matrix @ query
+
+        similarities = np.empty(len(self), dtype=np.float32)
+        for start in range(0, len(self), self.block_rows):
+            block = self.matrix[start:start + self.block_rows].astype(np.float32)
+            similarities[start:start + len(block)] = block @ query
+        if self.precision == "int8":
+            similarities *= self.scales
+        return similarities
+
+    def _field_mask(self, field: str, value) -> np.ndarray:
+        """Get (and memoize) the boolean row mask for metadata[field] == value"""
+        key = (field, value)
+        if key not in self._masks:
+            self._masks[key] = np.array(
+                [metadata.get(field) == value for metadata in self.metadatas],
+                dtype=bool
+            )
+        return self._masks[key]
+
+    def _mask(self, where: Dict) -> np.ndarray:
+        """Translate a simple Chroma where filter into a row mask"""
+        mask = np.ones(len(self), dtype=bool)
+        for field, condition in where.items():
+            if field == "$and":
+                for clause in condition:
+                    mask &= self._mask(clause)
+            elif field.startswith("$"):
+                raise ValueError(f"Unsupported filter operator: {field}")
+            elif isinstance(condition, dict):
+                if set(condition) == {"$eq"}:
+                    mask &= self._field_mask(field, condition["$eq"])
+                elif set(condition) == {"$in"}:
+                    field_mask = np.zeros(len(self), dtype=bool)
+                    for value in condition["$in"]:
+                        field_mask |= self._field_mask(field, value)
+                    mask &= field_mask
+                else:
+                    raise ValueError(f"Unsupported filter on {field}: {condition}")
+            else:
+                mask &= self._field_mask(field, condition)
+        return mask
+
+    def query(self, query_embedding, n_results: int, where: Optional[Dict] = None) -> Dict:
+        """Get the top n_results rows by cosine similarity, optionally filtered"""
+        if len(self) == 0 or n_results <= 0:
+            return {'ids': [], 'documents': [], 'metadatas': [], 'distances': []}
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+
+        similarities = self._similarities(query)
+        if where:
+            mask = self._mask(where)
+            similarities = np.where(mask, similarities, -np.inf)
+            n_results = min(n_results, int(mask.sum()))
+        n_results = min(n_results, len(self))
+        if n_results == 0:
+            return {'ids': [], 'documents': [], 'metadatas': [], 'distances': []}
+
+        if self.full_matrix is not None:
+            # Shortlist on quantized scores, then rescore the shortlist exactly
+            candidates = min(len(self), n_results * self.rerank_factor)
+            if where:
+                candidates = min(candidates, int(mask.sum()))
+            shortlist = np.sort(np.argpartition(-similarities, candidates - 1)[:candidates])
+            exact = np.asarray(self.full_matrix[shortlist]) @ query
+            order = np.argsort(-exact)[:n_results]
+            top = shortlist[order]
+            scores = exact[order]
+        else:
+            top = np.argpartition(-similarities, n_results - 1)[:n_results]
+            top = top[np.argsort(-similarities[top])]
+            scores = similarities[top]
+
+        # Squared L2 between unit vectors, matching Chroma's default "l2" space
+        distances = 2.0 - 2.0 * scores
+
+        return {
+            'ids': [self.ids[i] for i in top],
+            'documents': [self.documents[i] for i in top],
+            'metadatas': [self.metadatas[i] for i in top],
+            'distances': [float(d) for d in distances]
+        }
+
+
+
+"""
+KnowledgeIndex: In-Memory Vector Index for the Static Knowledge Base
+
+This class holds the embeddings of a small, read-mostly collection (health tips,
+products, FAQs) in a contiguous float32 matrix and answers top-k queries with a single
+vectorized dot product, avoiding a round trip through Chroma's persistent client.
+
+Key Features:
+1. Storage:
+   - L2-normalized matrix (one row per document) in one of three precisions:
+     float32 (4 bytes/dim), float16 (2 bytes/dim) or int8 with a float32
+     scale per row (1 byte/dim + 4 bytes/row)
+   - Quantized matrices are scored block by block (block_rows), upcast to
+     float32, so queries never materialize a full float32 copy
+   - Parallel id, document and metadata lists
+
+   Full-Precision Rerank (float16 / int8 with full_precision_dir):
+   - The exact float32 rows are saved as <name>-<pid>-<build id>.npy (via a
+     temp file and os.replace) and memory-mapped; a file is never rewritten
+     while mapped, since truncating it would crash readers with SIGBUS
+   - Earlier builds of this process and files of exited workers are
+     unlinked after a build (mapped data stays valid until released)
+   - A query shortlists n_results * rerank_factor rows on quantized scores,
+     then rescores only those rows exactly, so reported distances are exact
+   - Without full_precision_dir, quantized scores are used directly
+   - database/index_benchmark.py reports recall@k against float32 and
+     memory per precision
+   - float16 -> float32 upcasting is slow in numpy, so float16 queries cost
+     more CPU than int8 ones; int8 + rerank is usually the better trade
+
+2. Search:
+   - Cosine similarity via matrix-vector product
+   - argpartition top-k selection
+   - Distances reported as squared L2 between unit vectors (2 - 2 * cosine),
+     the same scale as Chroma's default "l2" space
+
+3. Filtering:
+   - Equality filters such as {"category": "sleep"}
+   - {"$eq": value}, {"$in": [...]} and "$and" clauses
+   - Per-value masks are memoized, so category filters cost one np.where
+   - Unsupported filters raise ValueError so callers can fall back to Chroma
+
+Output Format:
+{
+    'ids': [...],
+    'documents': [...],
+    'metadatas': [...],
+    'distances': [...]
+}
+
+Usage Example:
+index = KnowledgeIndex("health_tips")
+index.load(chroma_collection)
+results = index.query(query_embedding, 5, where={"category": "sleep"})
+
+quantized = KnowledgeIndex("products", precision="int8", full_precision_dir=index_cache_dir)
+
+Scope: Only the static knowledge collections use this index; chat history
+shards are written continuously and stay in Chroma's float32 HNSW index.
+
+Note: The index is a read-only snapshot. It must be reloaded after the
+underlying collection changes (ChromaDBManager does this for its own writes;
+data loaded by another process is picked up on restart).
+"""
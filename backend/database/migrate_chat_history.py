@@ -0,0 +1,133 @@
+import argparse
+import re
+from typing import Dict, List, Optional
+from .chromadb_manager import ChromaDBManager
+from .init_db import get_paths
+
+CHAT_COLLECTION_PATTERN = re.compile(r"^chat_history(_\d+)?$")
+
+def find_source_collections(db_manager: ChromaDBManager) -> List[str]:
+    """Every chat history collection, including the shards of the current layout"""
+    db_manager._ensure_ready()
+    return sorted(
+        collection.name
+        for collection in db_manager.client.list_collections()
+        if CHAT_COLLECTION_PATTERN.match(collection.name)
+    )
+
+def migrate_chat_history(
+    db_manager: ChromaDBManager,
+    source_names: Optional[List[str]] = None,
+    batch_size: int = 500,
+    keep_source: bool = False
+) -> Dict[str, int]:
+    """Move chat turns into the user's current shard, reusing stored embeddings"""
+    current = {shard.name for shard in db_manager.chat_history_shards}
+    moved: Dict[str, int] = {}
+    for source_name in source_names or find_source_collections(db_manager):
+        source = db_manager.client.get_collection(
+            name=source_name,
+            embedding_function=db_manager.embedding_function
+        )
+        # A shard of the current layout keeps the rows that hash to it; only
+        # rows placed with a different shard count move (never copied)
+        in_layout = source_name in current
+        moved[source_name] = 0
+        offset = 0
+
+        while True:
+            # Deleted rows leave the collection, so the offset only skips rows that stay
+            batch = source.get(
+                include=["documents", "metadatas", "embeddings"],
+                limit=batch_size,
+                offset=offset
+            )
+            if not batch["ids"]:
+                break
+
+            by_shard: Dict[str, tuple] = {}
+            for position, metadata in enumerate(batch["metadatas"]):
+                shard = db_manager.chat_shard_for((metadata or {}).get("user_id", ""))
+                if shard.name == source_name:
+                    continue
+                by_shard.setdefault(shard.name, (shard, []))[1].append(position)
+
+            moved_ids = []
+            for shard, positions in by_shard.values():
+                # upsert keeps reruns of an interrupted migration idempotent
+                shard.upsert(
+                    ids=[batch["ids"][position] for position in positions],
+                    embeddings=[batch["embeddings"][position] for position in positions],
+                    documents=[batch["documents"][position] for position in positions],
+                    metadatas=[batch["metadatas"][position] for position in positions]
+                )
+                db_manager.invalidate_count(shard)
+                moved_ids += [batch["ids"][position] for position in positions]
+
+            if keep_source and not in_layout:
+                offset += len(batch["ids"])
+            else:
+                if moved_ids:
+                    source.delete(ids=moved_ids)
+                    db_manager.invalidate_count(source)
+                offset += len(batch["ids"]) - len(moved_ids)
+            moved[source_name] += len(moved_ids)
+            if moved_ids:
+                print(f"{source_name}: moved {moved[source_name]} turns")
+
+        if not keep_source and not in_layout:
+            db_manager.client.delete_collection(name=source_name)
+            print(f"Dropped {source_name}")
+
+    db_manager.record_chat_shard_count()
+    return {name: count for name, count in moved.items() if count or name not in current}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move chat history into hashed shard collections")
+    parser.add_argument('--shards', type=int, required=True, help="target shard count (CHAT_HISTORY_SHARDS)")
+    parser.add_argument('--batch-size', type=int, default=500, help="turns per read/upsert batch")
+    parser.add_argument('--keep-source', action='store_true', help="copy instead of move")
+    args = parser.parse_args()
+
+    db_manager = ChromaDBManager(
+        get_paths()["chroma_dir"],
+        write_behind=False,
+        chat_history_shards=args.shards
+    )
+    result = migrate_chat_history(db_manager, batch_size=args.batch_size, keep_source=args.keep_source)
+    print(f"Migrated chat history: {result or 'nothing to migrate'}")
+
+
+
+"""
+Chat History Migration Tool for Health Chatbot
+
+This script moves chat turns from the single chat_history collection (or from
+shards of a different shard count) into the hashed shard collections
+chat_history_0 .. chat_history_<N-1> used by ChromaDBManager.
+
+How It Works:
+- Source collections: every chat_history / chat_history_<n> collection,
+  including those whose names the target layout reuses (going from 4 to 6
+  shards, chat_history_0..3 hold turns placed with crc32(user_id) % 4)
+- In a shard of the target layout only the turns whose shard changed are
+  moved; the others stay where they are
+- Turns are read in batches together with their stored embeddings, so
+  nothing is re-embedded
+- Each turn (and rollup summary) goes to shard crc32(user_id) % N
+- Writes use upsert and each migrated batch is deleted from the source, so
+  an interrupted run can simply be restarted
+- Emptied source collections outside the target layout are dropped (unless
+  --keep-source, which copies from them; shards of the target layout are
+  always moved from)
+- The shard count is recorded afterwards (chat_shards.json), which clears
+  the startup warning ChromaDBManager prints after CHAT_HISTORY_SHARDS changes
+
+Usage (from the backend directory, with the app stopped):
+python -m database.migrate_chat_history --shards 8
+python -m database.migrate_chat_history --shards 6   # after running with 4
+python -m database.migrate_chat_history --shards 8 --keep-source
+
+Afterwards set CHAT_HISTORY_SHARDS to the same N (the default, 1, keeps the
+single chat_history collection, so upgrades need no migration).
+"""
@@ -0,0 +1,168 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+class ProfileStore:
+    def __init__(self, db_path: str, cache_size: int = 1024, cache_ttl: float = 30.0):
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS user_profiles (
+                user_id TEXT PRIMARY KEY,
+                version INTEGER NOT NULL,
+                profile TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+        # user_id -> (profile JSON, cached_at); JSON so callers never share a mutable dict
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.conflicts = 0
+
+    def _cache_put(self, user_id: str, payload: str):
+        self._cache[user_id] = (payload, time.monotonic())
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def get(self, user_id: str) -> Optional[Dict]:
+        """Get a profile (with its "version") from the cache or the primary key"""
+        with self._lock:
+            cached = self._cache.get(user_id)
+            if cached and time.monotonic() - cached[1] < self.cache_ttl:
+                self._cache.move_to_end(user_id)
+                self.hits += 1
+                return json.loads(cached[0])
+
+            self.misses += 1
+            row = self._conn.execute(
+                "SELECT version, profile FROM user_profiles WHERE user_id = ?",
+                (user_id,)
+            ).fetchone()
+            if row is None:
+                self._cache.pop(user_id, None)
+                return None
+
+            profile = json.loads(row[1])
+            profile["version"] = row[0]
+            self._cache_put(user_id, json.dumps(profile))
+            return profile
+
+    def put(self, user_id: str, profile: Dict, expected_version: Optional[int] = None) -> Optional[int]:
+        """Write a profile and return its new version, or None if expected_version is stale"""
+        data = {key: value for key, value in profile.items() if key != "version"}
+        payload = json.dumps(data, ensure_ascii=False)
+
+        with self._lock:
+            if expected_version is None:
+                row = self._conn.execute(
+                    """
+                    INSERT INTO user_profiles (user_id, version, profile, updated_at) VALUES (?, 1, ?, ?)
+                    ON CONFLICT (user_id) DO UPDATE SET
+                        version = version + 1,
+                        profile = excluded.profile,
+                        updated_at = excluded.updated_at
+                    RETURNING version
+                    """,
+                    (user_id, payload, time.time())
+                ).fetchone()
+            elif expected_version == 0:
+                # Version 0 means "must not exist yet"
+                row = self._conn.execute(
+                    """
+                    INSERT INTO user_profiles (user_id, version, profile, updated_at) VALUES (?, 1, ?, ?)
+                    ON CONFLICT (user_id) DO NOTHING
+                    RETURNING version
+                    """,
+                    (user_id, payload, time.time())
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    """
+                    UPDATE user_profiles SET version = version + 1, profile = ?, updated_at = ?
+                    WHERE user_id = ? AND version = ?
+                    RETURNING version
+                    """,
+                    (payload, time.time(), user_id, expected_version)
+                ).fetchone()
+            self._conn.commit()
+
+            if row is None:
+                self.conflicts += 1
+                self._cache.pop(user_id, None)
+                return None
+
+            data["version"] = row[0]
+            self._cache_put(user_id, json.dumps(data, ensure_ascii=False))
+            return row[0]
+
+    def delete(self, user_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM user_profiles WHERE user_id = ?", (user_id,))
+            self._conn.commit()
+            self._cache.pop(user_id, None)
+
+    def get_stats(self) -> Dict:
+        """Get cache hit/miss and write conflict counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "cached": len(self._cache),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "conflicts": self.conflicts
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+
+"""
+ProfileStore: Key-Value User Profile Store for Health Chatbot
+
+This class stores user profiles as JSON in a SQLite table keyed by user_id,
+replacing the Chroma user_profiles collection (which scanned metadata with a
+where filter, embedded a placeholder document on every write and could not
+hold list fields such as key_topics).
+
+Table Structure:
+user_profiles:
+   - user_id: primary key
+   - version: incremented on every write
+   - profile: JSON document (lists and nested dicts allowed)
+   - updated_at: POSIX seconds
+
+Read-Through Cache:
+- get() serves from an in-process LRU (cache_size entries)
+- Entries older than cache_ttl seconds are re-read, so writes made by other
+  worker processes become visible
+- Misses are a primary key lookup; returned profiles include "version"
+
+Versioned Writes:
+- put(user_id, profile) overwrites and bumps the version
+- put(..., expected_version=n) only succeeds if the stored version is still
+  n (0 = profile must not exist yet); otherwise it returns None, counts a
+  conflict and drops the cached entry so the caller can re-read and retry
+
+Usage Example:
+store = ProfileStore(os.path.join(persist_directory, "profiles.sqlite3"))
+profile = store.get("user123") or {"user_id": "user123", "key_topics": []}
+profile["key_topics"].append("sleep")
+version = store.put("user123", profile, expected_version=profile.get("version", 0))
+"""
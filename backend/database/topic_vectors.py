@@ -0,0 +1,100 @@
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+# Same vocabulary as UserProfileManager._extract_topics, with a few phrases per
+# topic so each centroid covers how the topic is actually asked about
+DEFAULT_TOPIC_PHRASES: Dict[str, List[str]] = {
+    "sleep": ["sleep", "improving sleep quality", "insomnia and trouble falling asleep"],
+    "stress": ["stress", "managing stress", "feeling overwhelmed and tense"],
+    "anxiety": ["anxiety", "coping with anxiety", "worry and nervousness"],
+    "diet": ["diet", "healthy eating habits", "what to eat for a balanced diet"],
+    "exercise": ["exercise", "physical activity and workouts", "staying active and fit"],
+    "nutrition": ["nutrition", "vitamins, minerals and nutrients", "nutritional value of food"],
+    "supplements": ["supplements", "dietary supplements and vitamins", "taking supplements safely"],
+    "meditation": ["meditation", "mindfulness and breathing exercises", "relaxation techniques"],
+    "wellness": ["wellness", "overall health and wellbeing", "healthy lifestyle habits"]
+}
+
+def _normalize(vector: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+class TopicVectors:
+    def __init__(self, topic_phrases: Optional[Dict[str, List[str]]] = None):
+        self.topic_phrases = topic_phrases or DEFAULT_TOPIC_PHRASES
+        self.centroids: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.centroids)
+
+    def build(self, embed_many: Callable[[List[str]], List]):
+        """Embed every topic phrase in one call and store a unit centroid per topic"""
+        phrases = [phrase for topic in self.topic_phrases for phrase in self.topic_phrases[topic]]
+        vectors = np.asarray(embed_many(phrases), dtype=np.float32)
+
+        centroids = {}
+        position = 0
+        for topic, topic_phrases in self.topic_phrases.items():
+            rows = vectors[position:position + len(topic_phrases)]
+            centroids[topic] = _normalize(rows.mean(axis=0))
+            position += len(topic_phrases)
+
+        with self._lock:
+            self.centroids = centroids
+        print(f"Built {len(centroids)} topic centroids")
+
+    def add_topic(self, topic: str, embedding: List[float]):
+        """Register a topic outside the default vocabulary (e.g. from an old profile)"""
+        with self._lock:
+            self.centroids[topic] = _normalize(np.asarray(embedding, dtype=np.float32))
+
+    def profile_vector(self, topics: Iterable[str]) -> Optional[np.ndarray]:
+        """Unit mean of the known topics' centroids, or None if none are known"""
+        with self._lock:
+            vectors = [self.centroids[topic] for topic in topics if topic in self.centroids]
+        if not vectors:
+            return None
+        return _normalize(np.mean(vectors, axis=0))
+
+    @staticmethod
+    def blend(query_embedding: List[float], profile_vector: np.ndarray, weight: float) -> List[float]:
+        """Unit-normalized (1 - weight) * query + weight * profile"""
+        query = _normalize(np.asarray(query_embedding, dtype=np.float32))
+        return _normalize((1.0 - weight) * query + weight * profile_vector).tolist()
+
+
+
+"""
+TopicVectors: Precomputed Topic Centroids for Profile Personalization
+
+This class holds one unit-length embedding centroid per health topic, so a
+user's interests (profile key_topics) can be applied to retrieval in vector
+space instead of by appending topic words to the query text.
+
+Why Vector-Space Personalization:
+- Appending topics changed the text that was embedded, so every user needed
+  a fresh embedding for the same question and the embedding cache never hit
+- Blending keeps the (cached) query embedding and adds the user's topic
+  vector: one vector add and normalization per personalized query
+
+Centroids:
+- Each topic has a few descriptive phrases (DEFAULT_TOPIC_PHRASES, the same
+  vocabulary UserProfileManager extracts)
+- build() embeds all phrases in one call; centroid = normalized mean
+- Topics outside the vocabulary can be added with add_topic()
+
+Blending:
+- profile_vector(topics) = normalized mean of the known topic centroids
+- blend(q, p, w) = normalize((1 - w) * q + w * p)
+- With unit vectors, results stay comparable with the squared L2
+  distances used elsewhere (0 = identical, 4 = opposite)
+
+Usage Example:
+topic_vectors = TopicVectors()
+topic_vectors.build(embedding_function)
+profile_vector = topic_vectors.profile_vector(["sleep", "stress"])
+query_embedding = TopicVectors.blend(query_embedding, profile_vector, 0.2)
+"""
@@ -0,0 +1,248 @@
+import json
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+class WriteBehindQueue:
+    def __init__(
+        self,
+        flush_fn: Callable[[List[Dict]], Optional[List[Dict]]],
+        max_batch: int = 64,
+        flush_interval: float = 1.0,
+        max_queue: int = 10000,
+        name: str = "write-behind",
+        max_attempts: int = 5,
+        retry_delay: float = 1.0,
+        max_retry_delay: float = 60.0,
+        dead_letter_path: Optional[str] = None
+    ):
+        self.flush_fn = flush_fn
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.dead_letter_path = dead_letter_path
+
+        self._queue: "queue.Queue[Dict]" = queue.Queue(maxsize=max_queue)
+        self._flush_lock = threading.Lock()
+        # Failed records waiting for their next attempt: (due time, record)
+        self._retry_lock = threading.Lock()
+        self._retries: List[Tuple[float, Dict]] = []
+        self._closed = False
+        self.stats = {
+            "enqueued": 0,
+            "written": 0,
+            "batches": 0,
+            "inline_writes": 0,
+            "failed": 0,
+            "retried": 0,
+            "dead_lettered": 0,
+            "replayed": 0
+        }
+
+        self._replay_dead_letters()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def put(self, record: Dict):
+        """Queue a record; writes it inline if the queue is full or closed"""
+        if not self._closed:
+            try:
+                self._queue.put_nowait(record)
+                self.stats["enqueued"] += 1
+                return
+            except queue.Full:
+                pass
+
+        # Backpressure: the caller pays for the write instead of losing it
+        self.stats["inline_writes"] += 1
+        self._write([record])
+
+    def _write(self, batch: List[Dict]):
+        """Write a batch; records the flush function reports as failed are retried"""
+        with self._flush_lock:
+            try:
+                failed = self.flush_fn(batch) or []
+            except Exception as e:
+                print(f"Error in write-behind flush: {str(e)}")
+                failed = batch
+            self.stats["written"] += len(batch) - len(failed)
+            self.stats["batches"] += 1
+
+        if failed:
+            self.stats["failed"] += len(failed)
+            self._schedule_retry(failed)
+
+    def _schedule_retry(self, records: List[Dict]):
+        """Retry with exponential backoff; records out of attempts go to the dead-letter file"""
+        now = time.monotonic()
+        exhausted = []
+        with self._retry_lock:
+            for record in records:
+                record["attempts"] = record.get("attempts", 0) + 1
+                if self._closed or record["attempts"] >= self.max_attempts:
+                    exhausted.append(record)
+                    continue
+                delay = min(self.retry_delay * 2 ** (record["attempts"] - 1), self.max_retry_delay)
+                self._retries.append((now + delay, record))
+                self.stats["retried"] += 1
+        if exhausted:
+            self._dead_letter(exhausted)
+
+    def _due_retries(self, limit: int) -> List[Dict]:
+        now = time.monotonic()
+        with self._retry_lock:
+            due = [entry for entry in self._retries if entry[0] <= now][:limit]
+            for entry in due:
+                self._retries.remove(entry)
+        return [record for _, record in due]
+
+    def _next_retry_in(self) -> float:
+        with self._retry_lock:
+            if not self._retries:
+                return self.flush_interval
+            return max(0.0, min(due for due, _ in self._retries) - time.monotonic())
+
+    def _dead_letter(self, records: List[Dict]):
+        """Keep records that could not be written, to be replayed on the next start"""
+        self.stats["dead_lettered"] += len(records)
+        if not self.dead_letter_path:
+            print(f"Error: {len(records)} records could not be written and no dead-letter file is set")
+            return
+        try:
+            with self._retry_lock, open(self.dead_letter_path, "a") as f:
+                for record in records:
+                    f.write(json.dumps(record) + "\n")
+            print(f"Moved {len(records)} unwritable records to {self.dead_letter_path}")
+        except Exception as e:
+            print(f"Error writing dead-letter records: {str(e)}")
+
+    def _replay_dead_letters(self):
+        """Requeue records left in the dead-letter file by a previous run"""
+        if not self.dead_letter_path or not os.path.exists(self.dead_letter_path):
+            return
+        try:
+            replay_path = f"{self.dead_letter_path}.replay"
+            os.replace(self.dead_letter_path, replay_path)
+            with open(replay_path) as f:
+                records = [json.loads(line) for line in f if line.strip()]
+            requeued = 0
+            for record in records:
+                # Fresh attempts; "replayed" tells the writer it may have been written in part
+                record["attempts"] = 0
+                record["replayed"] = True
+                try:
+                    self._queue.put_nowait(record)
+                    requeued += 1
+                except queue.Full:
+                    break
+            os.remove(replay_path)
+            if requeued < len(records):
+                # More than fits in the queue; the rest waits for the next start
+                with open(self.dead_letter_path, "a") as f:
+                    for record in records[requeued:]:
+                        f.write(json.dumps(record) + "\n")
+            self.stats["replayed"] = requeued
+            print(f"Requeued {requeued} dead-letter records")
+        except Exception as e:
+            print(f"Error replaying dead-letter records: {str(e)}")
+
+    def _run(self):
+        """Collect records until the batch is full or the interval elapses, then flush"""
+        while True:
+            batch = self._due_retries(self.max_batch)
+            from_queue = 0
+            try:
+                if not batch:
+                    # Wake up for the next due retry even if nothing new is queued
+                    timeout = max(0.01, min(self.flush_interval, self._next_retry_in()))
+                    batch.append(self._queue.get(timeout=timeout))
+                    from_queue = 1
+            except queue.Empty:
+                if self._closed:
+                    return
+                continue
+
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                    from_queue += 1
+                except queue.Empty:
+                    break
+
+            self._write(batch)
+            for _ in range(from_queue):
+                self._queue.task_done()
+
+    def flush(self):
+        """Block until every queued record has been written (or scheduled for retry)"""
+        self._queue.join()
+
+    def close(self, timeout: float = 10.0):
+        """Flush pending records, stop the background thread, and make a last attempt at retries"""
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        self._thread.join(timeout=timeout)
+
+        with self._retry_lock:
+            pending = [record for _, record in self._retries]
+            self._retries.clear()
+        if pending:
+            # Closed: whatever fails now goes straight to the dead-letter file
+            self._write(pending)
+
+    def get_stats(self) -> Dict:
+        with self._retry_lock:
+            retry_pending = len(self._retries)
+        return {**self.stats, "pending": self._queue.qsize(), "retry_pending": retry_pending}
+
+
+
+"""
+WriteBehindQueue: Background Batched Persistence for Health Chatbot
+
+This class takes database writes off the request path. Callers enqueue records
+and return immediately; a daemon thread groups them into batches and hands each
+batch to a flush function (which can embed and insert the whole batch at once).
+
+Flush Triggers:
+- Batch size reaches max_batch
+- flush_interval seconds pass since the first record of the batch
+- flush() / close() calls (close is registered at interpreter exit by
+  ChromaDBManager so pending records are not lost on shutdown)
+
+Failures:
+- The flush function returns the records it could not write (a writer
+  that raises fails the whole batch)
+- Failed records are retried with exponential backoff (retry_delay,
+  doubling up to max_retry_delay) for up to max_attempts attempts
+- Records out of attempts, or failing during close(), are appended to
+  dead_letter_path (JSON lines) and requeued when the next queue starts,
+  so failed writes are kept rather than dropped
+
+Backpressure:
+- The queue is bounded by max_queue records
+- When full (or after close), put() writes the record inline, so records
+  are slowed down rather than dropped
+
+Statistics:
+- enqueued, written, batches, inline_writes, pending
+- failed (write failures), retried, retry_pending, dead_lettered, replayed
+
+Usage Example:
+writer = WriteBehindQueue(db_manager._write_records, max_batch=64, flush_interval=1.0)
+writer.put({"kind": "chat", "user_id": "user123", ...})
+writer.close()
+
+Note: Reads that go through the written stores (e.g. chat history) see
+queued records only after the next flush, at most flush_interval later.
+"""
@@ -0,0 +1,76 @@
+import hashlib
+
+import numpy as np
+import pytest
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+from chromadb.utils import embedding_functions
+
+from database.chromadb_manager import ChromaDBManager
+from database.migrate_chat_history import migrate_chat_history
+
+USERS = [f"user{i}" for i in range(20)]
+
+class HashEmbeddingFunction(EmbeddingFunction):
+    """Deterministic bag-of-words vectors, so the test needs no ONNX model"""
+    def __init__(self):
+        pass
+
+    def __call__(self, input: Documents) -> Embeddings:
+        vectors = []
+        for text in input:
+            vector = np.zeros(384, dtype=np.float32)
+            for word in text.lower().split():
+                vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % 384] += 1
+            vectors.append(vector / (np.linalg.norm(vector) or 1.0))
+        return vectors
+
+    @staticmethod
+    def name() -> str:
+        return "default"
+
+    def get_config(self):
+        return {}
+
+    @staticmethod
+    def build_from_config(config):
+        return HashEmbeddingFunction()
+
+@pytest.fixture(autouse=True)
+def hash_embeddings(monkeypatch):
+    monkeypatch.setattr(embedding_functions, "DefaultEmbeddingFunction", HashEmbeddingFunction)
+
+def open_manager(path, shards: int) -> ChromaDBManager:
+    return ChromaDBManager(
+        str(path),
+        write_behind=False,
+        use_memory_index=False,
+        hybrid_search=False,
+        chat_history_shards=shards
+    )
+
+def visible_users(db_manager: ChromaDBManager):
+    return {
+        user_id for user_id in USERS
+        if db_manager.search_chat_history(user_id, "sleep", limit=1)["documents"]
+    }
+
+@pytest.mark.parametrize("old_shards,new_shards", [(4, 6), (6, 4), (1, 3), (3, 1)])
+def test_reshard_keeps_every_users_history(tmp_path, old_shards, new_shards):
+    db_manager = open_manager(tmp_path, old_shards)
+    for user_id in USERS:
+        assert db_manager.store_chat(user_id, f"how do I sleep better {user_id}", "Keep a routine.")
+    assert visible_users(db_manager) == set(USERS)
+
+    db_manager = open_manager(tmp_path, new_shards)
+    moved = migrate_chat_history(db_manager)
+
+    assert sum(moved.values()) > 0
+    assert visible_users(db_manager) == set(USERS)
+    assert sum(shard.count() for shard in db_manager.chat_history_shards) == len(USERS)
+    remaining = {
+        collection.name for collection in db_manager.client.list_collections()
+        if collection.name.startswith("chat_history")
+    }
+    assert remaining == {shard.name for shard in db_manager.chat_history_shards}
+    # A second run has nothing left to move
+    assert migrate_chat_history(db_manager) == {}
@@ -0,0 +1,132 @@
+from typing import Dict, List, Optional
+
+class ContextPacker:
+    def __init__(
+        self,
+        budgets: Dict[str, int],
+        max_distance: float = 1.6,
+        source_priority: Optional[Dict[str, float]] = None,
+        chars_per_token: int = 4,
+        min_truncated_tokens: int = 50
+    ):
+        self.budgets = budgets
+        self.max_distance = max_distance
+        self.source_priority = source_priority or {}
+        self.chars_per_token = chars_per_token
+        self.min_truncated_tokens = min_truncated_tokens
+        self.last_stats: Dict[str, Dict] = {}
+
+    def estimate_tokens(self, text: str) -> int:
+        """Approximate token count (~4 characters per token for English text)"""
+        return max(1, (len(text) + self.chars_per_token - 1) // self.chars_per_token)
+
+    def _score(self, snippet: Dict) -> float:
+        """Source priority weighted by similarity; unknown distance counts as 0.5 similarity"""
+        priority = self.source_priority.get(snippet.get("source"), 0.5)
+        distance = snippet.get("distance")
+        # Distances are squared L2 between unit vectors: similarity = 1 - distance / 2
+        similarity = 0.5 if distance is None else max(0.0, 1.0 - distance / 2.0)
+        return priority * similarity
+
+    def pack(self, channel: str, snippets: List[Dict]) -> Dict:
+        """Greedily fill the channel's token budget with the best-scoring snippets"""
+        budget = self.budgets.get(channel, 0)
+        stats = {
+            "budget": budget,
+            "packed_tokens": 0,
+            "dropped_tokens": 0,
+            "packed": 0,
+            "dropped": 0,
+            "truncated": 0
+        }
+
+        candidates = []
+        for position, snippet in enumerate(snippets):
+            tokens = self.estimate_tokens(snippet["text"])
+            distance = snippet.get("distance")
+            if distance is not None and distance > self.max_distance:
+                stats["dropped"] += 1
+                stats["dropped_tokens"] += tokens
+                continue
+            candidates.append((self._score(snippet), position, snippet, tokens))
+
+        remaining = budget
+        selected = []
+        for _, position, snippet, tokens in sorted(candidates, key=lambda item: (-item[0], item[1])):
+            text = snippet["text"]
+            if tokens > remaining:
+                if remaining < self.min_truncated_tokens:
+                    stats["dropped"] += 1
+                    stats["dropped_tokens"] += tokens
+                    continue
+                # Keep the head of a long snippet rather than losing it entirely
+                text = text[:remaining * self.chars_per_token].rstrip() + "..."
+                stats["truncated"] += 1
+                stats["dropped_tokens"] += tokens - remaining
+                tokens = remaining
+            remaining -= tokens
+            stats["packed"] += 1
+            stats["packed_tokens"] += tokens
+            selected.append((position, {**snippet, "text": text}))
+
+        # Present packed snippets in their original order
+        selected.sort(key=lambda item: item[0])
+        self.last_stats[channel] = stats
+        print(
+            f"Context packer [{channel}]: packed {stats['packed']} snippets "
+            f"({stats['packed_tokens']}/{budget} tokens), dropped {stats['dropped']} "
+            f"({stats['dropped_tokens']} tokens), truncated {stats['truncated']}"
+        )
+
+        return {
+            "snippets": [snippet for _, snippet in selected],
+            "stats": stats
+        }
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Get the packing stats of the latest call per channel"""
+        return dict(self.last_stats)
+
+
+
+"""
+ContextPacker: Token-Budgeted Prompt Context Builder for Health Chatbot
+
+This class keeps the Gemini Pro prompt bounded. Every piece of context (RAG
+snippets, user profile summary, research results) is offered to the packer as a
+snippet for a channel; the packer scores the snippets, drops weak ones and fills
+the channel's token budget greedily.
+
+Channels:
+- rag: health tips, products, FAQs and user history from RAGHandler
+- profile: user profile summary in ResponseGenerator
+- research: Sonar research results in ResponseGenerator
+
+Snippet Format:
+{
+    "text": "snippet text",
+    "source": "health_tips" / "products" / "faqs" / "research" / ...,
+    "distance": float or None   # vector distance, None if unknown
+}
+
+Scoring:
+- Snippets with distance above max_distance are dropped
+- score = source priority * similarity, similarity = 1 - distance / 2
+  (squared L2 on unit vectors); unknown distance counts as 0.5
+
+Packing:
+- Highest score first, until the channel budget is used up
+- A snippet larger than the remaining budget is truncated if at least
+  min_truncated_tokens remain, otherwise dropped
+- Packed snippets keep their original relative order
+- Tokens are estimated at chars_per_token characters per token
+
+Reporting:
+- pack() returns and logs packed/dropped/truncated counts and tokens
+- get_stats() returns the latest stats per channel
+
+Usage Example:
+packer = ContextPacker({"rag": 600, "research": 2000}, max_distance=1.6)
+result = packer.pack("rag", [{"text": "Health Tip: ...", "source": "health_tips", "distance": 0.8}])
+context = "\\n".join(snippet["text"] for snippet in result["snippets"])
+"""
@@ -0,0 +1,104 @@
+import asyncio
+import functools
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+import google.generativeai as genai
+
+_lock = threading.Lock()
+_configured_key: Optional[str] = None
+_models: Dict[Tuple[str, str], genai.GenerativeModel] = {}
+_executor: Optional[ThreadPoolExecutor] = None
+_max_workers = 16
+
+def configure(api_key: str, max_workers: Optional[int] = None):
+    """Configure the SDK once per process (again only if the key changes)"""
+    global _configured_key, _max_workers
+    with _lock:
+        if max_workers and _executor is None:
+            _max_workers = max_workers
+        if api_key != _configured_key:
+            genai.configure(api_key=api_key)
+            _configured_key = api_key
+
+def get_model(model_name: str, generation_config: Dict) -> genai.GenerativeModel:
+    """Shared model object per (model, generation config)"""
+    key = (model_name, json.dumps(generation_config, sort_keys=True))
+    with _lock:
+        model = _models.get(key)
+        if model is None:
+            model = genai.GenerativeModel(model_name=model_name, generation_config=generation_config)
+            _models[key] = model
+        return model
+
+def get_executor() -> ThreadPoolExecutor:
+    """Bounded pool for blocking Gemini calls; its size caps concurrent requests"""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=_max_workers, thread_name_prefix="gemini")
+        return _executor
+
+async def generate(model, prompt: str, **kwargs):
+    """model.generate_content on the pool, without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(model.generate_content, prompt, **kwargs))
+
+async def stream(model, prompt: str) -> AsyncIterator:
+    """Streamed model.generate_content; each chunk is fetched on the pool"""
+    loop = asyncio.get_running_loop()
+    response = await generate(model, prompt, stream=True)
+    chunks = iter(response)
+    while True:
+        chunk = await loop.run_in_executor(get_executor(), next, chunks, None)
+        if chunk is None:
+            break
+        yield chunk
+
+def get_stats() -> Dict:
+    with _lock:
+        return {
+            "models": len(_models),
+            "max_workers": _max_workers,
+            "pool_started": _executor is not None
+        }
+
+
+
+"""
+Gemini Client: Shared SDK Setup and Non-Blocking Calls for Health Chatbot
+
+This module owns the google-generativeai setup used by QueryDecomposer and
+ResponseGenerator, and runs their blocking calls off the event loop.
+
+Shared Setup:
+- configure(api_key) calls genai.configure once per process instead of once
+  per component
+- get_model(name, generation_config) returns one GenerativeModel per
+  distinct model and config, reused by every component and request
+
+Non-Blocking Calls:
+- generate(model, prompt) runs model.generate_content in a bounded thread
+  pool via run_in_executor and awaits it, so other conversations progress
+  while Gemini is working
+- stream(model, prompt) does the same for generate_content(stream=True),
+  fetching each chunk on the pool
+- The pool size (GEMINI_MAX_CONCURRENCY) caps in-flight Gemini calls per
+  worker; further calls queue instead of starting new threads
+
+Why a Thread Pool Instead of generate_content_async:
+- Flask runs every async view on a new event loop, and /chat/stream drives
+  its generator on a loop of its own
+- The SDK's async (grpc aio) client is bound to the loop it was created on,
+  so one shared client can't serve all of these loops; the pool works from
+  any loop
+
+Usage Example:
+gemini_client.configure(api_key, max_workers=16)
+model = gemini_client.get_model("gemini-1.5-flash", {"temperature": 0.3})
+response = await gemini_client.generate(model, prompt)
+async for chunk in gemini_client.stream(model, prompt):
+    print(chunk.text)
+"""
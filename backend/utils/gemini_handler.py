@@ -1,33 +1,93 @@
 # backend/utils/gemini_handler.py
-import google.generativeai as genai
-from typing import Dict, List, Optional
+import time
+from typing import AsyncIterator, Dict, List, Optional
 from utils.rag_handler import RAGHandler
 from utils.query_decomposer import QueryDecomposer
+from utils.research_cache import ResearchCache
+from utils.research_classifier import ResearchClassifier
 from utils.search_controller import SearchController
-from utils.response_generator import ResponseGenerator
+from utils.response_cache import ResponseCache, is_follow_up
+from utils.response_generator import FALLBACK_RESPONSE, ResponseGenerator
 from utils.context_manager import ContextManager
+from utils import gemini_client
+from utils.context_packer import ContextPacker
+from utils.latency_tracker import LatencyTracker
 from utils.user_profile_manager import UserProfileManager
 
 class GeminiHandler:
     def __init__(self, config):
         self.config = config
-        genai.configure(api_key=config.GOOGLE_API_KEY)
+        # One SDK setup and one bounded pool for all Gemini calls in this process
+        gemini_client.configure(config.GOOGLE_API_KEY, max_workers=config.GEMINI_MAX_CONCURRENCY)
+        
+        # Token budgets for prompt context, shared by RAG and response generation
+        self.context_packer = ContextPacker(
+            budgets=config.CONTEXT_TOKEN_BUDGETS,
+            max_distance=config.CONTEXT_MAX_DISTANCE,
+            source_priority=config.CONTEXT_SOURCE_PRIORITY
+        )
         
         # Initialize components
-        self.query_decomposer = QueryDecomposer(config.GOOGLE_API_KEY)
-        self.search_controller = SearchController(config.SONAR_API_KEY)
-        self.response_generator = ResponseGenerator(config.GOOGLE_API_KEY)
+        self.research_classifier = None
+        if config.RESEARCH_CLASSIFIER_ENABLED:
+            self.research_classifier = ResearchClassifier(
+                max_distance=config.RESEARCH_CLASSIFIER_MAX_DISTANCE,
+                neighbours=config.RESEARCH_CLASSIFIER_NEIGHBOURS
+            )
+        self.query_decomposer = QueryDecomposer(
+            config.GOOGLE_API_KEY,
+            classifier=self.research_classifier,
+            cache_size=config.DECOMPOSITION_CACHE_SIZE
+        )
+        self.research_cache = None
+        if config.RESEARCH_CACHE_ENABLED:
+            self.research_cache = ResearchCache(
+                config.RESEARCH_CACHE_PATH,
+                namespace=config.SONAR_MODEL,
+                ttl_seconds=config.RESEARCH_CACHE_TTL,
+                max_entries=config.RESEARCH_CACHE_SIZE,
+                max_distance=config.RESEARCH_CACHE_MAX_DISTANCE
+            )
+        self.search_controller = SearchController(config.SONAR_API_KEY, cache=self.research_cache)
+        self.response_generator = ResponseGenerator(config.GOOGLE_API_KEY, context_packer=self.context_packer)
         self.rag_handler = None
+        self.db_manager = None
         self.context_manager = ContextManager()
         self.user_profile_manager = None
         
+        # Semantic cache of non-personalized answers, one per channel: channels
+        # differ in generation mode, so their answers must not be served across
+        self.response_caches: Dict[str, ResponseCache] = {}
+        if config.RESPONSE_CACHE_ENABLED:
+            self.response_caches = {
+                channel: ResponseCache(
+                    max_distance=config.RESPONSE_CACHE_MAX_DISTANCE,
+                    ttl_seconds=config.RESPONSE_CACHE_TTL,
+                    max_entries=config.RESPONSE_CACHE_SIZE
+                )
+                for channel in ("streamlit", "whatsapp")
+            }
+        
+        # Time to first token and full response time per channel
+        self.latency_tracker = LatencyTracker()
+        
         # Initialize chat sessions
         self.chat_sessions: Dict[str, any] = {}
 
     def set_managers(self, db_manager):
         """Set RAG handler and User Profile Manager"""
-        self.rag_handler = RAGHandler(db_manager)
+        self.db_manager = db_manager
+        self.rag_handler = RAGHandler(
+            db_manager,
+            limit=self.config.RAG_RESULTS_PER_COLLECTION,
+            context_packer=self.context_packer
+        )
         self.user_profile_manager = UserProfileManager(db_manager)
+        if self.research_cache and self.config.RESEARCH_CACHE_SEMANTIC:
+            self.research_cache.embed_fn = db_manager.embed_query
+        if self.research_classifier:
+            self.research_classifier.embed_fn = db_manager.embed_query
+            self.research_classifier.embed_many_fn = db_manager.embed_many
 
     async def get_response(
         self, 
@@ -37,60 +97,18 @@ class GeminiHandler:
     ) -> str:
         """Process user message and generate response"""
         try:
-            print(f"\n=== Processing Message for User: {user_id} ===")
-            print(f"Original Message: {message}")
-            print(f"Platform: {'WhatsApp' if is_whatsapp else 'Streamlit'}")
-            
-            # Get user profile for WhatsApp users
-            user_profile = None
-            if is_whatsapp and self.user_profile_manager:
-                user_profile = await self.user_profile_manager.get_user_profile(user_id)
-            
-            # Get session context
-            context = self.context_manager.get_context(user_id)
-            print(f"Retrieved context length: {len(context)}")
-            
-            # Step 1: Decompose query and check if research needed
-            decomposition_result = self.query_decomposer.decompose_query(message)
-            needs_research = decomposition_result['needs_research']
-            sub_queries = decomposition_result['sub_queries']
-            
-            # Step 2: Get research results if needed
-            research_results = {}
-            if needs_research and sub_queries:
-                print("\n=== Conducting Research ===")
-                research_results = await self.search_controller.search_research(sub_queries)
-            
-            # Step 3: Get RAG context
-            rag_context = ""
-            if self.rag_handler:
-                print("\n=== Getting RAG Context ===")
-                rag_context = self.rag_handler.get_relevant_context(
-                    message,
-                    user_profile=user_profile
-                )
+            start = time.monotonic()
+            prepared = await self._prepare(user_id, message, is_whatsapp)
+            if "response" in prepared:
+                self._record_latency(is_whatsapp, start)
+                return prepared["response"]
             
             # Step 4: Generate comprehensive response
             print("\n=== Generating Response ===")
-            response = await self.response_generator.generate_response(
-                original_query=message,
-                sub_queries=sub_queries,
-                research_results=research_results,
-                rag_context=rag_context,
-                user_profile=user_profile
-            )
-            
-            # Step 5: Update context and user profile
-            self.context_manager.update_context(user_id, message, response)
+            response = await self.response_generator.generate_response(**prepared["generation"])
             
-            if is_whatsapp and self.user_profile_manager:
-                context_summary = self.context_manager.get_context_summary(user_id)
-                await self.user_profile_manager.update_profile(
-                    user_id,
-                    message,
-                    response,
-                    context_summary
-                )
+            await self._finish(user_id, message, response, is_whatsapp, prepared["cache_embedding"])
+            self._record_latency(is_whatsapp, start)
             
             print("\n=== Response Generation Complete ===")
             return response
@@ -99,6 +117,173 @@ class GeminiHandler:
             print(f"Error in getting response: {str(e)}")
             return self.config.DEFAULT_RESPONSE
 
+    async def stream_response(
+        self,
+        user_id: str,
+        message: str,
+        is_whatsapp: bool = False
+    ) -> AsyncIterator[str]:
+        """Same pipeline as get_response, yielding the answer in chunks as it is generated"""
+        start = time.monotonic()
+        first_token = None
+        chunks = []
+        try:
+            prepared = await self._prepare(user_id, message, is_whatsapp)
+            if "response" in prepared:
+                self._record_latency(is_whatsapp, start)
+                yield prepared["response"]
+                return
+            
+            print("\n=== Streaming Response ===")
+            async for chunk in self.response_generator.stream_response(**prepared["generation"]):
+                if first_token is None:
+                    first_token = time.monotonic()
+                    print(f"Time to first token: {first_token - start:.2f}s")
+                chunks.append(chunk)
+                yield chunk
+            
+            await self._finish(user_id, message, "".join(chunks), is_whatsapp, prepared["cache_embedding"])
+            self._record_latency(is_whatsapp, start, first_token)
+            print("\n=== Response Streaming Complete ===")
+            
+        except Exception as e:
+            print(f"Error in streaming response: {str(e)}")
+            if chunks:
+                # Incomplete answer: not cached, not added to history; the caller reports the error
+                raise
+            yield self.config.DEFAULT_RESPONSE
+
+    async def _prepare(self, user_id: str, message: str, is_whatsapp: bool) -> Dict:
+        """Run everything before generation: {"response": ...} if answered early, else generation inputs"""
+        print(f"\n=== Processing Message for User: {user_id} ===")
+        print(f"Original Message: {message}")
+        print(f"Platform: {'WhatsApp' if is_whatsapp else 'Streamlit'}")
+        
+        # Answer directly from curated FAQs when the question matches closely
+        faq_match = self._match_faq(message)
+        if faq_match:
+            print(f"\n=== FAQ Fast Path: {faq_match['id']} (distance {faq_match['distance']:.3f}) ===")
+            response = faq_match['answer']
+            await self._update_history(user_id, message, response, is_whatsapp)
+            return {"response": response}
+        
+        # Get user profile for WhatsApp users
+        user_profile = None
+        if is_whatsapp and self.user_profile_manager:
+            user_profile = await self.user_profile_manager.get_user_profile(user_id)
+        
+        # Get session context
+        context = self.context_manager.get_context(user_id)
+        print(f"Retrieved context length: {len(context)}")
+        
+        # Serve a recent answer to the same question unless it depends on this user
+        cache_embedding = None
+        response_cache = self._response_cache(is_whatsapp)
+        if response_cache and self.db_manager:
+            if self._is_personalized(message, context, user_profile):
+                response_cache.record_bypass()
+            else:
+                cache_embedding = self.db_manager.embed_query(message)
+                cached_response = response_cache.get(cache_embedding)
+                if cached_response:
+                    await self._update_history(user_id, message, cached_response, is_whatsapp)
+                    return {"response": cached_response}
+        
+        # Step 1: Decompose query and check if research needed
+        decomposition_result = await self.query_decomposer.decompose_query(message)
+        needs_research = decomposition_result['needs_research']
+        sub_queries = decomposition_result['sub_queries']
+        
+        # Step 2: Get research results if needed
+        research_results = {}
+        if needs_research and sub_queries:
+            print("\n=== Conducting Research ===")
+            research_results = await self.search_controller.search_research(sub_queries)
+        
+        # Step 3: Get RAG context
+        rag_context = ""
+        if self.rag_handler:
+            print("\n=== Getting RAG Context ===")
+            rag_context = self.rag_handler.get_relevant_context(
+                message,
+                user_profile=user_profile
+            )
+        
+        return {
+            "cache_embedding": cache_embedding,
+            "generation": {
+                "original_query": message,
+                "sub_queries": sub_queries,
+                "research_results": research_results,
+                "rag_context": rag_context,
+                "user_profile": user_profile,
+                "mode": self._generation_mode(is_whatsapp)
+            }
+        }
+
+    async def _finish(self, user_id: str, message: str, response: str, is_whatsapp: bool, cache_embedding):
+        """Cache a generated response and update context and user profile"""
+        if cache_embedding is not None and response not in (FALLBACK_RESPONSE, self.config.DEFAULT_RESPONSE):
+            self._response_cache(is_whatsapp).put(message, cache_embedding, response)
+        
+        # Step 5: Update context and user profile
+        await self._update_history(user_id, message, response, is_whatsapp)
+
+    def _record_latency(self, is_whatsapp: bool, start: float, first_token: Optional[float] = None):
+        """Record time to first token (the full time when nothing was streamed) and response time"""
+        channel = "whatsapp" if is_whatsapp else "streamlit"
+        now = time.monotonic()
+        self.latency_tracker.record(f"{channel}.time_to_first_token", (first_token or now) - start)
+        self.latency_tracker.record(f"{channel}.response_time", now - start)
+
+    def _match_faq(self, message: str) -> Optional[Dict]:
+        """Find a curated FAQ answer for the message, if enabled"""
+        if not self.db_manager or not self.config.FAQ_FAST_PATH_ENABLED:
+            return None
+        return self.db_manager.match_faq(message, self.config.FAQ_MATCH_THRESHOLD)
+
+    def _response_cache(self, is_whatsapp: bool) -> Optional[ResponseCache]:
+        """The channel's response cache, if enabled"""
+        return self.response_caches.get("whatsapp" if is_whatsapp else "streamlit")
+
+    def _generation_mode(self, is_whatsapp: bool) -> str:
+        """Configured generation mode (two_pass / single_pass) for the channel"""
+        channel = "whatsapp" if is_whatsapp else "streamlit"
+        return self.config.GENERATION_MODE.get(channel, "two_pass")
+
+    def _is_personalized(self, message: str, context: List[Dict], user_profile: Optional[Dict]) -> bool:
+        """Whether the profile or conversation shapes the answer, so it must not be shared"""
+        if user_profile and (user_profile.get('summary') or user_profile.get('key_topics')):
+            return True
+        return bool(context) and is_follow_up(message)
+
+    def get_cache_stats(self) -> Dict:
+        """Get hit-rate metrics of the response and research caches and the decomposer"""
+        return {
+            "response_cache": {
+                channel: cache.get_stats() for channel, cache in self.response_caches.items()
+            } or None,
+            "research_cache": self.research_cache.get_stats() if self.research_cache else None,
+            "query_decomposer": self.query_decomposer.get_stats()
+        }
+
+    async def _update_history(self, user_id: str, message: str, response: str, is_whatsapp: bool):
+        """Update session context and, for WhatsApp users, the user profile"""
+        self.context_manager.update_context(user_id, message, response)
+        
+        if is_whatsapp and self.user_profile_manager:
+            context_summary = self.context_manager.get_context_summary(user_id)
+            await self.user_profile_manager.update_profile(
+                user_id,
+                message,
+                response,
+                context_summary
+            )
+
+    def get_latency_stats(self) -> Dict:
+        """Get time-to-first-token and response time percentiles per channel"""
+        return self.latency_tracker.get_stats()
+
     def clear_context(self, user_id: str):
         """Clear context for a user"""
         self.context_manager.clear_context(user_id)
@@ -114,10 +299,14 @@ AI models and services for comprehensive health-related responses.
 
 Key Components:
 1. Query Processing:
-   - Gemini Flash for query decomposition
-   - Perplexity Sonar for research
+   - Shared Gemini models and a bounded thread pool (gemini_client), so
+     Gemini calls don't block the event loop
+   - Gemini Flash for query decomposition (memoized; small talk and clear
+     no-research messages are settled by ResearchClassifier without a call)
+   - Perplexity Sonar for research (results cached on disk by ResearchCache)
    - RAG system for local knowledge
    - Context management for conversation history
+   - ContextPacker token budgets for RAG, profile and research context
 
 2. User Management:
    - Separate handling for WhatsApp and Streamlit users
@@ -125,6 +314,20 @@ Key Components:
    - Session context management for both platforms
 
 Process Flow:
+0. FAQ Fast Path:
+   - Matches the message against curated FAQ questions
+   - Returns the stored answer when within FAQ_MATCH_THRESHOLD
+   - Skips decomposition, research and response generation
+
+0b. Response Cache:
+   - After the profile and context are loaded, non-personalized messages
+     are looked up in the channel's ResponseCache by query embedding
+   - One cache per channel, since channels may use different generation
+     modes (two_pass / single_pass); answers are never served across them
+   - Bypassed for users whose profile has a summary or topics, and for
+     follow-ups (short or back-referencing messages) with session context
+   - Generated responses (not fallbacks) are stored for later requests
+
 1. Message Reception:
    - Identifies user and platform
    - Retrieves user profile (WhatsApp)
@@ -137,7 +340,8 @@ Process Flow:
 
 3. Response Generation:
    - Combines all available information
-   - Generates comprehensive response
+   - Generates comprehensive response in the channel's GENERATION_MODE
+     (two_pass reasoning + rewrite, or one single_pass call)
    - Updates context and profiles
 
 4. Context Management:
@@ -155,10 +359,26 @@ Methods:
    - Handles complete conversation flow
    - Returns generated response
 
+2b. stream_response(user_id, message, is_whatsapp):
+   - Same pipeline, as an async generator of answer chunks
+   - FAQ and response cache hits are yielded as one chunk
+   - Context, profile and response cache are updated after the last chunk
+   - A failure after the first chunk is raised to the caller and nothing
+     is cached or recorded
+
 3. clear_context(user_id):
    - Resets conversation context
    - Cleans up session data
 
+4. get_cache_stats():
+   - Response cache hits, misses, bypasses and hit rate, per channel
+   - Research cache exact/semantic hits, misses and evictions
+   - Decomposition cache hits, classifier skips, LLM calls and skip rate
+
+5. get_latency_stats():
+   - p50/p95/mean time to first token and response time per channel
+   - Time to first token is the latency users notice when streaming
+
 Error Handling:
 - Comprehensive try-except blocks
 - Detailed error logging
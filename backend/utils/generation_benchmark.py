@@ -0,0 +1,157 @@
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, List
+
+import numpy as np
+from config import Config
+from utils.context_packer import ContextPacker
+from utils.response_generator import SINGLE_PASS, TWO_PASS, ResponseGenerator
+
+# Fixed inputs so both modes see exactly the same query and context
+DEFAULT_CASES: List[Dict] = [
+    {
+        "query": "Is melatonin safe to take every night?",
+        "sub_queries": ["What are the potential risks and side effects of melatonin?"],
+        "research_results": {
+            "What are the potential risks and side effects of melatonin?":
+                "Short-term melatonin use is generally considered safe in adults. Reported side effects "
+                "include headache, dizziness and daytime sleepiness. Long-term safety data are limited."
+        },
+        "rag_context": "Health Tip: Keep a consistent sleep schedule, even on weekends."
+    },
+    {
+        "query": "What should I eat before a morning workout?",
+        "sub_queries": [],
+        "research_results": {},
+        "rag_context": "Health Tip: Stay hydrated; drink water before, during and after exercise."
+    },
+    {
+        "query": "Can ashwagandha help with stress?",
+        "sub_queries": ["What are the proven benefits of ashwagandha?"],
+        "research_results": {
+            "What are the proven benefits of ashwagandha?":
+                "Several small randomized trials report reduced perceived stress and cortisol levels "
+                "with ashwagandha root extract over 6-8 weeks. Evidence quality is moderate."
+        },
+        "rag_context": "Product: Ashwagandha capsules, 300mg root extract."
+    }
+]
+
+class CountingModel:
+    """Wraps a GenerativeModel to count calls and tokens"""
+    def __init__(self, model):
+        self.model = model
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls += 1
+        response = self.model.generate_content(prompt, **kwargs)
+        usage = getattr(response, "usage_metadata", None)
+        if usage:
+            self.prompt_tokens += getattr(usage, "prompt_token_count", 0) or 0
+            self.output_tokens += getattr(usage, "candidates_token_count", 0) or 0
+        return response
+
+async def run_mode(generator: ResponseGenerator, mode: str, cases: List[Dict], runs: int) -> Dict:
+    """Latency, Gemini calls and tokens of one mode over all cases"""
+    counters = [CountingModel(generator.model), CountingModel(generator.single_pass_model)]
+    generator.model, generator.single_pass_model = counters
+
+    latencies = []
+    answers = []
+    try:
+        for case in cases:
+            for _ in range(runs):
+                start = time.perf_counter()
+                answer = await generator.generate_response(
+                    original_query=case["query"],
+                    sub_queries=case.get("sub_queries", []),
+                    research_results=case.get("research_results", {}),
+                    rag_context=case.get("rag_context"),
+                    mode=mode
+                )
+                latencies.append(time.perf_counter() - start)
+            answers.append({"query": case["query"], "answer": answer})
+    finally:
+        generator.model, generator.single_pass_model = counters[0].model, counters[1].model
+
+    requests = len(cases) * runs
+    return {
+        "mode": mode,
+        "requests": requests,
+        "p50_s": float(np.percentile(latencies, 50)),
+        "p95_s": float(np.percentile(latencies, 95)),
+        "mean_s": float(np.mean(latencies)),
+        "calls_per_request": sum(counter.calls for counter in counters) / requests,
+        "prompt_tokens_per_request": sum(counter.prompt_tokens for counter in counters) / requests,
+        "output_tokens_per_request": sum(counter.output_tokens for counter in counters) / requests,
+        "answers": answers
+    }
+
+def print_report(rows: List[Dict]):
+    print(f"{'mode':<13}{'p50 s':>8}{'p95 s':>8}{'mean s':>8}{'calls':>7}{'in tok':>9}{'out tok':>9}")
+    for row in rows:
+        print(
+            f"{row['mode']:<13}{row['p50_s']:>8.2f}{row['p95_s']:>8.2f}{row['mean_s']:>8.2f}"
+            f"{row['calls_per_request']:>7.1f}{row['prompt_tokens_per_request']:>9.0f}"
+            f"{row['output_tokens_per_request']:>9.0f}"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare two-pass and single-pass response generation")
+    parser.add_argument('--cases', help="JSON list of {query, sub_queries, research_results, rag_context}")
+    parser.add_argument('--runs', type=int, default=3, help="repetitions per case and mode")
+    parser.add_argument('--output', help="write answers of both modes to this JSON file for review")
+    args = parser.parse_args()
+
+    if args.cases:
+        with open(args.cases) as f:
+            cases = json.load(f)
+    else:
+        cases = DEFAULT_CASES
+
+    packer = ContextPacker(
+        budgets=Config.CONTEXT_TOKEN_BUDGETS,
+        max_distance=Config.CONTEXT_MAX_DISTANCE,
+        source_priority=Config.CONTEXT_SOURCE_PRIORITY
+    )
+    generator = ResponseGenerator(Config.GOOGLE_API_KEY, context_packer=packer)
+    results = [asyncio.run(run_mode(generator, mode, cases, args.runs)) for mode in (TWO_PASS, SINGLE_PASS)]
+    print_report(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Answers written to {args.output}")
+
+
+
+"""
+Generation Mode Benchmark for Health Chatbot
+
+This script runs ResponseGenerator in two_pass and single_pass mode on the
+same inputs and reports what the second Gemini Pro call costs.
+
+What It Reports (per mode):
+- p50 / p95 / mean s: end-to-end generate_response latency
+- calls: Gemini calls per request (2 for two_pass; 1 for single_pass unless
+  it fell back to two_pass)
+- in tok / out tok: prompt and output tokens per request, from the API's
+  usage metadata
+
+Inputs:
+- Default: three fixed cases with RAG context and research findings
+- --cases: a JSON list of {"query", "sub_queries", "research_results",
+  "rag_context"} objects, e.g. captured from production logs
+- --output: both modes' answers per case, for a side-by-side quality review
+
+Usage (from the backend directory, GOOGLE_API_KEY set):
+python -m utils.generation_benchmark
+python -m utils.generation_benchmark --runs 5 --output generation_modes.json
+
+Note: Makes real Gemini Pro calls (cases x runs x 3 calls in total).
+"""
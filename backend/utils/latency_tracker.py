@@ -0,0 +1,71 @@
+import threading
+from collections import deque
+from typing import Deque, Dict
+
+import numpy as np
+
+class LatencyTracker:
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = {}
+        self._counts: Dict[str, int] = {}
+
+    def record(self, metric: str, seconds: float):
+        """Add a sample; only the latest `window` samples per metric are kept"""
+        with self._lock:
+            if metric not in self._samples:
+                self._samples[metric] = deque(maxlen=self.window)
+                self._counts[metric] = 0
+            self._samples[metric].append(seconds)
+            self._counts[metric] += 1
+
+    def get_stats(self) -> Dict:
+        """Count and p50/p95/mean seconds per metric over the window"""
+        with self._lock:
+            snapshot = {metric: list(samples) for metric, samples in self._samples.items()}
+            counts = dict(self._counts)
+
+        stats = {}
+        for metric, samples in snapshot.items():
+            values = np.asarray(samples)
+            stats[metric] = {
+                "count": counts[metric],
+                "p50_s": float(np.percentile(values, 50)),
+                "p95_s": float(np.percentile(values, 95)),
+                "mean_s": float(values.mean())
+            }
+        return stats
+
+
+
+"""
+LatencyTracker: Rolling Latency Percentiles for Health Chatbot
+
+This class keeps the most recent latency samples per metric and reports
+percentiles, so the API can expose how long users actually wait.
+
+Metrics Recorded by GeminiHandler:
+- time_to_first_token: request start until the first text the user sees
+  (for non-streaming requests this is the full response time)
+- response_time: request start until the complete response
+
+Both are split by channel, e.g. "streamlit.time_to_first_token".
+
+Window:
+- The latest `window` samples per metric (default 1000)
+- count is the total number of samples since startup
+
+Output Format (get_stats()):
+{
+    "streamlit.time_to_first_token": {
+        "count": int, "p50_s": float, "p95_s": float, "mean_s": float
+    },
+    ...
+}
+
+Usage Example:
+tracker = LatencyTracker()
+tracker.record("streamlit.time_to_first_token", 0.84)
+tracker.get_stats()
+"""
@@ -1,23 +1,80 @@
 # backend/utils/query_decomposer.py
-import google.generativeai as genai
+from collections import OrderedDict
 from typing import List, Dict
 import json
+import threading
+from utils import gemini_client
+from utils.research_cache import normalize_query
 
 class QueryDecomposer:
-    def __init__(self, api_key: str):
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel(
-            model_name="gemini-1.5-flash",
-            generation_config={
+    def __init__(self, api_key: str, classifier=None, cache_size: int = 1000):
+        gemini_client.configure(api_key)
+        self.model = gemini_client.get_model(
+            "gemini-1.5-flash",
+            {
                 "temperature": 0.3,
                 "top_p": 0.8,
                 "top_k": 20,
                 "max_output_tokens": 1024,
             }
         )
+        # Optional ResearchClassifier that settles clear no-research messages locally
+        self.classifier = classifier
         
-    def decompose_query(self, query: str) -> Dict[str, List[str]]:
+        # LRU of successful decompositions keyed by normalized query
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.cache_hits = 0
+        self.classifier_skips = 0
+        self.llm_calls = 0
+        
+    async def decompose_query(self, query: str) -> Dict[str, List[str]]:
         """Decompose main query into sub-queries and determine search necessity"""
+        key = normalize_query(query) or query.strip().lower()
+        with self._lock:
+            self.requests += 1
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+        if cached is not None:
+            print(f"Decomposition cache hit: {query}")
+            return {
+                "needs_research": cached["needs_research"],
+                "sub_queries": list(cached["sub_queries"])
+            }
+        
+        if self.classifier and self.classifier.classify(query) is False:
+            with self._lock:
+                self.classifier_skips += 1
+            return {
+                "needs_research": False,
+                "sub_queries": []
+            }
+        
+        result = await self._decompose_with_llm(query)
+        if result is not None:
+            with self._lock:
+                self._cache[key] = result
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+            return {
+                "needs_research": result["needs_research"],
+                "sub_queries": list(result["sub_queries"])
+            }
+        
+        return {
+            "needs_research": False,
+            "sub_queries": []
+        }
+    
+    async def _decompose_with_llm(self, query: str):
+        """Ask Gemini Flash for the decomposition; None on errors so they are not cached"""
+        with self._lock:
+            self.llm_calls += 1
         prompt = f"""Analyze the following health-related query and:
 1. Determine if we need to search for scientific research (yes/no)
 2. Decompose into 3-4 specific sub-queries if research is needed
@@ -40,7 +97,7 @@ If research is not needed, return empty sub_queries list.
 
         try:
             print(f"\n=== Decomposing Query: {query} ===")
-            response = self.model.generate_content(prompt)
+            response = await gemini_client.generate(self.model, prompt)
             
             # Parse JSON response
             result = json.loads(response.text)
@@ -48,14 +105,30 @@ If research is not needed, return empty sub_queries list.
             if result['needs_research']:
                 print("Sub-queries:", result['sub_queries'])
             
-            return result
+            return {
+                "needs_research": bool(result['needs_research']),
+                "sub_queries": list(result.get('sub_queries') or [])
+            }
             
         except Exception as e:
             print(f"Error decomposing query: {str(e)}")
-            return {
-                "needs_research": False,
-                "sub_queries": []
+            return None
+    
+    def get_stats(self) -> Dict:
+        """Share of decompositions answered without a Gemini call"""
+        with self._lock:
+            skipped = self.cache_hits + self.classifier_skips
+            stats = {
+                "requests": self.requests,
+                "cache_hits": self.cache_hits,
+                "classifier_skips": self.classifier_skips,
+                "llm_calls": self.llm_calls,
+                "cached_entries": len(self._cache),
+                "skip_rate": skipped / self.requests if self.requests else 0.0
             }
+        if self.classifier:
+            stats["classifier"] = self.classifier.get_stats()
+        return stats
         
 
 
@@ -73,7 +146,8 @@ Key Features:
    - Uses low temperature for consistent outputs
 
 2. Model Configuration:
-   - Uses Gemini Flash for fast processing
+   - Uses Gemini Flash for fast processing (shared model from gemini_client,
+     called on its thread pool so the event loop is not blocked)
    - Conservative temperature (0.3) for focused outputs
    - Limited token output for efficiency
    - Optimized top_p and top_k for reliable results
@@ -89,6 +163,18 @@ Output Structure:
     ]
 }
 
+Avoiding the LLM Call:
+1. Decomposition cache:
+   - Successful decompositions are kept in an LRU (cache_size entries)
+     keyed by the normalized query, so repeats skip Gemini
+   - Errors are not cached
+2. Local classifier (optional ResearchClassifier):
+   - Small talk and messages close to labelled no-research examples
+     return {"needs_research": false, "sub_queries": []} directly
+   - Everything else is escalated to Gemini Flash
+3. get_stats(): requests, cache_hits, classifier_skips, llm_calls and
+   skip_rate (share of requests answered without Gemini)
+
 Decomposition Strategy:
 1. Basic Understanding: What is the topic/mechanism?
 2. Benefits Analysis: What are proven benefits?
@@ -96,13 +182,13 @@ Decomposition Strategy:
 4. Research Validation: What does science say?
 
 Error Handling:
-- Returns safe default values on errors
+- Returns safe default values on errors (not cached)
 - Logs decomposition process
 - Maintains service continuity
 
 Usage Example:
 decomposer = QueryDecomposer(api_key)
-result = decomposer.decompose_query("Is ashwagandha safe?")
+result = await decomposer.decompose_query("Is ashwagandha safe?")
 # Returns:
 # {
 #     "needs_research": true,
@@ -2,8 +2,15 @@
 from typing import Dict, List, Optional
 
 class RAGHandler:
-    def __init__(self, db_manager):
+    def __init__(self, db_manager, limit: int = 3, context_packer=None):
         self.db_manager = db_manager
+        self.limit = limit
+        self.context_packer = context_packer
+    
+    @staticmethod
+    def _distances(results: Dict) -> List[Optional[float]]:
+        """Get per-result distances, None where unknown"""
+        return results.get('distances') or [None] * len(results['documents'])
     
     def get_relevant_context(
         self, 
@@ -18,12 +25,15 @@ class RAGHandler:
             # Get relevant content using user profile
             relevant_content = self.db_manager.get_relevant_content(
                 query=query,
-                user_profile=user_profile
+                user_profile=user_profile,
+                limit=self.limit
             )
             
-            # Extract health tips and products
-            health_tips = relevant_content['health_tips']
-            products = relevant_content['products']
+            # Extract health tips, products and FAQs
+            empty = {'documents': [], 'metadatas': []}
+            health_tips = relevant_content.get('health_tips', empty)
+            products = relevant_content.get('products', empty)
+            faqs = relevant_content.get('faqs', empty)
             
             print("\nRetrieved Health Tips:")
             for tip in health_tips['documents']:
@@ -33,28 +43,55 @@ class RAGHandler:
             for doc, meta in zip(products['documents'], products['metadatas']):
                 print(f"- {meta.get('name', 'Unknown')}: {doc}")
             
-            # Combine context
-            context_parts = []
+            print("\nRetrieved FAQs:")
+            for question in faqs['documents']:
+                print(f"- {question}")
+            
+            # Collect candidate snippets with their source and distance
+            snippets = []
             
             # Add health tips to context
-            if health_tips['documents']:
-                tips_context = "\n".join([
-                    f"Health Tip: {tip}" 
-                    for tip in health_tips['documents']
-                ])
-                context_parts.append(tips_context)
+            for tip, distance in zip(health_tips['documents'], self._distances(health_tips)):
+                snippets.append({
+                    "text": f"Health Tip: {tip}",
+                    "source": "health_tips",
+                    "distance": distance
+                })
             
             # Add products to context
-            if products['documents']:
-                products_context = "\n".join([
-                    f"Product: {meta.get('name', 'Unknown')} - {doc}"
-                    for doc, meta in zip(products['documents'], products['metadatas'])
-                ])
-                context_parts.append(products_context)
+            for doc, meta, distance in zip(products['documents'], products['metadatas'], self._distances(products)):
+                snippets.append({
+                    "text": f"Product: {meta.get('name', 'Unknown')} - {doc}",
+                    "source": "products",
+                    "distance": distance
+                })
+            
+            # Add FAQs to context
+            for question, meta, distance in zip(faqs['documents'], faqs['metadatas'], self._distances(faqs)):
+                snippets.append({
+                    "text": f"FAQ: {question} - {meta.get('answer', '')}",
+                    "source": "faqs",
+                    "distance": distance
+                })
             
             # Add user context if available
             if user_profile and user_profile.get('summary'):
-                context_parts.append(f"User History: {user_profile['summary']}")
+                snippets.append({
+                    "text": f"User History: {user_profile['summary']}",
+                    "source": "user_history",
+                    "distance": None
+                })
+            
+            # Keep the best snippets within the RAG token budget
+            if self.context_packer:
+                snippets = self.context_packer.pack("rag", snippets)["snippets"]
+            
+            # Combine context, one block per source
+            context_parts = []
+            for source in ("health_tips", "products", "faqs", "user_history"):
+                block = [snippet["text"] for snippet in snippets if snippet["source"] == source]
+                if block:
+                    context_parts.append("\n".join(block))
             
             final_context = "\n\n".join(context_parts)
             
@@ -81,6 +118,8 @@ Key Features:
 1. Context Retrieval:
    - Fetches relevant health tips
    - Retrieves related products
+   - Retrieves matching FAQs
+   - Hybrid (BM25 + vector) ranking, `limit` results per collection
    - Incorporates user history
    - Combines multiple context sources
 
@@ -105,6 +144,11 @@ Context Components:
    - User preferences
    - Historical context
 
+Context Budget:
+- Each tip/product/FAQ/history line is a snippet with a source and distance
+- An optional ContextPacker drops distant snippets and fills the "rag"
+  token budget with the best-scoring ones
+
 Output Format:
 - Structured text combining:
   * Health tips
@@ -119,7 +163,7 @@ Debug Features:
 - Error reporting and handling
 
 Usage Example:
-rag_handler = RAGHandler(db_manager)
+rag_handler = RAGHandler(db_manager, limit=3, context_packer=packer)
 context = rag_handler.get_relevant_context(
     query="sleep issues",
     user_profile={"summary": "Previous sleep-related queries"}
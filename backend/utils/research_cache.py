@@ -0,0 +1,271 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+STOPWORDS = {
+    "a", "an", "the", "of", "for", "to", "in", "on", "and", "or", "is", "are",
+    "what", "which", "how", "does", "do", "can", "about", "with"
+}
+
+def normalize_query(query: str) -> str:
+    """Lowercase words without punctuation or filler words, in their original order"""
+    words = re.findall(r"[a-z0-9]+", query.lower())
+    return " ".join(word for word in words if word not in STOPWORDS)
+
+class ResearchCache:
+    def __init__(
+        self,
+        db_path: str,
+        namespace: str,
+        ttl_seconds: float = 7 * 86400,
+        max_entries: int = 5000,
+        embed_fn: Optional[Callable[[str], List[float]]] = None,
+        max_distance: float = 0.08
+    ):
+        self.db_path = db_path
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.embed_fn = embed_fn
+        self.max_distance = max_distance
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS research_cache (
+                key TEXT PRIMARY KEY,
+                query TEXT NOT NULL,
+                result TEXT NOT NULL,
+                embedding BLOB,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_research_cache_access ON research_cache (last_access)"
+        )
+        self._conn.commit()
+
+        # In-memory copy of stored embeddings for semantic lookups: key -> unit vector,
+        # plus the (row count, max rowid) of the table it was read at
+        self._vectors: Dict[str, np.ndarray] = {}
+        self._vectors_loaded = False
+        self._vectors_signature = None
+
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def _key(self, query: str) -> str:
+        return hashlib.sha256(f"{self.namespace}\x00{normalize_query(query)}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _unit(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _signature(self) -> tuple:
+        """Changes whenever any worker stores, replaces or deletes an entry (not on reads)"""
+        return tuple(self._conn.execute("SELECT COUNT(*), MAX(rowid) FROM research_cache").fetchone())
+
+    def _load_vectors(self):
+        """Read the embeddings of live entries, again whenever the table changed"""
+        signature = self._signature()
+        if self._vectors_loaded and signature == self._vectors_signature:
+            return
+        rows = self._conn.execute(
+            "SELECT key, embedding FROM research_cache WHERE embedding IS NOT NULL AND expires_at > ?",
+            (time.time(),)
+        ).fetchall()
+        self._vectors = {key: np.frombuffer(blob, dtype=np.float32) for key, blob in rows}
+        self._vectors_loaded = True
+        self._vectors_signature = signature
+
+    def _semantic_key(self, vector: np.ndarray) -> Optional[str]:
+        """Key of the closest stored query within max_distance (squared L2)"""
+        self._load_vectors()
+        if not self._vectors:
+            return None
+        keys = list(self._vectors)
+        similarities = np.stack([self._vectors[key] for key in keys]) @ vector
+        best = int(np.argmax(similarities))
+        if 2.0 - 2.0 * similarities[best] > self.max_distance:
+            return None
+        return keys[best]
+
+    def _read(self, key: str, now: float) -> Optional[str]:
+        row = self._conn.execute(
+            "SELECT result, expires_at FROM research_cache WHERE key = ?",
+            (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[1] <= now:
+            self._conn.execute("DELETE FROM research_cache WHERE key = ?", (key,))
+            self._conn.commit()
+            self._vectors.pop(key, None)
+            return None
+        self._conn.execute("UPDATE research_cache SET last_access = ? WHERE key = ?", (now, key))
+        self._conn.commit()
+        return row[0]
+
+    def get(self, query: str) -> Optional[str]:
+        """Get a fresh cached result by normalized query, then by embedding similarity"""
+        now = time.time()
+        with self._lock:
+            result = self._read(self._key(query), now)
+            if result is not None:
+                self.hits += 1
+                return result
+
+        # Only an exact-key miss pays for the embedding, outside the lock
+        vector = None
+        if self.embed_fn:
+            try:
+                vector = self._unit(self.embed_fn(query))
+            except Exception as e:
+                print(f"Error embedding research query: {str(e)}")
+
+        with self._lock:
+            if vector is not None:
+                key = self._semantic_key(vector)
+                if key is not None:
+                    result = self._read(key, now)
+                    if result is not None:
+                        self.semantic_hits += 1
+                        return result
+
+            self.misses += 1
+            return None
+
+    def put(self, query: str, result: str, ttl_seconds: Optional[float] = None):
+        """Store a result with its own TTL, evicting least recently used entries past max_entries"""
+        now = time.time()
+        vector = None
+        if self.embed_fn:
+            try:
+                vector = self._unit(self.embed_fn(query))
+            except Exception as e:
+                print(f"Error embedding research query: {str(e)}")
+
+        key = self._key(query)
+        with self._lock:
+            # Only our own write separates the copy from the table if it was current before
+            in_sync = self._vectors_loaded and self._signature() == self._vectors_signature
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO research_cache (key, query, result, embedding, expires_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    key,
+                    query,
+                    result,
+                    vector.tobytes() if vector is not None else None,
+                    now + (ttl_seconds if ttl_seconds is not None else self.ttl_seconds),
+                    now
+                )
+            )
+            if vector is not None and self._vectors_loaded:
+                self._vectors[key] = vector
+            self.stores += 1
+
+            # Drop expired rows, then the least recently used beyond the size bound
+            self._conn.execute("DELETE FROM research_cache WHERE expires_at <= ?", (now,))
+            evicted = self._conn.execute(
+                """
+                DELETE FROM research_cache WHERE key IN (
+                    SELECT key FROM research_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                ) RETURNING key
+                """,
+                (self.max_entries,)
+            ).fetchall()
+            self._conn.commit()
+            for (evicted_key,) in evicted:
+                self._vectors.pop(evicted_key, None)
+            self.evictions += len(evicted)
+            if in_sync:
+                self._vectors_signature = self._signature()
+
+    def get_stats(self) -> Dict:
+        """Get hit/miss counters and the number of stored results"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM research_cache").fetchone()[0]
+            lookups = self.hits + self.semantic_hits + self.misses
+            return {
+                "entries": entries,
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.semantic_hits) / lookups if lookups else 0.0
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+
+"""
+ResearchCache: Persistent TTL Cache for Sonar Research Results
+
+This class stores Sonar research summaries per sub-query in SQLite, so the
+sub-queries the decomposer keeps producing ("What are the proven benefits of
+melatonin?") are answered without an upstream call, across restarts and
+across worker processes.
+
+Keys:
+- Queries are normalized (lowercase, punctuation and filler words removed,
+  e.g. "What are the proven benefits of melatonin?" -> "proven benefits
+  melatonin") and hashed together with the namespace (the Sonar model name)
+- Optional semantic matching: with embed_fn set, an exact-key miss falls
+  back to the stored query with the closest embedding, if its squared L2
+  distance is <= max_distance
+- The query is embedded only after an exact-key miss, so exact hits never
+  run the embedding model
+- Stored embeddings are kept in memory for matching and re-read when the
+  table's row count or max rowid changes, so entries stored or evicted by
+  other workers sharing the file are seen too
+
+Table Structure:
+research_cache:
+   - key: namespace + normalized query hash
+   - query: original sub-query
+   - result: research summary text
+   - embedding: float32 query vector (semantic mode only)
+   - expires_at: per-entry expiry (POSIX seconds)
+   - last_access: for LRU eviction
+
+Eviction:
+- Expired entries are deleted when read and on every put()
+- Beyond max_entries, the least recently accessed entries are deleted
+
+What Is Not Cached:
+- Failed searches (SearchController only stores successful responses)
+
+Metrics (get_stats()):
+{
+    "entries": int, "hits": int, "semantic_hits": int, "misses": int,
+    "stores": int, "evictions": int, "hit_rate": float
+}
+
+Usage Example:
+cache = ResearchCache("data/cache/research_cache.sqlite3", namespace=model)
+result = cache.get("What are the proven benefits of melatonin?")
+if result is None:
+    result = await search(...)
+    cache.put("What are the proven benefits of melatonin?", result)
+"""
@@ -0,0 +1,189 @@
+import re
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Messages that never need research, whatever follows ("hi!", "thanks a lot", "ok bye")
+SMALL_TALK_PATTERN = re.compile(
+    r"^(hi|hii+|hello|hey|hiya|yo|good (morning|afternoon|evening|night)|"
+    r"thanks|thank you|thx|ty|ok|okay|cool|great|nice|awesome|bye|goodbye|see you|"
+    r"yes|no|yep|nope|sure)\b[\s!.,?]*(there|a lot|so much|again|you|bot|then)?[\s!.,?]*$",
+    re.IGNORECASE
+)
+
+# Words that point at evidence, safety or mechanisms; these always go to the LLM
+RESEARCH_KEYWORDS = (
+    "research", "study", "studies", "evidence", "clinical", "trial", "proven",
+    "safe", "safety", "side effect", "risk", "interact", "dosage", "dose",
+    "overdose", "contraindicat", "pregnan", "mechanism", "effective"
+)
+
+# Labelled examples for the nearest-neighbour vote: (message, needs_research)
+DEFAULT_EXAMPLES: List[Tuple[str, bool]] = [
+    ("hi", False),
+    ("hello, how are you?", False),
+    ("good morning", False),
+    ("thank you so much", False),
+    ("that was helpful, thanks", False),
+    ("bye, see you later", False),
+    ("who are you?", False),
+    ("what can you help me with?", False),
+    ("how do I use this chatbot?", False),
+    ("what products do you sell?", False),
+    ("recommend a product for me", False),
+    ("give me a quick tip for the day", False),
+    ("give me a motivational health quote", False),
+    ("i am feeling a bit tired today", False),
+    ("is ashwagandha safe to take daily?", True),
+    ("what does research say about intermittent fasting?", True),
+    ("what are the side effects of melatonin?", True),
+    ("does vitamin d help with depression?", True),
+    ("can magnesium improve sleep quality?", True),
+    ("benefits of omega-3 for heart health", True),
+    ("is it safe to take turmeric with blood thinners?", True),
+    ("how does creatine affect the kidneys?", True),
+    ("are probiotics effective for ibs?", True),
+    ("what is the recommended dose of vitamin c?", True)
+]
+
+class ResearchClassifier:
+    def __init__(
+        self,
+        examples: Optional[List[Tuple[str, bool]]] = None,
+        embed_fn: Optional[Callable[[str], List[float]]] = None,
+        embed_many_fn: Optional[Callable[[List[str]], List]] = None,
+        max_distance: float = 0.6,
+        neighbours: int = 3
+    ):
+        self.examples = examples or DEFAULT_EXAMPLES
+        self.embed_fn = embed_fn
+        self.embed_many_fn = embed_many_fn
+        self.max_distance = max_distance
+        self.neighbours = neighbours
+
+        self._lock = threading.Lock()
+        self._matrix: Optional[np.ndarray] = None
+        self._labels: Optional[np.ndarray] = None
+
+        self.rule_skips = 0
+        self.neighbour_skips = 0
+        self.escalations = 0
+
+    @staticmethod
+    def _unit_rows(vectors) -> np.ndarray:
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+    def _build(self) -> bool:
+        """Embed the labelled examples once (through the caller's embedding cache)"""
+        if self._matrix is not None:
+            return True
+        if not (self.embed_many_fn or self.embed_fn):
+            return False
+        texts = [text for text, _ in self.examples]
+        if self.embed_many_fn:
+            vectors = self.embed_many_fn(texts)
+        else:
+            vectors = [self.embed_fn(text) for text in texts]
+        self._matrix = self._unit_rows(vectors)
+        self._labels = np.array([label for _, label in self.examples], dtype=bool)
+        print(f"Research classifier built from {len(texts)} examples")
+        return True
+
+    def _neighbour_vote(self, message: str) -> Optional[Dict]:
+        """Nearest labelled examples; a decision only if all agree and the closest is near"""
+        if not self.embed_fn:
+            return None
+        with self._lock:
+            if not self._build():
+                return None
+            vector = self._unit_rows(self.embed_fn(message))
+            similarities = self._matrix @ vector
+            count = min(self.neighbours, len(similarities))
+            nearest = np.argsort(-similarities)[:count]
+            distance = max(0.0, float(2.0 - 2.0 * similarities[nearest[0]]))
+            labels = self._labels[nearest]
+
+        if distance > self.max_distance or labels.any() != labels.all():
+            return None
+        return {"needs_research": bool(labels[0]), "distance": distance}
+
+    def classify(self, message: str) -> Optional[bool]:
+        """False when the message clearly needs no research; None means ask the LLM"""
+        text = message.strip().lower()
+        if not text or SMALL_TALK_PATTERN.match(text):
+            self.rule_skips += 1
+            print("Classifier: small talk, no research")
+            return False
+
+        if any(keyword in text for keyword in RESEARCH_KEYWORDS):
+            self.escalations += 1
+            return None
+
+        try:
+            vote = self._neighbour_vote(text)
+        except Exception as e:
+            print(f"Error in research classifier: {str(e)}")
+            vote = None
+
+        # Only "no research" is decided locally; research needs the LLM's sub-queries
+        if vote is not None and not vote["needs_research"]:
+            self.neighbour_skips += 1
+            print(f"Classifier: near no-research examples (distance {vote['distance']:.3f})")
+            return False
+
+        self.escalations += 1
+        return None
+
+    def get_stats(self) -> Dict:
+        return {
+            "rule_skips": self.rule_skips,
+            "neighbour_skips": self.neighbour_skips,
+            "escalations": self.escalations
+        }
+
+
+
+"""
+ResearchClassifier: Local Gate Before Query Decomposition
+
+This class decides, without an LLM call, whether a message obviously needs no
+scientific research ("hi", "thanks", "what can you do?"), so QueryDecomposer
+can skip its Gemini Flash round trip for those messages.
+
+Decision Order:
+1. Rules:
+   - Empty messages and small talk (greetings, thanks, goodbyes, yes/no)
+     -> no research
+   - Research keywords (evidence, safety, side effects, dosage, ...)
+     -> escalate to the LLM
+2. Nearest neighbours:
+   - The message embedding is compared with labelled example messages
+   - If the closest example is within max_distance (squared L2) and the
+     nearest `neighbours` examples are all labelled "no research"
+     -> no research
+3. Anything else -> escalate (None)
+
+Why Only "No Research" Is Decided Locally:
+- A research answer needs the LLM's sub-queries for Sonar, so confident
+  research cases still go to the decomposer
+
+Embeddings:
+- embed_fn / embed_many_fn are normally ChromaDBManager.embed_query and
+  embed_many, so examples and messages go through the embedding cache (the
+  message embedding is usually already cached by the response cache lookup)
+- Without them, only the rules apply
+- Examples are embedded once, on first use
+
+Metrics (get_stats()):
+{
+    "rule_skips": int, "neighbour_skips": int, "escalations": int
+}
+
+Usage Example:
+classifier = ResearchClassifier(embed_fn=db.embed_query, embed_many_fn=db.embed_many)
+classifier.classify("thanks!")              # False
+classifier.classify("Is ashwagandha safe?") # None -> ask the LLM
+"""
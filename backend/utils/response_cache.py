@@ -0,0 +1,171 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+
+# Words that usually point back to the previous turn ("what about it?", "tell me more")
+FOLLOW_UP_WORDS = {
+    "it", "its", "that", "this", "those", "these", "they", "them", "their",
+    "he", "she", "him", "her", "more", "else", "also", "again", "same", "above", "previous"
+}
+
+def is_follow_up(message: str, max_short_words: int = 3) -> bool:
+    """Heuristic: very short messages and back-references depend on the conversation"""
+    words = re.findall(r"[a-z']+", message.lower())
+    return len(words) <= max_short_words or any(word in FOLLOW_UP_WORDS for word in words)
+
+class ResponseCache:
+    def __init__(self, max_distance: float = 0.1, ttl_seconds: float = 3600, max_entries: int = 1000):
+        self.max_distance = max_distance
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        # Fixed slots: row i of _vectors belongs to _entries[i]; _lru orders slots by use
+        self._vectors: Optional[np.ndarray] = None
+        self._valid = np.zeros(max_entries, dtype=bool)
+        self._entries: Dict[int, Dict] = {}
+        self._lru: "OrderedDict[int, None]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _unit(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _drop(self, slot: int):
+        self._valid[slot] = False
+        self._entries.pop(slot, None)
+        self._lru.pop(slot, None)
+
+    def _nearest(self, vector: np.ndarray) -> Optional[tuple]:
+        """(slot, squared L2 distance) of the closest live entry"""
+        if self._vectors is None or not self._entries:
+            return None
+        similarities = np.where(self._valid, self._vectors @ vector, -np.inf)
+        slot = int(np.argmax(similarities))
+        return slot, max(0.0, float(2.0 - 2.0 * similarities[slot]))
+
+    def get(self, embedding) -> Optional[str]:
+        """Get the cached response for a semantically equivalent query, if fresh"""
+        vector = self._unit(embedding)
+        with self._lock:
+            nearest = self._nearest(vector)
+            if nearest is None or nearest[1] > self.max_distance:
+                self.misses += 1
+                return None
+
+            slot = nearest[0]
+            entry = self._entries[slot]
+            if time.monotonic() - entry["created"] > self.ttl_seconds:
+                self._drop(slot)
+                self.expired += 1
+                self.misses += 1
+                return None
+
+            self._lru.move_to_end(slot)
+            entry["hits"] += 1
+            self.hits += 1
+            print(f"Response cache hit: '{entry['query']}' (distance {nearest[1]:.3f})")
+            return entry["response"]
+
+    def put(self, query: str, embedding, response: str):
+        """Cache a response, replacing a near-identical entry or the least recently used one"""
+        vector = self._unit(embedding)
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, len(vector)), dtype=np.float32)
+
+            nearest = self._nearest(vector)
+            if nearest is not None and nearest[1] <= self.max_distance:
+                slot = nearest[0]
+            elif len(self._entries) < self.max_entries:
+                slot = int(np.argmin(self._valid))
+            else:
+                slot, _ = self._lru.popitem(last=False)
+                self.evictions += 1
+
+            self._vectors[slot] = vector
+            self._valid[slot] = True
+            self._entries[slot] = {
+                "query": query,
+                "response": response,
+                "created": time.monotonic(),
+                "hits": 0
+            }
+            self._lru[slot] = None
+            self._lru.move_to_end(slot)
+
+    def record_bypass(self):
+        with self._lock:
+            self.bypasses += 1
+
+    def clear(self):
+        with self._lock:
+            self._valid[:] = False
+            self._entries.clear()
+            self._lru.clear()
+
+    def get_stats(self) -> Dict:
+        """Get hit/miss/bypass counters and the current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypasses": self.bypasses,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+
+"""
+ResponseCache: Semantic Cache for Generated Responses
+
+This class caches final chatbot responses keyed by the query embedding, so a
+question that was answered recently (in the same or different words) skips
+decomposition, Sonar research and both Gemini Pro calls.
+
+Matching:
+- Entries are stored as unit vectors in a fixed (max_entries x dim) matrix
+- A lookup is one matrix-vector product; the nearest entry is a hit if its
+  squared L2 distance is <= max_distance (0.1 ~ cosine similarity 0.95)
+- Storing a response for a near-identical query replaces that entry
+
+Freshness and Size:
+- Entries expire ttl_seconds after they were stored
+- When full, the least recently used entry is evicted
+
+When Not to Use It (decided by the caller, GeminiHandler):
+- Personalized requests (user profile with summary or topics)
+- Follow-ups that depend on the conversation: is_follow_up() flags very
+  short messages and back-references ("it", "that", "more", ...) when the
+  session has context
+- Fallback/error responses are never stored
+- Bypassed lookups are counted with record_bypass()
+
+Metrics (get_stats()):
+{
+    "entries": int, "hits": int, "misses": int, "bypasses": int,
+    "expired": int, "evictions": int, "hit_rate": float
+}
+
+Usage Example:
+cache = ResponseCache(max_distance=0.1, ttl_seconds=3600, max_entries=1000)
+response = cache.get(query_embedding)
+if response is None:
+    response = generate(...)
+    cache.put(query, query_embedding, response)
+"""
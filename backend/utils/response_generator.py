@@ -1,55 +1,160 @@
 # backend/utils/response_generator.py
-import google.generativeai as genai
-from typing import Dict, List, Optional
+import json
+from typing import AsyncIterator, Dict, List, Optional
+from utils import gemini_client
+
+FALLBACK_RESPONSE = """I apologize, but I'm having trouble generating a response right now. 
+For your safety and best advice, please consider consulting with a healthcare professional."""
+
+# Generation modes: reasoning call + rewrite call, or one structured call
+TWO_PASS = "two_pass"
+SINGLE_PASS = "single_pass"
 
 class ResponseGenerator:
-    def __init__(self, api_key: str):
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel(
-            model_name="gemini-1.5-pro",
-            generation_config={
-                "temperature": 0.7,
-                "top_p": 0.95,
-                "top_k": 40,
-                "max_output_tokens": 8192,
-            }
+    def __init__(self, api_key: str, context_packer=None, mode: str = TWO_PASS):
+        self.context_packer = context_packer
+        self.mode = mode
+        gemini_client.configure(api_key)
+        generation_config = {
+            "temperature": 0.7,
+            "top_p": 0.95,
+            "top_k": 40,
+            "max_output_tokens": 8192,
+        }
+        self.model = gemini_client.get_model("gemini-1.5-pro", generation_config)
+        # Same model asked for JSON, so the reasoning can be returned and dropped
+        self.single_pass_model = gemini_client.get_model(
+            "gemini-1.5-pro",
+            {**generation_config, "response_mime_type": "application/json"}
         )
-    
+
+    def _pack(self, channel: str, snippets: List[Dict]) -> List[str]:
+        """Fit snippets into the channel's token budget, if a packer is set"""
+        if not self.context_packer:
+            return [snippet["text"] for snippet in snippets]
+        return [snippet["text"] for snippet in self.context_packer.pack(channel, snippets)["snippets"]]
+
+    def _build_context(
+        self,
+        rag_context: Optional[str],
+        user_profile: Optional[Dict],
+        research_results: Dict[str, str]
+    ) -> str:
+        """Combine local knowledge, user profile and research findings into one block"""
+        context_parts = []
+
+        # Add RAG context if available
+        if rag_context:
+            context_parts.append(f"Local Knowledge:\n{rag_context}")
+
+        # Add user profile context if available
+        if user_profile and user_profile.get('summary'):
+            profile_texts = self._pack("profile", [{
+                "text": user_profile['summary'],
+                "source": "profile",
+                "distance": None
+            }])
+            if profile_texts:
+                context_parts.append(f"User Context:\n{profile_texts[0]}")
+
+        # Add research findings
+        if research_results:
+            research_texts = self._pack("research", [
+                {
+                    "text": f"Research on {query}:\n{results}",
+                    "source": "research",
+                    "distance": None
+                }
+                for query, results in research_results.items()
+            ])
+            if research_texts:
+                research_summary = "\n".join(research_texts)
+                context_parts.append(f"Research Findings:\n{research_summary}")
+
+        # Combine all context
+        return "\n\n".join(context_parts)
+
     async def generate_response(
-        self, 
-        original_query: str, 
-        sub_queries: List[str], 
+        self,
+        original_query: str,
+        sub_queries: List[str],
         research_results: Dict[str, str],
         rag_context: Optional[str] = None,
-        user_profile: Optional[Dict] = None
+        user_profile: Optional[Dict] = None,
+        mode: Optional[str] = None
     ) -> str:
         """Generate natural, contextual response using Chain of Thought"""
         try:
-            print("\n=== Generating Response ===")
-            
-            # Prepare context information
-            context_parts = []
-            
-            # Add RAG context if available
-            if rag_context:
-                context_parts.append(f"Local Knowledge:\n{rag_context}")
-            
-            # Add user profile context if available
-            if user_profile and user_profile.get('summary'):
-                context_parts.append(f"User Context:\n{user_profile['summary']}")
-            
-            # Add research findings
-            if research_results:
-                research_summary = "\n".join([
-                    f"Research on {query}:\n{results}"
-                    for query, results in research_results.items()
-                ])
-                context_parts.append(f"Research Findings:\n{research_summary}")
-            
-            # Combine all context
-            context = "\n\n".join(context_parts)
-            
-            prompt = f"""As a health advisor, use Chain of Thought reasoning to provide a helpful response.
+            mode = mode or self.mode
+            print(f"\n=== Generating Response ({mode}) ===")
+            context = self._build_context(rag_context, user_profile, research_results)
+
+            if mode == SINGLE_PASS:
+                response = await self._generate_single_pass(original_query, context)
+                if response:
+                    return response
+                print("Single-pass output unusable, falling back to two-pass")
+
+            return await self._generate_two_pass(original_query, context)
+
+        except Exception as e:
+            print(f"Error generating response: {str(e)}")
+            return FALLBACK_RESPONSE
+
+    async def stream_response(
+        self,
+        original_query: str,
+        sub_queries: List[str],
+        research_results: Dict[str, str],
+        rag_context: Optional[str] = None,
+        user_profile: Optional[Dict] = None,
+        mode: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Yield the answer as Gemini streams it; the reasoning call (two_pass) is not streamed"""
+        started = False
+        try:
+            mode = mode or self.mode
+            print(f"\n=== Streaming Response ({mode}) ===")
+            context = self._build_context(rag_context, user_profile, research_results)
+
+            if mode == SINGLE_PASS:
+                # JSON can't be shown while it is written, so stream a plain-text answer
+                prompt = self._single_pass_text_prompt(original_query, context)
+            else:
+                print("Getting CoT response from Gemini...")
+                cot_response = await gemini_client.generate(self.model, self._cot_prompt(original_query, context))
+                prompt = self._final_prompt(original_query, cot_response.text)
+
+            async for chunk in gemini_client.stream(self.model, prompt):
+                text = chunk.text
+                if text:
+                    started = True
+                    yield text
+            print("Response streamed successfully")
+
+        except Exception as e:
+            print(f"Error streaming response: {str(e)}")
+            if started:
+                # Part of the answer was already sent; the caller must not treat it as complete
+                raise
+            yield FALLBACK_RESPONSE
+
+    async def _generate_two_pass(self, original_query: str, context: str) -> str:
+        """Chain of Thought call, then a second call that rewrites it as the answer"""
+        print("Getting CoT response from Gemini...")
+        cot_response = await gemini_client.generate(self.model, self._cot_prompt(original_query, context))
+
+        # Generate final response without the reasoning
+        final_response = await gemini_client.generate(
+            self.model,
+            self._final_prompt(original_query, cot_response.text)
+        )
+        print("Response generated successfully")
+
+        return final_response.text
+
+    def _cot_prompt(self, original_query: str, context: str) -> str:
+        return f"""As a health advisor, use Chain of Thought reasoning to provide a helpful response.
 
 User Query: {original_query}
 
@@ -90,13 +195,10 @@ Now, think through your response step by step, then provide a natural, focused a
 
 Reasoning:"""
 
-            print("Getting CoT response from Gemini...")
-            cot_response = self.model.generate_content(prompt)
-            
-            # Generate final response without the reasoning
-            final_prompt = f"""Based on this reasoning:
+    def _final_prompt(self, original_query: str, reasoning: str) -> str:
+        return f"""Based on this reasoning:
 
-{cot_response.text}
+{reasoning}
 
 Generate a natural, conversational response that focuses specifically on answering the user's question:
 "{original_query}"
@@ -109,15 +211,64 @@ Remember:
 
 Final Response:"""
 
-            final_response = self.model.generate_content(final_prompt)
-            print("Response generated successfully")
-            
-            return final_response.text
-            
-        except Exception as e:
-            print(f"Error generating response: {str(e)}")
-            return """I apologize, but I'm having trouble generating a response right now. 
-For your safety and best advice, please consider consulting with a healthcare professional."""
+    def _single_pass_text_prompt(self, original_query: str, context: str) -> str:
+        """Reasoning-free prompt for streaming single-pass answers"""
+        return f"""As a health advisor, answer the user's query directly.
+
+User Query: {original_query}
+
+Context Information:
+{context}
+
+Guidelines:
+- Start with a direct answer and include relevant context naturally
+- Add safety information and suggest professional help when appropriate
+- Only mention general health tips (water, sleep, vitamins) if directly relevant
+- Include product recommendations only if specifically relevant
+- Be clear about limitations and uncertainties
+- Keep it concise, conversational and professional
+
+Answer:"""
+
+    async def _generate_single_pass(self, original_query: str, context: str) -> Optional[str]:
+        """One JSON call: brief reasoning fields first, then the answer; only the answer is returned"""
+        prompt = f"""As a health advisor, answer the user's query.
+
+User Query: {original_query}
+
+Context Information:
+{context}
+
+Before answering, note briefly (these notes are never shown to the user):
+- the main health topic and the level of detail needed
+- which context information is relevant
+- safety concerns, warnings, and whether to recommend professional consultation
+
+Then write the answer:
+- Start with a direct answer and include relevant context naturally
+- Only mention general health tips (water, sleep, vitamins) if directly relevant
+- Include product recommendations only if specifically relevant
+- Be clear about limitations and uncertainties
+- Keep it concise, conversational and professional
+
+Respond with JSON only, in this format:
+{{
+    "analysis": "short notes on topic, relevant context and safety",
+    "answer": "the final response to the user"
+}}"""
+
+        print("Getting single-pass response from Gemini...")
+        response = await gemini_client.generate(self.single_pass_model, prompt)
+        try:
+            answer = json.loads(response.text).get("answer", "")
+        except (ValueError, AttributeError) as e:
+            print(f"Error parsing single-pass response: {str(e)}")
+            return None
+
+        if not isinstance(answer, str) or not answer.strip():
+            return None
+        print("Response generated successfully")
+        return answer.strip()
 
 
 
@@ -135,15 +286,19 @@ Gemini Pro model. It implements Chain of Thought (CoT) reasoning for more accura
 and relevant responses to health-related queries.
 
 Key Features:
-1. Two-Stage Generation:
-   - Chain of Thought reasoning stage
-   - Natural response formulation stage
-   
+1. Generation Modes (mode, or per call):
+   - two_pass (default): Chain of Thought reasoning stage, then a natural
+     response formulation stage (two sequential Gemini Pro calls)
+   - single_pass: one call with JSON output; the model writes brief
+     "analysis" notes before the "answer", and only the answer is returned.
+     Unparseable or empty output falls back to two_pass
+
 2. Context Integration:
    - Local knowledge (RAG)
    - User profile information
    - Research findings
    - Previous conversation context
+   - Optional ContextPacker budgets for the profile and research channels
 
 3. Response Guidelines:
    - Relevance-based health tips
@@ -151,11 +306,22 @@ Key Features:
    - Safety-first approach
    - Professional consultation suggestions
 
+4. Streaming (stream_response(), same arguments):
+   - Async generator of text chunks from generate_content(stream=True)
+   - two_pass: the reasoning call completes first, the final call streams
+   - single_pass: a reasoning-free plain-text prompt is streamed (the JSON
+     format can't be shown while it is being written)
+   - Errors before the first chunk yield the fallback response; errors
+     after it are raised, so a cut-off answer is never taken as complete
+
 Model Configuration:
 - Uses Gemini-1.5-Pro
 - Balanced temperature (0.7) for creativity
 - High top_p (0.95) for natural variation
 - Large output capacity (8192 tokens)
+- single_pass uses the same settings with response_mime_type application/json
+- Models are shared through gemini_client; every call runs on its bounded
+  thread pool, so a slow Gemini call doesn't block other conversations
 
 Process Flow:
 1. Context Preparation:
@@ -186,12 +352,15 @@ response = await generator.generate_response(
     query="Is melatonin safe?",
     sub_queries=["safety", "dosage"],
     research_results={"safety": "Studies show..."},
-    rag_context="Local data about melatonin..."
+    rag_context="Local data about melatonin...",
+    mode="single_pass"
 )
 
+Comparing the modes: python -m utils.generation_benchmark (from backend/)
+
 Note: This component ensures responses are:
 - Scientifically accurate
 - Contextually relevant
 - Safety-conscious
 - Natural and helpful
-"""
\ No newline at end of file
+"""
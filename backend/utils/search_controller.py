@@ -5,9 +5,11 @@ import json
 import asyncio
 
 class SearchController:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, cache=None):
         self.client = AsyncOpenAI(api_key=api_key)
         self.model = "llama-3.1-sonar-small-128k-online"
+        # Optional ResearchCache; repeated sub-queries skip the Sonar call
+        self.cache = cache
     
     async def search_research(self, queries: List[str]) -> Dict[str, str]:
         """Search for research papers and medical data"""
@@ -16,6 +18,14 @@ class SearchController:
         # Process queries concurrently
         async def process_query(query: str) -> tuple:
             try:
+                loop = asyncio.get_running_loop()
+                if self.cache:
+                    # A miss may embed the query; keep that off the event loop
+                    cached = await loop.run_in_executor(None, self.cache.get, query)
+                    if cached is not None:
+                        print(f"Research cache hit for: {query}")
+                        return query, cached
+                
                 print(f"\n=== Searching for: {query} ===")
                 response = await self.client.chat.completions.create(
                     model=self.model,
@@ -46,6 +56,9 @@ Format your response to include:
                 
                 content = response.choices[0].message.content
                 print(f"Found research for: {query}")
+                # Only successful results are cached; errors are retried next time
+                if self.cache and content:
+                    await loop.run_in_executor(None, self.cache.put, query, content)
                 return query, content
                 
             except Exception as e:
@@ -88,6 +101,13 @@ Key Features:
    - Scientific consensus
    - Study references
 
+Research Cache:
+- With a ResearchCache, each sub-query is looked up first (normalized
+  text, optionally by embedding similarity) and only misses call Sonar
+- Successful results are stored with a TTL; errors are never cached
+- Cache reads and writes run in the default executor, since a lookup that
+  misses (and every store) embeds the query
+
 Model Configuration:
 - Uses llama-3.1-sonar-small-128k-online
 - Low temperature (0.3) for accuracy
@@ -115,7 +135,7 @@ Error Handling:
 - Detailed error reporting
 
 Usage Example:
-controller = SearchController(api_key)
+controller = SearchController(api_key, cache=ResearchCache(cache_path, namespace=model))
 results = await controller.search_research([
     "melatonin safety studies",
     "melatonin dosage research"
@@ -3,26 +3,21 @@ from datetime import datetime
 import json
 
 class UserProfileManager:
-    def __init__(self, db_manager):
+    def __init__(self, db_manager, max_write_attempts: int = 3):
         self.db_manager = db_manager
         self.collection_name = "user_profiles"
+        self.max_write_attempts = max_write_attempts
     
     async def get_user_profile(self, user_id: str) -> Dict:
         """Get user profile from database"""
         try:
             profile = self.db_manager.get_user_profile(user_id)
             if not profile:
-                # Create default profile
-                profile = {
-                    "user_id": user_id,
-                    "summary": "",
-                    "key_topics": [],
-                    "health_concerns": [],
-                    "preferences": {"language": "en"},
-                    "created_at": datetime.now().isoformat(),
-                    "last_interaction": datetime.now().isoformat()
-                }
-                self.db_manager.store_user_profile(user_id, profile)
+                # Create default profile (version 0: only if nobody created it meanwhile)
+                profile = self._create_default_profile(user_id)
+                profile["version"] = 0
+                if not self.db_manager.store_user_profile(user_id, profile):
+                    profile = self.db_manager.get_user_profile(user_id) or profile
             
             return profile
             
@@ -39,23 +34,28 @@ class UserProfileManager:
     ):
         """Update user profile with new interaction"""
         try:
-            profile = await self.get_user_profile(user_id)
-            
-            # Update last interaction
-            profile["last_interaction"] = datetime.now().isoformat()
-            
-            # Update summary if provided
-            if context_summary:
-                profile["summary"] = context_summary
-            
-            # Extract and update key topics
             topics = self._extract_topics(message, response)
-            if topics:
-                profile["key_topics"] = list(set(profile["key_topics"] + topics))
             
-            # Store updated profile
-            self.db_manager.store_user_profile(user_id, profile)
+            # Versioned write: re-read and re-apply if another request updated the profile first
+            for _ in range(self.max_write_attempts):
+                profile = await self.get_user_profile(user_id)
+                
+                # Update last interaction
+                profile["last_interaction"] = datetime.now().isoformat()
+                
+                # Update summary if provided
+                if context_summary:
+                    profile["summary"] = context_summary
+                
+                # Extract and update key topics
+                if topics:
+                    profile["key_topics"] = list(set(profile.get("key_topics", []) + topics))
+                
+                # Store updated profile
+                if self.db_manager.store_user_profile(user_id, profile):
+                    return profile
             
+            print(f"Gave up updating profile for {user_id} after {self.max_write_attempts} attempts")
             return profile
             
         except Exception as e:
@@ -123,7 +123,8 @@ user_profile = {
         "language": str      # Communication language
     },
     "created_at": str,      # Profile creation timestamp
-    "last_interaction": str  # Last interaction timestamp
+    "last_interaction": str, # Last interaction timestamp
+    "version": int           # Store version, used for conflict-checked writes
 }
 
 Methods:
@@ -137,6 +138,7 @@ Methods:
    - Updates conversation summary
    - Extracts and updates topics
    - Stores changes in database
+   - Retries on version conflicts (max_write_attempts)
 
 3. _create_default_profile(user_id):
    - Creates new profile structure
@@ -48,6 +48,31 @@ def send_message(message):
         st.error(f"Error sending message: {str(e)}")
         return None
 
+def stream_message(message):
+    """Send chat message to the streaming API and yield response chunks"""
+    with requests.post(
+        f"{API_URL}/chat/stream",
+        json={
+            "user_id": st.session_state.user_id,
+            "message": message
+        },
+        stream=True,
+        timeout=(5, 120)
+    ) as response:
+        response.raise_for_status()
+        event = None
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                payload = json.loads(line[len("data:"):].strip())
+                if event == "error":
+                    raise RuntimeError(payload.get("error", "Stream failed"))
+                if event is None and payload.get("text"):
+                    yield payload["text"]
+            elif not line:
+                event = None
+
 def submit_feedback(rating, comment):
     """Submit user feedback to API"""
     try:
@@ -122,14 +147,28 @@ if prompt := st.chat_input("How can I help you today?"):
     with st.chat_message("user"):
         st.markdown(prompt)
 
-    # Get bot response
-    response = send_message(prompt)
-    if response:
-        # Add assistant response to chat history
-        assistant_response = response.get('response', "I'm sorry, I couldn't process that request.")
-        st.session_state.messages.append({"role": "assistant", "content": assistant_response})
-        with st.chat_message("assistant"):
-            st.markdown(assistant_response)
+    # Stream bot response, rendering each chunk as it arrives
+    with st.chat_message("assistant"):
+        placeholder = st.empty()
+        assistant_response = ""
+        try:
+            for chunk in stream_message(prompt):
+                assistant_response += chunk
+                placeholder.markdown(assistant_response + "▌")
+        except Exception:
+            # A cut-off answer is discarded and the full response requested instead;
+            # send_message reports an error if that fails too
+            assistant_response = ""
+
+        if not assistant_response:
+            response = send_message(prompt)
+            if response:
+                assistant_response = response.get('response', "I'm sorry, I couldn't process that request.")
+
+        if assistant_response:
+            placeholder.markdown(assistant_response)
+            # Add assistant response to chat history
+            st.session_state.messages.append({"role": "assistant", "content": assistant_response})
 
 # Footer
 st.markdown("---")
@@ -184,7 +223,7 @@ Layout Structure:
    - Chat interface
    - Message history
    - Input field
-   - Response display
+   - Response display (streamed, updated as chunks arrive)
 
 Functions:
 1. get_random_tip():
@@ -197,6 +236,11 @@ Functions:
    - Handles API requests
    - Updates chat history
 
+2b. stream_message():
+   - Reads the /chat/stream Server-Sent Events
+   - Yields answer chunks for incremental rendering
+   - The chat falls back to send_message() if the stream fails or is empty
+
 3. submit_feedback():
    - Collects user feedback
    - Sends to backend